@@ -1,31 +1,40 @@
 import os
 
-import httpx
 
 os.environ["ANONYMIZED_TELEMETRY"] = "false"
 from dotenv import load_dotenv
 from pydantic import SecretStr
 
-from browser_use import Agent, Browser, Controller, BrowserConfig
+from browser_use import Agent, Controller
 from langchain_google_genai import ChatGoogleGenerativeAI
 from SystemPrompt import MySystemPrompt
+from browser_pool import BrowserPool, get_browser_pool
+from replay import ReplayEngine, ReplayHistory
+from step_memo import StepRecorder, dom_fingerprint, get_step_memo, history_succeeded, step_memo_enabled
+from tracing import StepTimer, get_tracer, span
+from vision import AdaptiveVision
+from rate_limiter import llm_max_retries
+from http_clients import get_async_http_client
 from java_code_generator import JavaCodeGenerator
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
+from agent_inputs import AGENT_MODEL, AGENT_RULES
 
 load_dotenv()
 
 
 class AI_TestAgent:
     
-    def __init__(self, controller: Controller):
+    def __init__(self, controller: Controller, browser_pool: BrowserPool = None):
         self.controller = controller
+        self.browser_pool = browser_pool
         self._llm = AzureChatOpenAI(
-            model_name="gpt-4o",
+            model_name=AGENT_MODEL,
             api_version="2024-12-01-preview",
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             openai_api_key=os.getenv("AZURE_OPENAI_KEY"),
-            http_async_client=httpx.AsyncClient(verify=False),
-            deployment_name="gpt-4o",
+            http_async_client=get_async_http_client(),
+            max_retries=llm_max_retries(),
+            deployment_name=AGENT_MODEL,
 
         )
         # self._llm=ChatGoogleGenerativeAI(
@@ -39,7 +48,8 @@ class AI_TestAgent:
             api_version="2024-12-01-preview",
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             api_key=os.getenv("AZURE_OPENAI_KEY"),
-            http_async_client=httpx.AsyncClient(verify=False), 
+            http_async_client=get_async_http_client(),
+            max_retries=llm_max_retries(),
         )
         
        
@@ -69,6 +79,26 @@ class AI_TestAgent:
 
         return self.code_generator.generate_test_from_json(json_file, test_case_to_use)
 
+    async def agenerate_test_from_json(self, json_file: str, test_case=None) -> str:
+        """Async variant of generate_test_from_json that does not block the event loop."""
+        test_case_to_use = test_case or self.current_test_case
+
+        if test_case_to_use is None:
+            print("[Warning] No test case provided and no current test case is set.")
+            return ""
+
+        return await self.code_generator.agenerate_test_from_json(json_file, test_case_to_use)
+
+    async def agenerate_test_from_data(self, test_data, test_case=None) -> str:
+        """Generate Java code straight from recorded actions, e.g. a run loaded from the results store."""
+        test_case_to_use = test_case or self.current_test_case
+
+        if test_case_to_use is None:
+            print("[Warning] No test case provided and no current test case is set.")
+            return ""
+
+        return await self.code_generator.agenerate_test_from_data(test_data, test_case_to_use)
+
     async def run_test_and_generate_code(self, test_case, json_file: str):
         """
         Run a test case and generate the corresponding Java code.
@@ -82,90 +112,198 @@ class AI_TestAgent:
         """
         self.current_test_case = test_case
         history = await self.run_test(test_case)
-        code = self.generate_test_from_json(json_file, test_case)
+        code = await self.agenerate_test_from_json(json_file, test_case)
         return history, code
 
-    async def run_test(self, test_case):
+    @staticmethod
+    def _make_step_callback(on_step, step_listeners=()):
+        """Adapt browser_use's new-step callback to a simple on_step(step, info) listener
+
+        `step_listeners` receive browser_use's raw (state, model_output, step_number).
         """
-        Execute the test case by interacting with the LLM agent.
+        step_listeners = [listener for listener in step_listeners if listener is not None]
+        if on_step is None and not step_listeners:
+            return None
 
-        Args:
-            test_case: The test case object to execute.
+        def callback(state, model_output, step_number):
+            for step_listener in step_listeners:
+                try:
+                    step_listener(state, model_output, step_number)
+                except Exception as e:
+                    print(f"[Warning] Step recorder failed: {e}")
+            if on_step is None:
+                return
+            try:
+                current_state = getattr(model_output, "current_state", None)
+                actions = [
+                    action.model_dump(exclude_none=True) if hasattr(action, "model_dump") else str(action)
+                    for action in (getattr(model_output, "action", None) or [])
+                ]
+                on_step(step_number, {
+                    "url": getattr(state, "url", None),
+                    "title": getattr(state, "title", None),
+                    "evaluation_previous_goal": getattr(current_state, "evaluation_previous_goal", None),
+                    "next_goal": getattr(current_state, "next_goal", None),
+                    "actions": actions,
+                })
+            except Exception as e:
+                print(f"[Warning] Step listener failed: {e}")
 
-        Returns:
-            list: History of messages or interactions from the agent.
-        """
-        self.current_test_case = test_case
+        return callback
+
+    def _build_agent(self, test_case, browser_context, on_step=None, task_suffix: str = "", step_listeners=(),
+                     use_vision: bool = True) -> Agent:
+        """Create the browser_use Agent for a test case on the given browser context."""
         task_description = (
             f"Perform the following case: {test_case.description}. "
             f"Steps: {test_case.steps}"
-        )
+        ) + task_suffix
 
-        browser = Browser(
-            config=BrowserConfig(
-                headless=False,
-                disable_security=False,
-            )
-        )
-        new_rules = """IMPORTANT INSTRUCTIONS: I am an automation agent executing test scenarios exactly as written. I will focus on completing each test case step by step, following the exact instructions provided.
-
-As a human user interacting with the website, I will:
-
-1) Execute each test step EXACTLY as written without any deviation or interpretation
-2) Handle all modals or popups immediately when they appear
-3) Ignore any advertisements or promotional content
-4) Wait for pages to fully load before taking any action
-5) Use scrolling to find elements that are not immediately visible
-6) Interact with elements exactly as a human would:
-   - Always click on input fields before typing text
-   - If a button is not immediately clickable, move the mouse over it, then click
-   - Use tab navigation when appropriate
-   - Scroll smoothly before interacting with elements
-   - When clicking on any <li> element inside a <ul>, ALWAYS click the parent <ul> element first to expand it
-   - When interacting with dropdown menus, always click to open the dropdown before selecting any option
-7) Take actions deliberately and carefully, following human timing
-8) Pause briefly between actions to simulate natural human behavior
-9) Always verify actions have the expected result before proceeding to the next step
-10) Never add my own interpretation or logic to the test steps
-11) Never improvise or expand on what is written in the test steps
-12) Follow the literal instructions word-for-word without making assumptions
-13) When navigating between pages, verify the new page has loaded correctly before proceeding
-14) Never skip a step or combine steps - execute each step individually as written
-15) If a step cannot be completed exactly as written, report the issue without trying alternative approaches
-16) If any step cannot be completed exactly as written (e.g., element not found, button does not work, unexpected page layout), STOP execution immediately and report the step that failed, along with the reason. Do NOT restart the test case or repeat steps unless explicitly instructed.
-17) Never repeat a step unless instructed. If you fail a step once, do not retry. Report and halt.
-18) If authentication fails or UI elements are different from expected, do not guess or continue. Report the issue and stop.
-19) Each test step must be executed in complete isolation from the others.
-20) Do NOT merge or combine multiple steps into a single action, even if they appear related (e.g., entering username and password must be two separate actions).
-21) Each step must be executed in order, one at a time. Do NOT anticipate or perform future steps early.
-22) If a step is already complete due to a previous one (e.g., page already loaded), still repeat it as written.
-23) Treat each step as a strict atomic instruction. Finish it completely and verify its completion before starting the next.
-
-
-My primary goal is to follow the provided test steps with absolute precision, executing them exactly as written without adding any interpretations or additional logic.
-"""
-        agent = Agent(
+        return Agent(
             task=task_description,
             llm=self._llm,
             controller=self.controller,
-            use_vision=True,
+            use_vision=use_vision,
             save_conversation_path='logs/conversation',
-            extend_system_message=new_rules,
-            browser=browser,
+            extend_system_message=AGENT_RULES,
+            browser=browser_context.browser,
+            browser_context=browser_context,
             max_actions_per_step=30,
             max_failures=10,
             # save_playwright_script_path='playwright/'
             # planner_llm=self._planner_llm,
             tool_calling_method="function_calling",
-
-            
-            
+            register_new_step_callback=self._make_step_callback(on_step, step_listeners),
         )
 
-        try:
-            
-            return await agent.run()
-        
-        finally:
-            # Gracefully shut down the browser to avoid lingering processes
-            await browser.close()
+    async def _run_agent(self, test_case, browser_context, on_step=None, task_suffix: str = "", step_listener=None):
+        """Build and run the agent with adaptive vision, timing the whole run and each of its steps."""
+        with span("agent.run", test_case=test_case.name) as run_span:
+            step_timer = StepTimer(get_tracer(), parent=run_span) if get_tracer().enabled else None
+            vision = AdaptiveVision(test_case)
+            agent = self._build_agent(
+                test_case, browser_context, on_step, task_suffix=task_suffix,
+                step_listeners=(step_listener, step_timer.on_new_step if step_timer else None),
+                use_vision=vision.initial_use_vision(),
+            )
+            vision.attach(agent)
+            try:
+                return await agent.run()
+            finally:
+                vision.finish()
+                if step_timer:
+                    step_timer.close()
+
+    async def run_test(self, test_case, on_step=None):
+        """
+        Execute the test case by interacting with the LLM agent.
+
+        Args:
+            test_case: The test case object to execute.
+            on_step (optional): Called as on_step(step_number, info) after the model picks each step's actions.
+
+        Returns:
+            list: History of messages or interactions from the agent.
+        """
+        self.current_test_case = test_case
+        browser_pool = self.browser_pool or get_browser_pool()
+
+        # The pool keeps browsers warm between tests; every test still gets its own context
+        async with browser_pool.acquire() as browser_context:
+            if step_memo_enabled():
+                return await self._run_with_step_memo(test_case, browser_context, on_step)
+            return await self._run_agent(test_case, browser_context, on_step)
+
+    async def _run_with_step_memo(self, test_case, browser_context, on_step=None):
+        """
+        Replay the leading steps whose actions are memoized for the current page, then let the agent do the rest.
+
+        Steps the agent completes are memoized once the run reports success, keyed by the
+        page URL and DOM fingerprint the step started on.
+        """
+        memo = get_step_memo()
+        steps = list(test_case.steps)
+        engine = ReplayEngine(browser_context)
+        memo_actions = []
+        completed = 0
+
+        for step in steps:
+            # browser_use 0.1.41 requires the flag; the hashes are only needed by its own new-element detection
+            state = await browser_context.get_state(cache_clickable_elements_hashes=False)
+            actions = memo.lookup(step, state.url, dom_fingerprint(state.selector_map))
+            if actions is None:
+                break
+            with span("memo.replay", step=step, actions=len(actions)):
+                replayed, _, error = await engine.replay(actions)
+            memo_actions.extend(actions[:replayed])
+            if error is not None:
+                print(f"[Warning] '{test_case.name}': memoized step '{step}' no longer applies ({error}).")
+                memo.invalidate(step, state.url)
+                break
+            completed += 1
+
+        task_suffix = ""
+        if completed:
+            page = await browser_context.get_current_page()
+            print(f"[Info] '{test_case.name}': {completed}/{len(steps)} step(s) replayed from the step memo.")
+            if completed == len(steps):
+                task_suffix = (
+                    f" NOTE: every step above was already performed and the browser is now at {page.url}. "
+                    f"Do not repeat any step; only verify the outcome of the case on the current page and finish."
+                )
+            else:
+                task_suffix = (
+                    f" NOTE: the first {completed} step(s) were already performed and the browser is now at "
+                    f"{page.url}. Continue with step {completed + 1} ('{steps[completed]}'); do not start over."
+                )
+
+        recorder = StepRecorder(steps[completed:])
+        history = await self._run_agent(test_case, browser_context, on_step, task_suffix=task_suffix,
+                                        step_listener=recorder.on_new_step)
+
+        if history_succeeded(history):
+            for entry in recorder.memo_entries(history):
+                memo.record(*entry)
+
+        return ReplayHistory(memo_actions, agent_history=history) if memo_actions else history
+
+    async def replay_test(self, test_case, recorded_actions: list, on_step=None):
+        """
+        Replay a recorded action history without the LLM, falling back to the agent at the first failing action.
+
+        Args:
+            test_case: The test case object to execute.
+            recorded_actions (list): model_actions() of an earlier run of this test case.
+            on_step (optional): Step listener for the fallback agent, see run_test.
+
+        Returns:
+            ReplayHistory: The replayed actions plus the fallback agent history, if any.
+        """
+        self.current_test_case = test_case
+        browser_pool = self.browser_pool or get_browser_pool()
+
+        async with browser_pool.acquire() as browser_context:
+            with span("replay", test_case=test_case.name, actions=len(recorded_actions)):
+                engine = ReplayEngine(browser_context)
+                replayed, done_text, error = await engine.replay(recorded_actions)
+            if error is None:
+                print(f"[Info] Replayed {replayed} recorded action(s) of '{test_case.name}' without agent steps.")
+                history = ReplayHistory(recorded_actions[:replayed], final_text=done_text)
+                # Reaching the end of the recording does not prove the expected result; one LLM call checks it
+                with span("replay.verify", test_case=test_case.name):
+                    history.verified, history.verification = await engine.verify_final_state(
+                        test_case, self._llm, done_text
+                    )
+                print(f"[Info] '{test_case.name}': {history.verification}")
+                return history
+
+            print(f"[Warning] '{test_case.name}': {error}. Handing over to the agent from there.")
+            task_suffix = ""
+            if replayed:
+                page = await browser_context.get_current_page()
+                task_suffix = (
+                    f" NOTE: the first {replayed} recorded action(s) of this case were already performed and the "
+                    f"browser is now at {page.url}. Continue from the current page state; do not start over."
+                )
+            history = await self._run_agent(test_case, browser_context, on_step, task_suffix=task_suffix)
+            return ReplayHistory(recorded_actions[:replayed], agent_history=history)
@@ -1,11 +1,13 @@
-import asyncio
 from types import SimpleNamespace
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import json
-from case_generator import CaseGenerator, get_case_generator_prompt
-from test_runner import run_test_and_generate_code
+from case_generator import CaseGenerator, generate_test_cases_batch, get_case_generator_prompt
+from jobs import QueueFullError, get_job_manager
 from flask_cors import CORS
+import os
 app = Flask(__name__)
+# Seconds /api/run-test waits for its job; the job keeps running afterwards and can be polled
+RUN_TEST_TIMEOUT = float(os.getenv("RUN_TEST_TIMEOUT", "900"))
 CORS(app, supports_credentials=True)
 
 @app.route('/api/generate-test-cases', methods=['POST'])
@@ -29,22 +31,116 @@ def generate_test_cases():
         return jsonify({'error': 'Failed to parse response'}), 500
     
 
-@app.route('/api/run-test', methods=['POST'])
-def runtest():
-    data= request.get_json()
-    test_case_data = data.get('test_case')
-  
+@app.route('/api/generate-test-cases/batch', methods=['POST'])
+def generate_test_cases_batch_endpoint():
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    concurrency = data.get('concurrency')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing required parameters'}), 400
+
+    def stream():
+        failed = 0
+        for result in generate_test_cases_batch(items, concurrency):
+            failed += result['status'] != 'ok'
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+        yield json.dumps({'summary': {'total': len(items), 'succeeded': len(items) - failed, 'failed': failed}}) + '\n'
+
+    # One JSON object per line, flushed as each item completes
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
 
+
+def _test_case_from_request():
+    data = request.get_json(silent=True) or {}
+    test_case_data = data.get('test_case')
     if not test_case_data:
+        return None
+    return SimpleNamespace(**test_case_data)
+
+
+@app.route('/api/run-test', methods=['POST'])
+def runtest():
+    test_case_obj = _test_case_from_request()
+    if test_case_obj is None:
         return jsonify({'error': 'Missing required parameters'}), 400
     try:
-        test_case_obj = SimpleNamespace(**test_case_data)
-
-        result = asyncio.run(run_test_and_generate_code(test_case_obj))
-        print(result)
-        return jsonify(result), 200
+        # Runs on the shared job loop (warm browser pool) and waits for the outcome
+        manager = get_job_manager()
+        job = manager.wait(manager.submit_test_run(test_case_obj), timeout=RUN_TEST_TIMEOUT)
+        if not job.finished:
+            return jsonify({
+                'error': f'Test still running after {RUN_TEST_TIMEOUT:.0f}s',
+                'job_id': job.id,
+                'result_url': f'/api/jobs/{job.id}/result',
+            }), 504
+        if job.status == 'failed':
+            return jsonify({'error': job.error}), 500
+        return jsonify(job.result), 200
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@app.route('/api/jobs/run-test', methods=['POST'])
+def submit_run_test_job():
+    test_case_obj = _test_case_from_request()
+    if test_case_obj is None:
+        return jsonify({'error': 'Missing required parameters'}), 400
+    replay = bool((request.get_json(silent=True) or {}).get('replay', False))
+    try:
+        job = get_job_manager().submit_test_run(test_case_obj, replay=replay)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify({
+        **job.to_dict(),
+        'status_url': f'/api/jobs/{job.id}',
+        'result_url': f'/api/jobs/{job.id}/result',
+        'events_url': f'/api/jobs/{job.id}/events',
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if not job.finished:
+        return jsonify(job.to_dict()), 202
+    if job.status == 'failed':
+        return jsonify({'error': job.error}), 500
+    return jsonify(job.result), 200
+
+
+def parse_last_event_id(value) -> int:
+    """Id of the last event the client saw; -1 (replay everything) when missing or malformed"""
+    try:
+        return max(int(value), -1)
+    except (TypeError, ValueError):
+        return -1
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    return Response(
+        stream_with_context(manager.stream_events(job, last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
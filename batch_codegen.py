@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import os
+
+from llm_usage import get_usage_tracker, usage_scope
+from run_manifest import case_definition, digest, format_skip_summary, get_run_manifest
+from scheduler import TestScheduler
+from site_support import site_key
+from trace_ir import encode_trace, estimate_tokens
+
+DEFAULT_BATCH_TOKENS = 12000
+DEFAULT_BATCH_CASES = 6
+
+
+def batch_codegen_enabled() -> bool:
+    return os.getenv("CODEGEN_BATCH", "").strip().lower() in ("1", "true", "yes")
+
+
+class CodegenItem:
+    """One test case and its recorded actions, rendered once as its section of a batch prompt"""
+
+    def __init__(self, test_case, test_data, class_name: str, compact_trace: bool = True):
+        self.test_case = test_case
+        self.test_data = test_data
+        self.class_name = class_name
+        self.site = site_key(getattr(test_case, "url", ""))
+        if compact_trace:
+            trace_json, _ = encode_trace(test_data, label=class_name)
+        else:
+            trace_json = json.dumps(test_data, indent=4, ensure_ascii=False)
+        steps = "\n".join(f"- {step}" for step in getattr(test_case, "steps", []) or [])
+        self.section = (
+            f"### {class_name} (file `{class_name}.java`)\n"
+            f"Test Case Steps:\n{steps}\n"
+            f"JSON test data:\n{trace_json}"
+        )
+        self.tokens = estimate_tokens(self.section)
+        self.codegen_hash = None
+
+
+def plan_batches(items: list, budget_tokens: int, max_cases: int):
+    """Group items by site and pack each group into batches that fit the prompt token budget.
+
+    Returns (batches, singles): items without a site host cannot share
+    support classes and are generated one by one. Items are packed largest
+    first into the first batch with room; one larger than the budget gets a
+    batch of its own.
+    """
+    groups, singles = {}, []
+    for item in items:
+        if item.site:
+            groups.setdefault(item.site, []).append(item)
+        else:
+            singles.append(item)
+    batches = []
+    for site_items in groups.values():
+        site_batches = []
+        for item in sorted(site_items, key=lambda i: i.tokens, reverse=True):
+            for batch in site_batches:
+                if len(batch) < max_cases and sum(i.tokens for i in batch) + item.tokens <= budget_tokens:
+                    batch.append(item)
+                    break
+            else:
+                site_batches.append([item])
+        batches.extend(site_batches)
+    return batches, singles
+
+
+def _record_generated(generator, item: CodegenItem):
+    get_run_manifest().record_codegen(item.test_case.name, item.codegen_hash, generator.output_path_for(item.test_case))
+
+
+async def _generate_single(generator, item: CodegenItem, scheduler: TestScheduler) -> str:
+    name = item.test_case.name
+    async with scheduler.llm_slot():
+        with usage_scope(test_case=name, stage="codegen"):
+            result = await generator.agenerate_test_from_data(item.test_data, item.test_case)
+    get_usage_tracker().save(name)
+    if result == generator.GENERATED_MESSAGE:
+        _record_generated(generator, item)
+    return result
+
+
+async def _generate_batch(generator, batch: list, scheduler: TestScheduler) -> dict:
+    async with scheduler.llm_slot():
+        try:
+            with usage_scope(stage="codegen") as scope:
+                missing = await generator.agenerate_batch_from_data(batch)
+        except Exception as e:
+            print(f"[Warning] Batch code generation for {batch[0].site} failed: {e}")
+            missing = list(batch)
+    # The batch call (and a first-time support generation) is split over the cases it covered
+    get_usage_tracker().distribute([item.test_case.name for item in batch], "codegen", scope.totals)
+    results = {}
+    for item in batch:
+        if item not in missing:
+            _record_generated(generator, item)
+            results[item.test_case.name] = generator.GENERATED_MESSAGE
+    if missing:
+        print(f"[Info] Falling back to per-test generation for {len(missing)} case(s) of {batch[0].site}.")
+        for item, result in zip(missing, await asyncio.gather(
+            *(_generate_single(generator, item, scheduler) for item in missing)
+        )):
+            results[item.test_case.name] = result
+    return results
+
+
+async def generate_suite(pairs: list, generator=None, budget_tokens: int = None, max_cases: int = None,
+                         scheduler: TestScheduler = None, force: bool = False) -> dict:
+    """Generate Java code for (test_case, test_data) pairs in site batches; return {test case name: message}
+
+    Cases whose trace and prompt inputs match the run manifest are skipped unless `force`.
+    """
+    from java_code_generator import JavaCodeGenerator
+
+    generator = generator or JavaCodeGenerator()
+    budget_tokens = budget_tokens or int(os.getenv("CODEGEN_BATCH_TOKENS", str(DEFAULT_BATCH_TOKENS)))
+    max_cases = max_cases or int(os.getenv("CODEGEN_BATCH_MAX_CASES", str(DEFAULT_BATCH_CASES)))
+    scheduler = scheduler or TestScheduler(durations_file=None)
+
+    manifest = get_run_manifest()
+    items, results = [], {}
+    for test_case, test_data in pairs:
+        codegen_hash = digest(case_definition(test_case), digest(test_data), generator.codegen_inputs(test_case, batch=True))
+        unchanged, reason = manifest.codegen_decision(test_case.name, codegen_hash)
+        if unchanged and not force:
+            manifest.summary.note("codegen_skipped", reason)
+            results[test_case.name] = f"Skipped: {reason}."
+            continue
+        manifest.summary.note("codegen_executed", "forced" if force else reason)
+        item = CodegenItem(test_case, test_data, generator.class_name_for(test_case), generator.compact_trace)
+        item.codegen_hash = codegen_hash
+        items.append(item)
+    batches, singles = plan_batches(items, budget_tokens, max_cases)
+    print(
+        f"[Info] Generating code for {len(items)} test case(s): {len(batches)} batch call(s), "
+        f"{len(singles)} single call(s), {len(results)} unchanged."
+    )
+    outcomes = await asyncio.gather(
+        *(_generate_batch(generator, batch, scheduler) for batch in batches),
+        *(_generate_single(generator, item, scheduler) for item in singles),
+    )
+    for batch_results in outcomes[:len(batches)]:
+        results.update(batch_results)
+    for item, result in zip(singles, outcomes[len(batches):]):
+        results[item.test_case.name] = result
+    return results
+
+
+def load_suite_data(**filters) -> list:
+    """(test_case, recorded actions) for the stored cases matching `filters` that have a recorded run"""
+    from replay import load_recorded_actions
+    from results_store import get_results_store
+    from test_cases.test_cases import iter_test_cases
+
+    store = get_results_store()
+    pairs = []
+    for test_case in iter_test_cases(**filters):
+        # Latest run of any status first, like per-test generation right after a run
+        test_data = store.latest_actions(test_case.name, status=None) or load_recorded_actions(test_case.name)
+        if test_data:
+            pairs.append((test_case, test_data))
+        else:
+            print(f"[Info] Skipping '{test_case.name}': no recorded run.")
+    return pairs
+
+
+async def _main_async(args) -> dict:
+    from http_clients import aclose_http_clients
+
+    filters = {key: value for key, value in (("host", args.host), ("name", args.name), ("tags", args.tag)) if value}
+    try:
+        return await generate_suite(load_suite_data(**filters), budget_tokens=args.budget, max_cases=args.max_cases,
+                                    force=args.force)
+    finally:
+        await aclose_http_clients()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Java code for recorded runs in per-site batches.")
+    parser.add_argument("--host", help="Only cases on this host")
+    parser.add_argument("--name", help="Only the case with this name")
+    parser.add_argument("--tag", action="append", help="Only cases with this tag (repeatable)")
+    parser.add_argument("--budget", type=int, default=None,
+                        help=f"Prompt token budget per batch (default: CODEGEN_BATCH_TOKENS or {DEFAULT_BATCH_TOKENS})")
+    parser.add_argument("--force", action="store_true", help="Regenerate code even when the manifest shows no change")
+    parser.add_argument("--max-cases", type=int, default=None,
+                        help=f"Test cases per batch (default: CODEGEN_BATCH_MAX_CASES or {DEFAULT_BATCH_CASES})")
+    args = parser.parse_args(argv)
+    results = asyncio.run(_main_async(args))
+    for name, message in results.items():
+        print(f"{name}: {message}")
+    print(f"[Info] Manifest: {format_skip_summary(get_run_manifest().summary.to_dict())}.")
+
+
+if __name__ == "__main__":
+    main()
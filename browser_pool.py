@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from browser_profile import BrowserProfile, get_browser_profile
+from tracing import span
+
+
+class PooledBrowser:
+    """A launched browser together with its usage bookkeeping"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.crashed = False
+
+    def is_alive(self) -> bool:
+        playwright_browser = getattr(self.browser, "playwright_browser", None)
+        if playwright_browser is None:
+            return not self.crashed
+        return not self.crashed and playwright_browser.is_connected()
+
+
+class BrowserPool:
+    """Long-lived pool of browsers that hands every test an isolated context.
+
+    Browsers are launched once (warm-up) and reused across test cases. Each
+    acquire opens a fresh BrowserContext, so cookies and storage never leak
+    between tests. A browser is recycled after `max_uses` acquisitions or as
+    soon as it is found disconnected. A browser that cannot be (re)launched
+    leaves an empty slot in the queue, which the next acquire launches
+    lazily, so a failed launch fails one test instead of shrinking the pool.
+    """
+
+    def __init__(self, size: int = None, max_uses: int = None, headless: bool = None,
+                 disable_security: bool = False, profile: BrowserProfile = None):
+        self.size = size or int(os.getenv("BROWSER_POOL_SIZE", "3"))
+        self.max_uses = max_uses or int(os.getenv("BROWSER_POOL_MAX_USES", "20"))
+        self.profile = profile or get_browser_profile()
+        self.headless = headless if headless is not None else self.profile.headless or os.getenv(
+            "BROWSER_HEADLESS", ""
+        ).strip().lower() in ("1", "true", "yes", "on")
+        self.disable_security = disable_security
+        self._idle: asyncio.Queue = None
+        self._all: list[PooledBrowser] = []
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._stats = {
+            "acquires": 0,
+            "reuses": 0,
+            "launched": 0,
+            "recycled": 0,
+            "crashed": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    async def _launch(self) -> PooledBrowser:
+        os.environ.setdefault("ANONYMIZED_TELEMETRY", "false")
+        from browser_use import Browser, BrowserConfig
+
+        with span("browser.launch", headless=self.headless):
+            browser = Browser(
+                config=BrowserConfig(
+                    headless=self.headless,
+                    disable_security=self.disable_security,
+                )
+            )
+            # Force the Chromium process to start now instead of on first use
+            await browser.get_playwright_browser()
+        self._stats["launched"] += 1
+        pooled = PooledBrowser(browser)
+        self._all.append(pooled)
+        return pooled
+
+    async def start(self):
+        """Launch `size` browsers up front so the first tests skip the cold start"""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._idle = asyncio.Queue()
+            launched = await asyncio.gather(
+                *(self._launch() for _ in range(self.size)), return_exceptions=True
+            )
+            for pooled in launched:
+                if isinstance(pooled, Exception):
+                    print(f"[Warning] Browser warm-up failed: {pooled}")
+                    pooled = None
+                self._idle.put_nowait(pooled)
+            if not self._all:
+                raise RuntimeError("Browser pool could not launch any browser.")
+            self._started = True
+            print(f"[Info] Browser pool warmed up with {len(self._all)} browser(s).")
+
+    async def _retire(self, pooled: PooledBrowser):
+        if pooled in self._all:
+            self._all.remove(pooled)
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            print(f"[Warning] Error closing pooled browser: {e}")
+
+    async def _release(self, pooled: PooledBrowser):
+        if not pooled.is_alive():
+            self._stats["crashed"] += 1
+            await self._retire(pooled)
+        elif pooled.uses >= self.max_uses:
+            self._stats["recycled"] += 1
+            await self._retire(pooled)
+        else:
+            self._idle.put_nowait(pooled)
+            return
+
+        try:
+            self._idle.put_nowait(await self._launch())
+        except Exception as e:
+            print(f"[Warning] Failed to replace pooled browser, will retry on next acquire: {e}")
+            self._idle.put_nowait(None)
+
+    async def _checkout(self) -> PooledBrowser:
+        pooled = await self._idle.get()
+        if pooled is None:
+            try:
+                pooled = await self._launch()
+            except Exception:
+                # Keep the slot so the next acquire tries again instead of waiting forever
+                self._idle.put_nowait(None)
+                raise
+        return pooled
+
+    @asynccontextmanager
+    async def acquire(self, context_config=None):
+        """Borrow a browser and yield a fresh, isolated BrowserContext on it"""
+        if not self._started:
+            await self.start()
+
+        wait_started = time.perf_counter()
+        pooled = await self._checkout()
+        waited = time.perf_counter() - wait_started
+        self._stats["acquires"] += 1
+        self._stats["total_wait"] += waited
+        self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+        if pooled.uses > 0:
+            self._stats["reuses"] += 1
+        pooled.uses += 1
+
+        context = None
+        try:
+            context = await pooled.browser.new_context(context_config or self.profile.context_config())
+            try:
+                await self.profile.apply(context)
+            except Exception as e:
+                print(f"[Warning] Could not apply browser profile '{self.profile.name}': {e}")
+            yield context
+        except Exception:
+            if not pooled.is_alive():
+                pooled.crashed = True
+            raise
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    print(f"[Warning] Error closing browser context: {e}")
+                    pooled.crashed = not pooled.is_alive()
+            await self._release(pooled)
+
+    def stats(self) -> dict:
+        """Return acquire wait times and reuse counters"""
+        acquires = self._stats["acquires"]
+        return {
+            **self._stats,
+            "avg_wait": self._stats["total_wait"] / acquires if acquires else 0.0,
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle else 0,
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(
+            f"[Info] Browser pool: {stats['acquires']} acquires, {stats['reuses']} reuses, "
+            f"{stats['launched']} launched, {stats['recycled']} recycled, {stats['crashed']} crashed, "
+            f"avg wait {stats['avg_wait']:.2f}s, max wait {stats['max_wait']:.2f}s"
+        )
+        self.profile.metrics.print_stats(self.profile.name)
+
+    async def close(self):
+        """Close every browser owned by the pool"""
+        for pooled in list(self._all):
+            await self._retire(pooled)
+        self._started = False
+
+
+_pools: dict = {}
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the pool bound to the running event loop, creating it if needed.
+
+    Playwright objects belong to the loop that created them, so each loop
+    (e.g. each asyncio.run call) gets its own pool.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        for stale_loop in [l for l in _pools if l.is_closed()]:
+            del _pools[stale_loop]
+        pool = BrowserPool()
+        _pools[loop] = pool
+    return pool
+
+
+async def close_browser_pool():
+    """Close and forget the pool bound to the running event loop"""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        pool.print_stats()
+        await pool.close()
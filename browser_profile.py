@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+PROFILES = ("default", "performance")
+DEFAULT_METRICS_FILE = os.path.join("results", "browser_profiles.json")
+
+# Ad, analytics and session-recording hosts; they never matter for a functional test
+DEFAULT_BLOCKED_DOMAINS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "mixpanel.com",
+    "scorecardresearch.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "adnxs.com",
+    "nr-data.net",
+)
+# Media never affects what the agent can click; images and fonts are opt-in since pages may depend on them
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("media",)
+DEFAULT_VIEWPORT = (1280, 720)
+
+
+def _env_list(name: str, default) -> tuple:
+    value = os.getenv(name)
+    if value is None:
+        return tuple(default)
+    return tuple(item.strip().lower() for item in value.split(",") if item.strip())
+
+
+def _parse_viewport(value: str):
+    try:
+        width, height = value.lower().split("x", 1)
+        return int(width), int(height)
+    except (AttributeError, ValueError):
+        print(f"[Warning] Invalid BROWSER_VIEWPORT '{value}', expected WIDTHxHEIGHT.")
+        return DEFAULT_VIEWPORT
+
+
+def per_page(stats: dict) -> dict:
+    """Load time, requests and transfer per page load; comparable between runs of different sizes"""
+    pages = stats.get("page_loads") or 0
+    return {
+        "avg_load_ms": stats.get("total_load_ms", 0.0) / pages if pages else 0.0,
+        "requests": stats.get("requests", 0) / pages if pages else 0.0,
+        "blocked_requests": stats.get("blocked_requests", 0) / pages if pages else 0.0,
+        "kb": stats.get("bytes", 0) / 1024 / pages if pages else 0.0,
+    }
+
+
+def compare_profiles(default: dict, performance: dict) -> list:
+    """Report lines for the performance profile against the default one, per page load"""
+    if not default.get("page_loads") or not performance.get("page_loads"):
+        return ["Not enough page loads under both profiles to compare."]
+    before, after = per_page(default), per_page(performance)
+    lines = [f"{default['page_loads']} page load(s) with 'default', {performance['page_loads']} with 'performance'"]
+    for key, label, unit in (("avg_load_ms", "avg load", "ms"), ("requests", "requests/page", ""),
+                             ("blocked_requests", "blocked/page", ""), ("kb", "transfer/page", "KB")):
+        change = f" ({(after[key] - before[key]) / before[key]:+.0%})" if before[key] else ""
+        lines.append(f"{label}: {before[key]:.1f}{unit} -> {after[key]:.1f}{unit}{change}")
+    return lines
+
+
+def load_profile_metrics(path: str = DEFAULT_METRICS_FILE) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def record_profile_metrics(name: str, stats: dict, path: str = DEFAULT_METRICS_FILE) -> dict:
+    """Keep the latest page metrics of profile `name` next to the other profile's; return all recorded"""
+    recorded = load_profile_metrics(path)
+    if stats.get("page_loads"):
+        # Worker stats arrive summed, so the average is recomputed from the totals
+        recorded[name] = {**stats, "avg_load_ms": per_page(stats)["avg_load_ms"], "recorded_at": time.time()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(recorded, f, indent=4)
+    return recorded
+
+
+def print_profile_comparison(recorded: dict):
+    if "default" in recorded and "performance" in recorded:
+        print("[Info] Browser profile comparison, performance vs default:")
+        for line in compare_profiles(recorded["default"], recorded["performance"]):
+            print(f"       {line}")
+
+
+class PageMetrics:
+    """Page load time, request and transfer counters across every pooled browser context"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"page_loads": 0, "total_load_ms": 0.0, "requests": 0, "blocked_requests": 0, "bytes": 0}
+
+    def add(self, key: str, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_load_ms"] = stats["total_load_ms"] / stats["page_loads"] if stats["page_loads"] else 0.0
+        return stats
+
+    def print_stats(self, profile_name: str):
+        stats = self.stats()
+        print(
+            f"[Info] Browser profile '{profile_name}': {stats['page_loads']} page loads, "
+            f"avg load {stats['avg_load_ms']:.0f}ms, {stats['requests']} requests "
+            f"({stats['blocked_requests']} blocked), {stats['bytes'] / 1024 / 1024:.1f} MB transferred"
+        )
+
+
+class BrowserProfile:
+    """How pooled browsers are launched and what their contexts load.
+
+    The "default" profile matches the historic behaviour (headed, browser_use's
+    window size, nothing blocked). The "performance" profile runs headless
+    with a fixed viewport and aborts requests for the blocked resource types
+    and ad/analytics domains. Both record page load time and bytes so the
+    profiles can be compared.
+    """
+
+    def __init__(self, name: str = None):
+        self.name = (name or os.getenv("BROWSER_PROFILE", "default")).strip().lower()
+        if self.name not in PROFILES:
+            print(f"[Warning] Unknown BROWSER_PROFILE '{self.name}', using 'default'.")
+            self.name = "default"
+        performance = self.name == "performance"
+        self.headless = performance
+        viewport = os.getenv("BROWSER_VIEWPORT")
+        self.viewport = _parse_viewport(viewport) if viewport else (DEFAULT_VIEWPORT if performance else None)
+        self.blocked_resource_types = frozenset(
+            _env_list("BROWSER_BLOCK_RESOURCE_TYPES", DEFAULT_BLOCKED_RESOURCE_TYPES if performance else ())
+        )
+        self.blocked_domains = _env_list("BROWSER_BLOCK_DOMAINS", DEFAULT_BLOCKED_DOMAINS if performance else ())
+        self.metrics = PageMetrics()
+
+    def context_config(self):
+        from browser_use.browser.context import BrowserContextConfig
+
+        if self.viewport is None:
+            return BrowserContextConfig()
+        width, height = self.viewport
+        if "window_width" in getattr(BrowserContextConfig, "model_fields", {}):
+            # browser_use >= 0.1.45 renamed the size fields and only applies them as viewport with no_viewport off
+            return BrowserContextConfig(window_width=width, window_height=height, no_viewport=False)
+        return BrowserContextConfig(browser_window_size={"width": width, "height": height})
+
+    def is_blocked(self, url: str, resource_type: str) -> bool:
+        if resource_type in self.blocked_resource_types:
+            return True
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == domain or host.endswith("." + domain) for domain in self.blocked_domains)
+
+    async def _route(self, route):
+        request = route.request
+        if self.is_blocked(request.url, request.resource_type):
+            self.metrics.add("blocked_requests")
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    async def _on_request_finished(self, request):
+        self.metrics.add("requests")
+        try:
+            sizes = await request.sizes()
+            self.metrics.add("bytes", sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0))
+        except Exception:
+            pass
+
+    def _watch_page(self, page):
+        navigation_started = {}
+
+        def on_request(request):
+            if request.is_navigation_request() and request.frame == page.main_frame:
+                navigation_started["at"] = time.perf_counter()
+
+        def on_load(_):
+            started = navigation_started.pop("at", None)
+            if started is not None:
+                self.metrics.add("page_loads")
+                self.metrics.add("total_load_ms", (time.perf_counter() - started) * 1000)
+
+        page.on("request", on_request)
+        page.on("load", on_load)
+
+    async def apply(self, browser_context):
+        """Install request blocking and page metrics on a browser_use BrowserContext"""
+        session = await browser_context.get_session()
+        playwright_context = session.context
+        if self.blocked_resource_types or self.blocked_domains:
+            await playwright_context.route("**/*", self._route)
+        playwright_context.on("requestfinished", self._on_request_finished)
+        playwright_context.on("page", self._watch_page)
+        for page in playwright_context.pages:
+            self._watch_page(page)
+
+
+_profile = None
+_profile_lock = threading.Lock()
+
+
+def get_browser_profile() -> BrowserProfile:
+    """Return the process-wide browser profile selected by BROWSER_PROFILE"""
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            _profile = BrowserProfile()
+        return _profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the page metrics of the last suite run under each browser profile."
+    )
+    parser.add_argument("--metrics", default=DEFAULT_METRICS_FILE, help="Metrics file written by test_runner.py")
+    args = parser.parse_args(argv)
+    recorded = load_profile_metrics(args.metrics)
+    missing = [name for name in PROFILES if name not in recorded]
+    if missing:
+        print(f"[Info] No recorded run with BROWSER_PROFILE={', '.join(missing)} in {args.metrics}; "
+              f"run test_runner.py once with each profile.")
+        return 1
+    print_profile_comparison(recorded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
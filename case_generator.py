@@ -1,31 +1,55 @@
+import argparse
 import json
 import os
-import httpx
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import AzureOpenAI
-from pydantic import SecretStr
-from test_runner import run_tests
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from llm_cache import get_llm_cache
+from rate_limiter import llm_max_retries
+from llm_usage import get_usage_tracker, usage_scope
 import asyncio
 
+load_dotenv()
+
 
 
 
 class CaseGenerator:
-    def __init__ (self,llm=None):
+    def __init__ (self,llm=None, use_cache: bool = True):
         """Initialize the Java code generator with an optional LLM"""
         self.llm = llm
+        self.use_cache = use_cache
+        self.cache = get_llm_cache()
         if not llm:
+            # Heavy client libraries are imported only when a default LLM is actually needed
+            from langchain_openai import AzureOpenAI
+            from http_clients import get_http_client
+
             # Create a default LLM if none is provided
             self.llm = AzureOpenAI(
             api_version="2024-12-01-preview",
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             api_key=os.getenv("AZURE_OPENAI_KEY"),
-            http_client=httpx.Client(verify=False),
+            http_client=get_http_client(),
+            max_retries=llm_max_retries(),
             
         )
     def send_request_to_llm(self, prompt: str):
         """Send a request to the LLM and return the response"""
+        cache_key = self.cache.make_key(
+            getattr(self.llm, "model_name", None) or type(self.llm).__name__,
+            getattr(self.llm, "deployment_name", None),
+            prompt,
+            temperature=getattr(self.llm, "temperature", None),
+            max_tokens=getattr(self.llm, "max_tokens", None),
+            api_version=getattr(self.llm, "openai_api_version", None),
+        )
         try:
+            cached = self.cache.get(cache_key) if self.use_cache else None
+            if cached is not None:
+                print("[Info] LLM cache hit for case generation prompt.")
+                return cached
+
             response = self.llm.invoke(prompt)
 
             # Extract content if it's in an object
@@ -47,6 +71,8 @@ class CaseGenerator:
                 # Debugging: Print raw response
                 print("🔹 Raw Response from LLM:\n", response)
 
+                if self.use_cache:
+                    self.cache.set(cache_key, response)
                 return response
             else:
                 print(f"❌ Unexpected response type: {type(response)}")
@@ -63,32 +89,114 @@ async def get_case_details_from_user():
         number_of_cases=input("How many test cases do you want to generate? :")
         prompt=get_case_generator_prompt(url,brief,number_of_cases)
         generator=CaseGenerator()
-        save_output_as_json(generator.send_request_to_llm(prompt=prompt),"")
-        user_input = input("Do you want to perform the first three tests and generate selenium codes? (yes/no): ")
+        with usage_scope(stage="case_generation") as scope:
+            output = generator.send_request_to_llm(prompt=prompt)
+        test_cases = save_output_as_json(output,"")
+        _attribute_case_generation_usage(test_cases, scope)
+        user_input = input("Do you want to perform the tests and generate selenium codes? (yes/no): ")
         if user_input.lower() == "yes":
+            from test_runner import run_tests
+
             await run_tests()
         else:
             print("Exiting...")
 
 
+def _attribute_case_generation_usage(test_cases, scope):
+    """Persist the generation cost of a prompt, split over the test cases it produced"""
+    names = [case.get("name") for case in test_cases or [] if isinstance(case, dict) and case.get("name")]
+    get_usage_tracker().distribute(names, "case_generation", scope.totals)
+
+
 def save_output_as_json(output, filename):
-    """Save the output to a JSON file"""
+    """Append the generated test cases to the test case store and return them"""
+    from test_cases.test_case_store import get_test_case_store
+
     try:
         if not output:
             print("❌ No response received from LLM.")
             return
         
         test_cases = json.loads(output)
+        if isinstance(test_cases, dict):
+            test_cases = [test_cases]
 
-        filename = "test_cases.json"  # Set a default filename
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(test_cases, f, indent=4, ensure_ascii=False)
-
-        print(f"✅ Test cases saved to {filename}")
+        # Earlier cases stay in the store; a case with the same name is updated in place
+        store = get_test_case_store()
+        saved = store.add(test_cases)
+        print(f"✅ {saved} test case(s) saved to {store.path}")
+        return test_cases
     except json.JSONDecodeError as e:
         print(f"❌ Failed to parse response as JSON: {e}")
  
 
+def _generate_batch_item(generator, index, item):
+    url = item.get("url")
+    brief = item.get("brief")
+    number_of_cases = item.get("number_of_cases", 1)
+    result = {"index": index, "url": url, "brief": brief}
+    if not url:
+        return {**result, "status": "error", "error": "Missing required parameter 'url'"}
+    try:
+        with usage_scope(stage="case_generation") as scope:
+            response = generator.send_request_to_llm(
+                prompt=get_case_generator_prompt(url, brief, number_of_cases)
+            )
+        if not response:
+            return {**result, "status": "error", "error": "No response received from LLM"}
+        test_cases = json.loads(response)
+        _attribute_case_generation_usage(test_cases, scope)
+        return {**result, "status": "ok", "test_cases": test_cases}
+    except json.JSONDecodeError as e:
+        return {**result, "status": "error", "error": f"Failed to parse response: {e}"}
+    except Exception as e:
+        return {**result, "status": "error", "error": str(e)}
+
+
+def generate_test_cases_batch(items, concurrency=None, generator=None):
+    """Generate test cases for many {url, brief, number_of_cases} items concurrently.
+
+    Yields one result dict per item as soon as it completes (not in input
+    order; use the "index" field). A failing item yields an "error" result
+    and never stops the others.
+    """
+    concurrency = concurrency or int(os.getenv("CASE_GENERATION_CONCURRENCY", "8"))
+    generator = generator or CaseGenerator()
+    items = list(items)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items) or 1))) as executor:
+        futures = [
+            executor.submit(_generate_batch_item, generator, index, item)
+            for index, item in enumerate(items)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batch_cli(argv=None):
+    """Command line entry point: fan out a JSON list of {url, brief, number_of_cases} items"""
+    parser = argparse.ArgumentParser(description="Generate test cases for many URL/brief pairs at once.")
+    parser.add_argument("--batch", required=True, help="JSON file with a list of {url, brief, number_of_cases} items")
+    parser.add_argument("--concurrency", type=int, default=None, help="Maximum concurrent LLM requests")
+    parser.add_argument("--output", default=None, help="Write results as JSON lines to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    with open(args.batch, "r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    try:
+        for result in generate_test_cases_batch(items, args.concurrency):
+            failed += result["status"] != "ok"
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+    print(f"✅ {len(items) - failed}/{len(items)} item(s) generated, {failed} failed.", file=sys.stderr)
+    return 1 if failed else 0
+
+
 def get_case_generator_prompt(website_url, brief, number_of_cases=1):
     prompt = f"""
     I need EXACTLY {number_of_cases} test case(s) that specifically test this requirement:
@@ -129,4 +237,6 @@ def get_case_generator_prompt(website_url, brief, number_of_cases=1):
     return prompt
     
 if __name__=="__main__":
-        asyncio.run(get_case_details_from_user())    
\ No newline at end of file
+    if len(sys.argv) > 1:
+        sys.exit(run_batch_cli())
+    asyncio.run(get_case_details_from_user())    
\ No newline at end of file
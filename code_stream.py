@@ -0,0 +1,129 @@
+import os
+import tempfile
+import time
+
+# Enough characters to always contain a closing "```" fence plus surrounding whitespace
+_TAIL_HOLDBACK = 16
+
+
+def _umask() -> int:
+    # os.umask can only be read by setting it; done once at import, before any worker threads exist
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp creates 0600 files; generated code gets the mode a plain open() would give it
+_FILE_MODE = 0o666 & ~_umask()
+
+
+class FenceStripper:
+    """Removes a leading ```lang fence and a trailing ``` fence from streamed text.
+
+    The head is buffered until it is clear whether the completion starts
+    with a fence, and the last few characters are always held back so the
+    closing fence can be dropped once the stream ends.
+    """
+
+    def __init__(self):
+        self._head = ""
+        self._head_done = False
+        self._tail = ""
+
+    def feed(self, text: str) -> str:
+        """Consume a streamed chunk and return the text that is safe to write"""
+        if not self._head_done:
+            self._head += text
+            stripped = self._head.lstrip()
+            if not stripped or "```".startswith(stripped):
+                return ""
+            if stripped.startswith("```"):
+                newline = stripped.find("\n")
+                if newline == -1:
+                    return ""
+                stripped = stripped[newline + 1:].lstrip()
+                if not stripped:
+                    return ""
+            self._head_done = True
+            text = stripped
+
+        buffered = self._tail + text
+        cut = max(0, len(buffered) - _TAIL_HOLDBACK)
+        self._tail = buffered[cut:]
+        return buffered[:cut]
+
+    def finish(self) -> str:
+        """Return the held-back tail without the closing fence"""
+        tail = (self._tail if self._head_done else "").rstrip()
+        if tail.endswith("```"):
+            tail = tail[:-3].rstrip()
+        return tail
+
+
+class StreamingCodeWriter:
+    """Writes streamed code to a temporary file and moves it into place atomically.
+
+    The temporary file lives next to the target so `os.replace` is a rename
+    on the same filesystem; readers never see a half-written `.java` file.
+    """
+
+    def __init__(self, target_path: str):
+        self.target_path = target_path
+        directory = os.path.dirname(target_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{os.path.basename(target_path)}.", suffix=".part"
+        )
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+        self._stripper = FenceStripper()
+        self._raw_parts = []
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.chars_written = 0
+
+    def write(self, delta: str):
+        if not delta:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self._raw_parts.append(delta)
+        text = self._stripper.feed(delta)
+        if text:
+            self._file.write(text)
+            self._file.flush()
+            self.chars_written += len(text)
+
+    def commit(self):
+        """Finish the file, rename it into place and return the raw completion.
+
+        When no code was streamed the partial file is discarded, the target is
+        left untouched and None is returned.
+        """
+        tail = self._stripper.finish()
+        if not self.chars_written and not tail.strip():
+            self.abort()
+            self.finished_at = time.perf_counter()
+            return None
+        self._file.write(tail + "\n")
+        self.chars_written += len(tail) + 1
+        self._file.close()
+        os.chmod(self.temp_path, _FILE_MODE)
+        os.replace(self.temp_path, self.target_path)
+        self.finished_at = time.perf_counter()
+        return "".join(self._raw_parts)
+
+    def abort(self):
+        """Discard the partial file"""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def stats(self) -> dict:
+        end = self.finished_at or time.perf_counter()
+        return {
+            "time_to_first_token": (self.first_token_at - self.started_at) if self.first_token_at else None,
+            "duration": end - self.started_at,
+            "chars": self.chars_written,
+        }
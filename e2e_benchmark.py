@@ -0,0 +1,453 @@
+import argparse
+import asyncio
+import functools
+import importlib.util
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_SITE_DIR = os.path.join(REPO_DIR, "benchmarks", "fixture_site")
+DEFAULT_CONCURRENCY = [1, 2, 4]
+
+_STEP_MARKER = "benchmark-step"
+_URL_PATTERN = re.compile(r"http://127\.0\.0\.1:\d+/[^\s'\"\\<>]*")
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def scripted_agent_output(messages: list) -> dict:
+    """Canned browser_use AgentOutput for the fixture login flow, chosen by how many steps were taken"""
+    # Count only our own earlier answers; browser_use also seeds the history with an example tool call
+    step = sum(
+        json.dumps(message.get("tool_calls") or []).count(_STEP_MARKER)
+        for message in messages if message.get("role") == "assistant"
+    )
+    texts = [_message_text(message) for message in messages]
+    state = texts[-1] if texts else ""
+    brain = {"page_summary": "", "evaluation_previous_goal": "Success", "memory": f"{_STEP_MARKER} {step}", "next_goal": ""}
+
+    if step == 0:
+        urls = [match for text in texts for match in _URL_PATTERN.findall(text)]
+        if urls:
+            brain["next_goal"] = "Open the fixture site"
+            return {"current_state": brain, "action": [{"go_to_url": {"url": urls[0]}}]}
+    inputs = re.findall(r"\[(\d+)\]<input", state)
+    buttons = re.findall(r"\[(\d+)\]<button", state)
+    if step == 1 and inputs:
+        brain["next_goal"] = "Enter the username"
+        return {"current_state": brain, "action": [{"input_text": {"index": int(inputs[0]), "text": "bench-user"}}]}
+    if step == 2 and buttons:
+        brain["next_goal"] = "Sign in"
+        return {"current_state": brain, "action": [{"click_element": {"index": int(buttons[0])}}]}
+    brain["next_goal"] = "Finish"
+    return {"current_state": brain, "action": [{"done": {"text": "Dashboard reached", "success": True}}]}
+
+
+def scripted_java_code(messages: list) -> str:
+    match = re.search(r"Class name: (\w+)", "\n".join(_message_text(m) for m in messages))
+    class_name = match.group(1) if match else "GeneratedTest"
+    return (
+        "```java\n"
+        "import org.testng.annotations.Test;\n\n"
+        f"public class {class_name} {{\n"
+        "    @Test\n"
+        "    public void run() {\n"
+        "        // generated by the benchmark stand-in model\n"
+        "    }\n"
+        "}\n"
+        "```"
+    )
+
+
+class FakeAzureOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal Azure OpenAI chat/completions endpoint that answers from a script.
+
+    Tool-calling requests (the browser_use agent) get the next step of the
+    fixture login flow; plain requests (code generation) get a small Java
+    class. Streaming is supported for the code generator's streaming path.
+    """
+
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, content: str, usage: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        chunks = [content[i:i + 40] for i in range(0, len(content), 40)]
+        for chunk in chunks:
+            event = {"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()), "model": "gpt-4o",
+                     "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        final = {"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()), "model": "gpt-4o",
+                 "choices": [], "usage": usage}
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.close_connection = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+        messages = payload.get("messages") or []
+        prompt_tokens = sum(len(_message_text(m)) for m in messages) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": 60, "total_tokens": prompt_tokens + 60,
+                 "prompt_tokens_details": {"cached_tokens": 0}}
+        response = {"id": "bench", "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o",
+                    "usage": usage}
+
+        if payload.get("tools"):
+            tool_name = payload["tools"][0]["function"]["name"]
+            arguments = json.dumps(scripted_agent_output(messages))
+            response["choices"] = [{"index": 0, "finish_reason": "tool_calls", "message": {
+                "role": "assistant", "content": None,
+                "tool_calls": [{"id": f"call_{time.time_ns()}", "type": "function",
+                                "function": {"name": tool_name, "arguments": arguments}}],
+            }}]
+        elif self.path.split("?")[0].endswith("/chat/completions"):
+            code = scripted_java_code(messages)
+            if payload.get("stream"):
+                return self._send_stream(code, usage)
+            response["choices"] = [{"index": 0, "finish_reason": "stop",
+                                    "message": {"role": "assistant", "content": code}}]
+        else:
+            response["object"] = "text_completion"
+            response["choices"] = [{"index": 0, "finish_reason": "stop", "text": "[]"}]
+        self._send_json(response)
+
+
+class _QuietStaticHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fixture_test_cases(site_url: str, count: int) -> list:
+    return [
+        {
+            "name": f"Benchmark Login {index + 1}",
+            "description": "Sign in to the benchmark shop and reach the dashboard",
+            "steps": [
+                f"Open the browser and go to '{site_url}/index.html'",
+                "Enter 'bench-user' in the username field",
+                "Click the 'Sign in' button",
+            ],
+            "url": f"{site_url}/index.html",
+            "expected_result": "The dashboard page is shown",
+        }
+        for index in range(count)
+    ]
+
+
+class _RssSampler:
+    """Peak resident memory of the benchmark child's process tree, sampled with psutil.
+
+    Without psutil only ru_maxrss of the largest single child process is
+    available; that excludes the browsers and is labelled "largest child only".
+    """
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if importlib.util.find_spec("psutil") is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        import psutil
+
+        try:
+            root = psutil.Process(self.pid)
+        except psutil.Error:
+            return
+        while not self._stop.is_set():
+            total = 0
+            try:
+                for process in [root] + root.children(recursive=True):
+                    try:
+                        total += process.memory_info().rss
+                    except psutil.Error:
+                        pass
+            except psutil.Error:
+                break
+            self.peak_bytes = max(self.peak_bytes, total)
+            self._stop.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            return {"peak_rss_mb": round(self.peak_bytes / 1024 / 1024, 1), "rss_source": "process tree"}
+        # ru_maxrss is in kilobytes on Linux and covers the largest single child process
+        max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return {"peak_rss_mb": round(max_rss / 1024, 1), "rss_source": "largest child only"}
+
+
+def run_level(target: str, concurrency: int, cases: int, site_url: str, llm_url: str, timeout: float,
+              profile: str = "default") -> dict:
+    """Run one benchmark level in a fresh interpreter and working directory"""
+    from tracing import summarize_files
+
+    workdir = tempfile.mkdtemp(prefix=f"bench-{target}-{profile}-{concurrency}-")
+    with open(os.path.join(workdir, "test_cases.json"), "w", encoding="utf-8") as f:
+        json.dump(fixture_test_cases(site_url, cases), f, indent=4)
+    trace_path = os.path.join(workdir, "trace.jsonl")
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])),
+        "AZURE_OPENAI_ENDPOINT": llm_url,
+        "AZURE_OPENAI_KEY": "benchmark",
+        "ANONYMIZED_TELEMETRY": "false",
+        "BROWSER_HEADLESS": "1",
+        "BROWSER_PROFILE": profile,
+        "BROWSER_POOL_SIZE": str(concurrency),
+        "MAX_CONCURRENT_BROWSERS": str(concurrency),
+        "MAX_CONCURRENT_LLM_CALLS": str(concurrency),
+        "LLM_CACHE_DISABLED": "1",
+        "STEP_MEMO_ENABLED": "0",
+        "AZURE_OPENAI_RPM": "0",
+        "AZURE_OPENAI_TPM": "0",
+        "TRACING_ENABLED": "1",
+        "TRACE_PATH": trace_path,
+        "TRACE_METRICS_PATH": os.path.join(workdir, "trace_metrics.prom"),
+    }
+    summary_path = os.path.join(workdir, "summary.json")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--child", target, "--summary", summary_path],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    sampler = _RssSampler(proc.pid)
+    try:
+        _, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        _, stderr = proc.communicate()
+    memory = sampler.stop()
+
+    result = {"target": target, "profile": profile, "concurrency": concurrency, "cases": cases, "workdir": workdir,
+              **memory}
+    try:
+        with open(summary_path, "r", encoding="utf-8") as f:
+            result.update(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        lines = (stderr or "").strip().splitlines()
+        result["error"] = lines[-1] if lines else f"benchmark child exited with {proc.returncode}"
+        return result
+    if os.path.exists(trace_path):
+        result["phases"] = {
+            name: {"count": stats["count"], "p50": round(stats["p50"], 4), "p95": round(stats["p95"], 4)}
+            for name, stats in summarize_files([trace_path]).items()
+        }
+    return result
+
+
+def _recorded_outcomes(test_names: list) -> list:
+    """Whether the newest run recorded for each test passed; a finished job is not necessarily a passed test"""
+    from results_store import get_results_store
+
+    store = get_results_store()
+    outcomes = []
+    for name in test_names:
+        runs = store.last_runs(name, 1)
+        outcomes.append(bool(runs) and runs[0]["status"] == "passed")
+    return outcomes
+
+
+async def _run_runner_target() -> list:
+    from test_runner import run_tests
+
+    return _recorded_outcomes([entry["test_case"] for entry in await run_tests()])
+
+
+def _run_api_target() -> list:
+    from api import app
+    from jobs import get_job_manager
+    from test_cases.test_cases import load_test_cases
+
+    client = app.test_client()
+    job_ids = []
+    test_cases = load_test_cases()
+    for test_case in test_cases:
+        response = client.post("/api/jobs/run-test", json={"test_case": test_case.model_dump()})
+        job_ids.append(response.get_json()["job_id"])
+    for job_id in job_ids:
+        while client.get(f"/api/jobs/{job_id}/result").status_code == 202:
+            time.sleep(0.1)
+    get_job_manager().shutdown()
+    return _recorded_outcomes([test_case.name for test_case in test_cases])
+
+
+def _child(target: str, summary_path: str):
+    from browser_profile import get_browser_profile
+
+    started = time.perf_counter()
+    outcomes = asyncio.run(_run_runner_target()) if target == "runner" else _run_api_target()
+    elapsed = time.perf_counter() - started
+    passed = sum(outcomes)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "passed": passed,
+            "failed": len(outcomes) - passed,
+            "elapsed_seconds": round(elapsed, 3),
+            "tests_per_minute": round(len(outcomes) * 60 / elapsed, 2) if elapsed else 0.0,
+            "pages": get_browser_profile().metrics.stats(),
+        }, f, indent=4)
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Regressions against a previous run: lower throughput, slower phase p95 or higher peak RSS"""
+    def key(level):
+        return level["target"], level.get("profile", "default"), level["concurrency"]
+
+    previous = {key(level): level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in results:
+        before = previous.get(key(level))
+        if not before or "error" in level or "error" in before:
+            continue
+        label = f"{level['target']}/{level['profile']} x{level['concurrency']}"
+        if before.get("tests_per_minute") and level["tests_per_minute"] < before["tests_per_minute"] * (1 - tolerance):
+            regressions.append(f"{label}: tests/min {before['tests_per_minute']} -> {level['tests_per_minute']}")
+        same_rss_source = before.get("rss_source") == level.get("rss_source")
+        if same_rss_source and before.get("peak_rss_mb") and level["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{label}: peak RSS {before['peak_rss_mb']}MB -> {level['peak_rss_mb']}MB")
+        for phase, stats in level.get("phases", {}).items():
+            old = before.get("phases", {}).get(phase)
+            if old and old["p95"] and stats["p95"] > old["p95"] * (1 + tolerance):
+                regressions.append(f"{label}: {phase} p95 {old['p95']:.3f}s -> {stats['p95']:.3f}s")
+    return regressions
+
+
+def print_profile_comparisons(results: list):
+    """Performance profile against default for every target and concurrency run under both"""
+    from browser_profile import compare_profiles
+
+    levels = {(level["target"], level["concurrency"], level["profile"]): level
+              for level in results if "error" not in level}
+    for (target, concurrency, profile), level in levels.items():
+        default = levels.get((target, concurrency, "default"))
+        if profile != "performance" or default is None:
+            continue
+        print(f"\nperformance vs default, {target} x{concurrency}:")
+        print(f"  tests/min: {default['tests_per_minute']:.1f} -> {level['tests_per_minute']:.1f}")
+        for line in compare_profiles(default.get("pages", {}), level.get("pages", {})):
+            print(f"  {line}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmark against a local fixture site and a scripted stand-in LLM."
+    )
+    parser.add_argument("--target", choices=["runner", "api", "both"], default="runner",
+                        help="Benchmark test_runner.run_tests, the api.py job endpoints, or both")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--profile", nargs="+", choices=["default", "performance"], default=["default"],
+                        help="Browser profiles to compare (see BROWSER_PROFILE)")
+    parser.add_argument("--cases", type=int, default=8, help="Test cases per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds the fake LLM waits per request")
+    parser.add_argument("--timeout", type=float, default=900, help="Seconds allowed per level")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON file from a previous --output run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression before flagging (0.2 = 20%%)")
+    parser.add_argument("--child", choices=["runner", "api"], help=argparse.SUPPRESS)
+    parser.add_argument("--summary", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child, args.summary)
+        return 0
+
+    site = _serve(functools.partial(_QuietStaticHandler, directory=FIXTURE_SITE_DIR))
+    FakeAzureOpenAIHandler.latency = args.llm_latency
+    llm = _serve(FakeAzureOpenAIHandler)
+    site_url = f"http://127.0.0.1:{site.server_address[1]}"
+    llm_url = f"http://127.0.0.1:{llm.server_address[1]}"
+    targets = ["runner", "api"] if args.target == "both" else [args.target]
+
+    results = []
+    try:
+        for target in targets:
+            for profile in args.profile:
+                for concurrency in args.concurrency:
+                    print(f"[Info] Benchmarking {target} ({profile} profile) with concurrency {concurrency} "
+                          f"({args.cases} cases)...")
+                    results.append(run_level(target, concurrency, args.cases, site_url, llm_url, args.timeout, profile))
+    finally:
+        site.shutdown()
+        llm.shutdown()
+
+    print(
+        f"\n{'target':<8}{'profile':<13}{'conc':>6}{'passed':>8}{'tests/min':>11}{'peak RSS':>11}"
+        f"{'avg load':>10}{'transfer':>10}  slowest phases (p95)"
+    )
+    for level in results:
+        if "error" in level:
+            print(f"{level['target']:<8}{level['profile']:<13}{level['concurrency']:>6}  failed: {level['error']}")
+            continue
+        pages = level.get("pages", {})
+        slowest = sorted(
+            ((name, stats) for name, stats in level.get("phases", {}).items() if name != "test_case"),
+            key=lambda item: item[1]["p95"], reverse=True,
+        )[:3]
+        phases = ", ".join(f"{name} {stats['p95']:.2f}s" for name, stats in slowest)
+        print(
+            f"{level['target']:<8}{level['profile']:<13}{level['concurrency']:>6}{level['passed']:>5}/{level['cases']:<2}"
+            f"{level['tests_per_minute']:>11.1f}{level['peak_rss_mb']:>9.0f}MB"
+            f"{pages.get('avg_load_ms', 0):>8.0f}ms{pages.get('bytes', 0) / 1024 / 1024:>8.1f}MB  {phases}"
+        )
+    if any(level.get("rss_source") == "largest child only" for level in results):
+        print("[Warning] psutil is not installed: peak RSS is the largest single child process, not the browsers "
+              "and the rest of the process tree.")
+    print_profile_comparisons(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": {"cases": args.cases, "llm_latency": args.llm_latency}, "levels": results}, f, indent=4)
+        print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            return 1
+        print("✅ No regressions against the baseline.")
+    return 1 if any("error" in level for level in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import asyncio
+import atexit
+import importlib.util
+import os
+import threading
+
+import httpx
+
+from rate_limiter import get_rate_limiter
+from tracing import get_tracer
+from llm_usage import get_usage_tracker
+
+DEFAULT_CLIENT = "azure-openai"
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "90")),
+    )
+
+
+def _http2_enabled() -> bool:
+    if not _env_flag("HTTP2_ENABLED"):
+        return False
+    if importlib.util.find_spec("h2") is None:
+        print("[Warning] HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1.")
+        return False
+    return True
+
+
+class ClientRegistry:
+    """Process-wide registry of keep-alive httpx clients.
+
+    Sync clients are shared by every thread. Async clients hold connections
+    bound to an event loop, so one is kept per (name, loop). All clients
+    share tuned pool limits and the LLM rate-limiter hooks, and count the
+    requests they send so pool utilization can be reported.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_clients: dict = {}
+        self._async_clients: dict = {}
+        self._requests: dict = {}
+
+    def _event_hooks(self, name: str, is_async: bool) -> dict:
+        """Request counter, rate limiter, round-trip tracing and token usage, in that order"""
+        limiter, tracer, usage = get_rate_limiter(), get_tracer(), get_usage_tracker()
+        hook_sets = [
+            limiter.async_event_hooks() if is_async else limiter.sync_event_hooks(),
+            tracer.async_event_hooks() if is_async else tracer.sync_event_hooks(),
+            usage.async_event_hooks() if is_async else usage.sync_event_hooks(),
+        ]
+        hooks = {
+            event: [hook for hook_set in hook_sets for hook in hook_set.get(event, [])]
+            for event in ("request", "response")
+        }
+        return self._count_hooks(name, hooks, is_async)
+
+    def _count_hooks(self, name: str, hooks: dict, is_async: bool) -> dict:
+        def count(request):
+            self._requests[name] = self._requests.get(name, 0) + 1
+
+        async def count_async(request):
+            count(request)
+
+        hooks["request"] = [count_async if is_async else count] + hooks.get("request", [])
+        return hooks
+
+    def get_sync_client(self, name: str = DEFAULT_CLIENT) -> httpx.Client:
+        with self._lock:
+            client = self._sync_clients.get(name)
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    verify=False,
+                    limits=_limits(),
+                    http2=_http2_enabled(),
+                    timeout=httpx.Timeout(600.0, connect=10.0),
+                    event_hooks=self._event_hooks(name, False),
+                )
+                self._sync_clients[name] = client
+            return client
+
+    def get_async_client(self, name: str = DEFAULT_CLIENT) -> httpx.AsyncClient:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with self._lock:
+            for key in [key for key in self._async_clients if key[1] is not None and key[1].is_closed()]:
+                del self._async_clients[key]
+            client = self._async_clients.get((name, loop))
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    verify=False,
+                    limits=_limits(),
+                    http2=_http2_enabled(),
+                    timeout=httpx.Timeout(600.0, connect=10.0),
+                    event_hooks=self._event_hooks(name, True),
+                )
+                self._async_clients[(name, loop)] = client
+            return client
+
+    @staticmethod
+    def _pool_connections(client) -> list:
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        return list(getattr(pool, "connections", None) or [])
+
+    def metrics(self) -> dict:
+        """Connection-pool utilization per client"""
+        limits = _limits()
+        with self._lock:
+            clients = [(name, "sync", c) for name, c in self._sync_clients.items()]
+            clients += [(name, "async", c) for (name, _), c in self._async_clients.items()]
+        metrics = {}
+        for name, kind, client in clients:
+            connections = self._pool_connections(client)
+            idle = sum(1 for c in connections if getattr(c, "is_idle", lambda: False)())
+            entry = metrics.setdefault(name, {
+                "requests": self._requests.get(name, 0),
+                "clients": 0,
+                "connections": 0,
+                "idle_connections": 0,
+                "active_connections": 0,
+                "max_connections": limits.max_connections,
+            })
+            entry["clients"] += 1
+            entry["connections"] += len(connections)
+            entry["idle_connections"] += idle
+            entry["active_connections"] += len(connections) - idle
+        return metrics
+
+    async def aclose_loop_clients(self):
+        """Close the async clients that belong to the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            keys = [key for key in self._async_clients if key[1] is loop]
+            clients = [self._async_clients.pop(key) for key in keys]
+        for client in clients:
+            await client.aclose()
+
+    def close_sync_clients(self):
+        with self._lock:
+            clients = list(self._sync_clients.values())
+            self._sync_clients.clear()
+        for client in clients:
+            client.close()
+
+
+_registry = ClientRegistry()
+atexit.register(_registry.close_sync_clients)
+
+
+def get_http_client(name: str = DEFAULT_CLIENT) -> httpx.Client:
+    """Shared keep-alive sync client for LLM calls"""
+    return _registry.get_sync_client(name)
+
+
+def get_async_http_client(name: str = DEFAULT_CLIENT) -> httpx.AsyncClient:
+    """Shared keep-alive async client for LLM calls on the running event loop"""
+    return _registry.get_async_client(name)
+
+
+def http_pool_metrics() -> dict:
+    return _registry.metrics()
+
+
+async def aclose_http_clients():
+    """Close the async clients of the running loop (sync clients close at exit)"""
+    await _registry.aclose_loop_clients()
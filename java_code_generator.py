@@ -1,28 +1,48 @@
+import hashlib
 import json
 import os
+from urllib.parse import urlsplit
 # # os.environ["CURL_CA_BUNDLE"] = ""
 # # os.environ["REQUESTS_CA_BUNDLE"] = ""
 # import ssl
 # ssl._create_default_https_context = ssl._create_unverified_context
-import httpx
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import AzureChatOpenAI
-from openai import AzureOpenAI
-from pydantic import SecretStr
 from dotenv import load_dotenv
 from utils import class_name_generator
+from llm_cache import get_llm_cache
+from trace_ir import TRACE_FORMAT_NOTE, encode_trace
+from code_stream import StreamingCodeWriter
+from rate_limiter import llm_max_retries
+from tracing import span
+from llm_usage import get_usage_tracker
+from site_support import (
+    SUPPORT_CLASSES, SiteSupportCache, missing_support_classes, shared_support_enabled, site_key, site_package,
+    split_java_files,
+)
 load_dotenv()
-class PromptTemplates:
-    """Class to manage all prompt templates used in code generation"""
-    
-    @staticmethod
-    def get_standard_prompt_template():
-        """Returns the standard prompt template for Java code generation"""
-        return """
-    Generate a single complete Java file named `{class_name}.java` implementing a Selenium TestNG test based on this JSON test data:
+class PromptTemplate:
+    """A prompt split into a static instruction prefix and a small per-test suffix.
 
-    {test_data_json}
-    
+    The prefix is byte-identical for every test, which lets the provider's
+    prompt caching reuse it; only the suffix is formatted per request.
+    """
+
+    def __init__(self, static_prefix: str, dynamic_suffix: str):
+        self.static_prefix = static_prefix
+        self.dynamic_suffix = dynamic_suffix
+        self.version = hashlib.sha256((static_prefix + dynamic_suffix).encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def template(self) -> str:
+        return self.static_prefix + self.dynamic_suffix
+
+    def render(self, **fields) -> str:
+        return self.static_prefix + self.dynamic_suffix.format(**fields)
+
+
+_STANDARD_TEMPLATE = PromptTemplate(
+    static_prefix="""
+    Generate a single complete Java file implementing a Selenium TestNG test based on the JSON test data given at the end of this prompt.
+    """ + TRACE_FORMAT_NOTE + """
 
 Requirements:
 
@@ -135,20 +155,23 @@ Requirements:
 
 
 
-Use "interacted elements" xpaths. For elements where "interacted_element" is null, use appropriate locator strategies based on other datas on the given JSON.
+Use the xpaths from the "locators" table for the steps that reference it with "el" (in a raw trace, use the "interacted_element" xpaths). For steps without an element, use appropriate locator strategies based on other datas on the given JSON.
 Do not add any explanation, just give me the java code
-    
+""",
+    dynamic_suffix="""
+    Class name: {class_name} (file `{class_name}.java`)
+
+    JSON test data:
+    {test_data_json}
+
     Test Case Steps:
     {test_case_steps}
-    """
-    
-    @staticmethod
-    def get_custom_methods_prompt_template():
-        """Returns the prompt template with custom methods requirement"""
-        return """
-    Generate a single complete Java file named `{class_name}.java` implementing a Selenium TestNG test based on this JSON test data:
+    """,
+)
 
-    {test_data_json}
+_CUSTOM_METHODS_TEMPLATE = PromptTemplate(
+    static_prefix="""
+    Generate a single complete Java file implementing a Selenium TestNG test based on the JSON test data given at the end of this prompt.
     ## Important Instructions:
     ### ⚠ Mandatory Usage of Utility Methods
     Do not add any explanation, just give me the java code
@@ -280,15 +303,21 @@ IMPORTANT: When using element locators from the JSON data:
 5. Do not attempt to optimize or shorten the XPaths as they're specifically designed for the application structure
 
 For elements where "interacted_element" is null, use appropriate locator strategies based on context.
+""",
+    dynamic_suffix="""
+    Class name: {class_name} (file `{class_name}.java`)
+
+    JSON test data:
+    {test_data_json}
+
     Test Case Steps Implementation:
     {test_case_steps}
-    """
-    @staticmethod
-    def get_playwright_prompt_template():
-        """Returns the prompt template with custom methods requirement"""
-        return """
-    Generate a single complete TypeScript file named {class_name}.spec.ts implementing a Playwright test based on this JSON test data:
-    {test_data_json}
+    """,
+)
+
+_PLAYWRIGHT_TEMPLATE = PromptTemplate(
+    static_prefix="""
+    Generate a single complete TypeScript file implementing a Playwright test based on the JSON test data given at the end of this prompt.
     ## Important Instructions:
     ### ⚠ Mandatory Usage of Utility Methods
     Do not add any explanation, just give me the TypeScript code
@@ -454,98 +483,542 @@ For elements where "interacted_element" is null, use appropriate locator strateg
     Do not attempt to optimize or shorten the selectors as they're specifically designed for the application structure
 
     For elements where "interacted_element" is null, use appropriate locator strategies based on context.
+""",
+    dynamic_suffix="""
+    File name: {class_name}.spec.ts
+
+    JSON test data:
+    {test_data_json}
+
     Test Case Steps Implementation:
     {test_case_steps}
-    """
+    """,
+)
+
+
+_SITE_SUPPORT_TEMPLATE = PromptTemplate(
+    static_prefix="""
+    Generate the shared Java support classes that every Selenium TestNG test of one website will use.
+    Generate exactly these public classes, each in its own file: """ + ", ".join(SUPPORT_CLASSES) + """.
+    Start every file with a line `// FILE: <ClassName>.java` followed by its complete source, including the package declaration and imports.
+
+Requirements:
+
+1. DriverFactory: WebDriverManager setup for Chrome, Firefox and Edge, headless switch, window size presets,
+   sensible timeouts, cookie and cache cleanup between tests.
+2. ElementFinder: locator methods findElementByXpath, findElementById, findElementByCssSelector, findElementByName,
+   findElementByLinkText, findElementByPartialLinkText and findElementByCustomStrategy(Map<String, String> attributes).
+   Each uses WebDriverWait with ExpectedConditions, falls back from id to name to css to xpath, retries on
+   StaleElementReferenceException, logs the strategy used and throws a NoSuchElementException with context.
+   Also click(By), type(By, String, boolean clearFirst), textOf(By), isDisplayed(By) and waitForPageLoad().
+3. ScreenshotHelper: captureScreenshotOnStep(String stepName), captureScreenshotOnFailure(String methodName, Throwable error),
+   captureFullPageScreenshot() and captureElementScreenshot(WebElement element, String elementName), saved in folders by
+   test class and date with timestamped file names.
+4. BasePage: fluent base for page objects with the ElementFinder, open(String path) relative to the site's base URL,
+   dismissPopups() (close buttons, Escape, cookie consent), iframe and shadow DOM helpers.
+5. BaseTest: TestNG base class creating the driver in @BeforeMethod and quitting it in @AfterMethod, a screenshot on
+   failure, a RetryAnalyzer with configurable attempts, SoftAssert access and SLF4J logging; exposes driver, finder,
+   screenshots and baseUrl to subclasses as protected fields.
+
+Do not add any explanation, just give me the java code
+""",
+    dynamic_suffix="""
+    Package: {package}
+    Base URL of the site: {base_url}
+    """,
+)
+
+_SHARED_TEST_TEMPLATE = PromptTemplate(
+    static_prefix="""
+    Generate a single Java file with one Selenium TestNG test class based on the JSON test data given at the end of this prompt.
+    """ + TRACE_FORMAT_NOTE + """
+
+The site's support classes already exist; their public API is listed at the end of this prompt.
+    - The test class extends BaseTest and uses its driver, finder and screenshots fields.
+    - Do NOT define any utility, driver, screenshot, page base or retry classes, and do not redefine any listed method.
+    - Keep the file to the test itself: imports, the class, and one @Test method per test case with clear step comments and assertions.
+
+Use the xpaths from the "locators" table for the steps that reference it with "el" (in a raw trace, use the "interacted_element" xpaths). For steps without an element, use appropriate locator strategies based on other datas on the given JSON.
+Do not add any explanation, just give me the java code
+""",
+    dynamic_suffix="""
+    Class name: {class_name} (file `{class_name}.java`)
+    Import the support classes with: import {package}.*;
+
+    Support class API:
+    {support_api}
+
+    JSON test data:
+    {test_data_json}
+
+    Test Case Steps:
+    {test_case_steps}
+    """,
+)
+
+
+_BATCH_TEST_TEMPLATE = PromptTemplate(
+    static_prefix="""
+    Generate one Selenium TestNG test class per test case given at the end of this prompt. All test cases run against the same website.
+    """ + TRACE_FORMAT_NOTE + """
+
+Output format:
+    - Start every file with a line `// FILE: <ClassName>.java` using the class name given for its test case, followed by its complete source.
+    - Generate exactly one file per test case, in the given order, and nothing else.
+
+The site's support classes already exist; their public API is listed at the end of this prompt.
+    - Every test class extends BaseTest and uses its driver, finder and screenshots fields.
+    - Do NOT define any utility, driver, screenshot, page base or retry classes, and do not redefine any listed method.
+    - Each file contains only its imports, the class, and @Test methods with clear step comments and assertions.
+
+Use the xpaths from the "locators" table for the steps that reference it with "el" (in a raw trace, use the "interacted_element" xpaths). For steps without an element, use appropriate locator strategies based on other datas on the given JSON.
+Do not add any explanation, just give me the java code
+""",
+    dynamic_suffix="""
+    Import the support classes with: import {package}.*;
+
+    Support class API:
+    {support_api}
+
+    Test cases:
+    {test_cases}
+    """,
+)
+
+
+class PromptTemplates:
+    """Class to manage all prompt templates used in code generation"""
+
+    STANDARD = _STANDARD_TEMPLATE
+    CUSTOM_METHODS = _CUSTOM_METHODS_TEMPLATE
+    PLAYWRIGHT = _PLAYWRIGHT_TEMPLATE
+    SITE_SUPPORT = _SITE_SUPPORT_TEMPLATE
+    SHARED_TEST = _SHARED_TEST_TEMPLATE
+    BATCH_TEST = _BATCH_TEST_TEMPLATE
+    
+    @staticmethod
+    def get_standard_prompt_template():
+        """Returns the standard prompt template for Java code generation"""
+        return _STANDARD_TEMPLATE.template
+    
+    @staticmethod
+    def get_custom_methods_prompt_template():
+        """Returns the prompt template with custom methods requirement"""
+        return _CUSTOM_METHODS_TEMPLATE.template
+
+    @staticmethod
+    def get_playwright_prompt_template():
+        """Returns the prompt template with custom methods requirement"""
+        return _PLAYWRIGHT_TEMPLATE.template
 
 
 class JavaCodeGenerator:
+    MODEL = "gpt-4o"
+    API_VERSION = "2024-12-01-preview"
+    GENERATED_CODES_DIR = "generated_codes"
+    GENERATED_MESSAGE = "Java test generated successfully."
+    SUPPORT_ATTEMPTS = 2
     
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, use_cache: bool = True, compact_trace: bool = True, stream: bool = None,
+                 shared_support: bool = None):
         """Initialize the Java code generator with an optional LLM"""
+        from openai import AzureOpenAI
+        from http_clients import get_http_client
+
+        self.use_cache = use_cache
+        self.compact_trace = compact_trace
+        self.stream = stream if stream is not None else os.getenv("CODEGEN_STREAM", "").lower() in ("1", "true", "yes")
+        self.shared_support = shared_support if shared_support is not None else shared_support_enabled()
+        self.site_support = SiteSupportCache(os.path.join(self.GENERATED_CODES_DIR, "support"))
+        self.cache = get_llm_cache()
         self.llm = AzureOpenAI(
-            api_version="2024-12-01-preview",
+            api_version=self.API_VERSION,
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             api_key=os.getenv("AZURE_OPENAI_KEY"),
-            http_client=httpx.Client(verify=False),
+            http_client=get_http_client(),
+            max_retries=llm_max_retries(),
             
         )
+        self._async_llm = None
+        self._async_http_client = None
         self.prompt_templates=PromptTemplates()
-        
+        self.prompt_cache_stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self.last_stream_stats = None
+
+    @property
+    def async_llm(self):
+        """Async client used by the non-blocking code generation path (created on first use)"""
+        from openai import AsyncAzureOpenAI
+        from http_clients import get_async_http_client
+
+        # The pooled async HTTP client is per event loop, so rebuild the wrapper if the loop changed
+        http_client = get_async_http_client()
+        if self._async_llm is None or self._async_http_client is not http_client:
+            self._async_http_client = http_client
+            self._async_llm = AsyncAzureOpenAI(
+                api_version=self.API_VERSION,
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                api_key=os.getenv("AZURE_OPENAI_KEY"),
+                http_client=http_client,
+                max_retries=llm_max_retries(),
+            )
+        return self._async_llm
+
+    def _cache_key(self, messages: list) -> str:
+        return self.cache.make_key(
+            self.MODEL, self.MODEL, messages, api_version=self.API_VERSION
+        )
+
+    def _record_prompt_cache_usage(self, response, streamed: bool = False):
+        """Record how much of the prompt the provider served from its prefix cache
+
+        Non-streamed responses are counted by the usage tracker's HTTP hooks; a
+        streamed completion only reports usage in its last chunk, so it is passed on here.
+        """
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) if details else 0) or 0
+        if streamed:
+            get_usage_tracker().record(
+                getattr(response, "model", None) or self.MODEL,
+                usage.prompt_tokens or 0, usage.completion_tokens or 0, cached_tokens,
+            )
+        self.prompt_cache_stats["requests"] += 1
+        self.prompt_cache_stats["prompt_tokens"] += usage.prompt_tokens or 0
+        self.prompt_cache_stats["cached_tokens"] += cached_tokens
+        print(f"[Info] Prompt tokens: {usage.prompt_tokens:,} (cached prefix: {cached_tokens:,})")
+
+    @staticmethod
+    def _clean_code(content: str) -> str:
+        if content.startswith("```java"):
+            content = content.removeprefix("```java").removesuffix("```").strip()
+        return content
     
-    def send_request_to_llm(self, prompt: str):
-        """Send a request to the LLM and return the code content"""
-        print("prompt is", prompt)
+    def send_request_to_llm(self, prompt: str, use_cache: bool = True):
+        """Send a request to the LLM and return the code content; `use_cache=False` forces a fresh completion"""
+        messages = [{"role": "user", "content": prompt}]
+        cache_key = self._cache_key(messages)
         try:
-            response = self.llm.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            content = response.choices[0].message.content
-            if content.startswith("```java"):
-                content = content.removeprefix("```java").removesuffix("```").strip()
-            return content
+            content = self.cache.get(cache_key) if self.use_cache and use_cache else None
+            if content is not None:
+                print("[Info] LLM cache hit for code generation prompt.")
+            else:
+                with span("codegen.completion", model=self.MODEL):
+                    response = self.llm.chat.completions.create(
+                        model=self.MODEL,
+                        messages=messages
+                    )
+                self._record_prompt_cache_usage(response)
+                content = response.choices[0].message.content
+                if self.use_cache:
+                    self.cache.set(cache_key, content)
+            return self._clean_code(content)
         except Exception as e:
             print(f"Error sending request: {e}")
             return None
 
-    def generate_code_from_data(self, test_data: dict, test_case=None):
-        # Build the prompt using your template
-        formatted_class_name = (
+    async def asend_request_to_llm(self, prompt: str, use_cache: bool = True):
+        """Async variant of send_request_to_llm that never blocks the event loop"""
+        messages = [{"role": "user", "content": prompt}]
+        cache_key = self._cache_key(messages)
+        try:
+            content = self.cache.get(cache_key) if self.use_cache and use_cache else None
+            if content is not None:
+                print("[Info] LLM cache hit for code generation prompt.")
+            else:
+                with span("codegen.completion", model=self.MODEL):
+                    response = await self.async_llm.chat.completions.create(
+                        model=self.MODEL,
+                        messages=messages
+                    )
+                self._record_prompt_cache_usage(response)
+                content = response.choices[0].message.content
+                if self.use_cache:
+                    self.cache.set(cache_key, content)
+            return self._clean_code(content)
+        except Exception as e:
+            print(f"Error sending request: {e}")
+            return None
+
+    @staticmethod
+    def class_name_for(test_case) -> str:
+        return (
             "".join(word.capitalize() for word in test_case.name.split())
             if test_case and hasattr(test_case, 'name')
             else "GeneratedTest"
         )
-        test_case_steps = "\n".join(f"- {step}" for step in test_case.steps) if test_case and hasattr(test_case, 'steps') else ""
-        template = self.prompt_templates.get_standard_prompt_template()
-        prompt = template.format(
-            class_name=formatted_class_name,
-            test_data_json=json.dumps(test_data, indent=4, ensure_ascii=False),
-            test_case_steps=test_case_steps
+
+    def codegen_inputs(self, test_case=None, batch: bool = False) -> dict:
+        """Everything besides the trace that decides the generated code; used for the run manifest"""
+        if batch or (self.shared_support and site_key(getattr(test_case, "url", ""))):
+            templates = [
+                (self.prompt_templates.BATCH_TEST if batch else self.prompt_templates.SHARED_TEST).version,
+                self.prompt_templates.SITE_SUPPORT.version,
+            ]
+        else:
+            templates = [self.prompt_templates.STANDARD.version]
+        return {"model": self.MODEL, "templates": templates, "compact_trace": self.compact_trace,
+                "class_name": self.class_name_for(test_case)}
+
+    def output_path_for(self, test_case) -> str:
+        return self._stream_target(test_case)
+
+    def _site_support_prompt(self, site: str, test_case) -> str:
+        url = urlsplit(getattr(test_case, "url", "") or "")
+        return self.prompt_templates.SITE_SUPPORT.render(
+            package=site_package(site), base_url=f"{url.scheme or 'https'}://{url.netloc}"
+        )
+
+    def _store_site_support(self, site: str, content, attempt: int):
+        """Save the support classes if every one of SUPPORT_CLASSES came back; None otherwise"""
+        files = split_java_files(content) if content else {}
+        missing = missing_support_classes(files)
+        if missing:
+            retry = "retrying" if attempt < self.SUPPORT_ATTEMPTS else "falling back to standalone tests"
+            print(f"[Warning] Support classes for {site} incomplete (missing {', '.join(missing)}); {retry}.")
+            return None
+        return self.site_support.save(site, files, self.prompt_templates.SITE_SUPPORT.version, self.MODEL)
+
+    def ensure_site_support(self, test_case, required: bool = False):
+        """Support classes of the test case's site, generated on first use; None in standalone mode unless `required`"""
+        site = site_key(getattr(test_case, "url", "")) if self.shared_support or required else ""
+        if not site:
+            return None
+        with self.site_support.lock(site):
+            support = self.site_support.get(site, self.prompt_templates.SITE_SUPPORT.version, self.MODEL)
+            for attempt in range(1, self.SUPPORT_ATTEMPTS + 1):
+                if support is not None:
+                    break
+                with span("codegen.site_support", site=site, attempt=attempt):
+                    # A retry must not get the same incomplete completion back from the LLM cache
+                    content = self.send_request_to_llm(self._site_support_prompt(site, test_case), use_cache=attempt == 1)
+                support = self._store_site_support(site, content, attempt)
+        return support
+
+    async def aensure_site_support(self, test_case, required: bool = False):
+        """Async variant of ensure_site_support"""
+        site = site_key(getattr(test_case, "url", "")) if self.shared_support or required else ""
+        if not site:
+            return None
+        async with self.site_support.alock(site):
+            support = self.site_support.get(site, self.prompt_templates.SITE_SUPPORT.version, self.MODEL)
+            for attempt in range(1, self.SUPPORT_ATTEMPTS + 1):
+                if support is not None:
+                    break
+                with span("codegen.site_support", site=site, attempt=attempt):
+                    content = await self.asend_request_to_llm(
+                        self._site_support_prompt(site, test_case), use_cache=attempt == 1
+                    )
+                support = self._store_site_support(site, content, attempt)
+        return support
+
+    def build_prompt(self, test_data: dict, test_case=None, support=None) -> str:
+        """Build the code generation prompt for a recorded test run
+
+        With `support` (a SiteSupport) the prompt asks only for the test class on top of the site's support classes.
+        """
+        formatted_class_name = self.class_name_for(test_case)
+        with span("codegen.build_prompt", class_name=formatted_class_name) as prompt_span:
+            test_case_steps = "\n".join(f"- {step}" for step in test_case.steps) if test_case and hasattr(test_case, 'steps') else ""
+            if self.compact_trace:
+                test_data_json, _ = encode_trace(test_data, label=formatted_class_name)
+            else:
+                test_data_json = json.dumps(test_data, indent=4, ensure_ascii=False)
+            # Only the per-test suffix is formatted; the static prefix is shared byte-for-byte
+            if support is not None:
+                prompt = self.prompt_templates.SHARED_TEST.render(
+                    class_name=formatted_class_name,
+                    package=support.package,
+                    support_api=support.api,
+                    test_data_json=test_data_json,
+                    test_case_steps=test_case_steps
+                )
+            else:
+                prompt = self.prompt_templates.STANDARD.render(
+                    class_name=formatted_class_name,
+                    test_data_json=test_data_json,
+                    test_case_steps=test_case_steps
+                )
+            prompt_span.set(chars=len(prompt))
+        print(f"[Info] {formatted_class_name}: code generation prompt is {len(prompt):,} chars.")
+        return prompt
+
+    def generate_code_from_data(self, test_data: dict, test_case=None):
+        support = self.ensure_site_support(test_case)
+        return self.send_request_to_llm(self.build_prompt(test_data, test_case, support))
+
+    async def agenerate_code_from_data(self, test_data: dict, test_case=None):
+        support = await self.aensure_site_support(test_case)
+        return await self.asend_request_to_llm(self.build_prompt(test_data, test_case, support))
+
+    def _save_java_code(self, java_test_code, test_case) -> str:
+        generated_codes_dir = self.GENERATED_CODES_DIR
+        if isinstance(java_test_code, str) and java_test_code:
+            formatted_name = self.class_name_for(test_case) + ".java"
+            os.makedirs(generated_codes_dir, exist_ok=True)
+            with open(f"{generated_codes_dir}/{formatted_name}", "w", encoding='utf-8') as test_file:
+                test_file.write(java_test_code)
+            print(f"Java test generated successfully and saved to {generated_codes_dir}/{formatted_name}")
+            return self.GENERATED_MESSAGE
+        error_msg = f"Failed to generate the Java test: Received {type(java_test_code)} response."
+        print(error_msg)
+        return error_msg
+
+    def _stream_target(self, test_case) -> str:
+        return os.path.join(self.GENERATED_CODES_DIR, self.class_name_for(test_case) + ".java")
+
+    def _finish_stream(self, writer: StreamingCodeWriter, cache_key: str) -> str:
+        raw = writer.commit()
+        if raw is None:
+            error_msg = "Failed to generate the Java test: the streamed completion contained no code."
+            print(error_msg)
+            return error_msg
+        if self.use_cache:
+            self.cache.set(cache_key, raw)
+        stats = writer.stats()
+        ttft = stats["time_to_first_token"]
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+        print(
+            f"Java test streamed to {writer.target_path} "
+            f"(time to first token {ttft_text}, total {stats['duration']:.2f}s, {stats['chars']:,} chars)"
+        )
+        self.last_stream_stats = stats
+        return self.GENERATED_MESSAGE
+
+    def stream_code_from_data(self, test_data: dict, test_case=None) -> str:
+        """Stream the completion straight into generated_codes/, renaming it into place when done"""
+        support = self.ensure_site_support(test_case)
+        messages = [{"role": "user", "content": self.build_prompt(test_data, test_case, support)}]
+        cache_key = self._cache_key(messages)
+        cached = self.cache.get(cache_key) if self.use_cache else None
+        if cached is not None:
+            print("[Info] LLM cache hit for code generation prompt.")
+            return self._save_java_code(self._clean_code(cached), test_case)
+
+        writer = StreamingCodeWriter(self._stream_target(test_case))
+        try:
+            with span("codegen.completion", model=self.MODEL, stream=True):
+                stream = self.llm.chat.completions.create(
+                    model=self.MODEL,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                for chunk in stream:
+                    if chunk.usage:
+                        self._record_prompt_cache_usage(chunk, streamed=True)
+                    if chunk.choices:
+                        writer.write(chunk.choices[0].delta.content)
+            return self._finish_stream(writer, cache_key)
+        except Exception:
+            writer.abort()
+            raise
+
+    async def astream_code_from_data(self, test_data: dict, test_case=None) -> str:
+        """Async variant of stream_code_from_data"""
+        support = await self.aensure_site_support(test_case)
+        messages = [{"role": "user", "content": self.build_prompt(test_data, test_case, support)}]
+        cache_key = self._cache_key(messages)
+        cached = self.cache.get(cache_key) if self.use_cache else None
+        if cached is not None:
+            print("[Info] LLM cache hit for code generation prompt.")
+            return self._save_java_code(self._clean_code(cached), test_case)
+
+        writer = StreamingCodeWriter(self._stream_target(test_case))
+        try:
+            with span("codegen.completion", model=self.MODEL, stream=True):
+                stream = await self.async_llm.chat.completions.create(
+                    model=self.MODEL,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    if chunk.usage:
+                        self._record_prompt_cache_usage(chunk, streamed=True)
+                    if chunk.choices:
+                        writer.write(chunk.choices[0].delta.content)
+            return self._finish_stream(writer, cache_key)
+        except Exception:
+            writer.abort()
+            raise
+
+    async def agenerate_batch_from_data(self, items: list) -> list:
+        """Generate the test classes of several cases on one site in a single call; return the items left without code
+
+        Each item provides `test_case`, `class_name` and `section` (its class name, steps and trace for the prompt).
+        The completion is split on `// FILE:` markers; cases whose file is missing are returned for a per-test retry.
+        """
+        support = await self.aensure_site_support(items[0].test_case, required=True)
+        if support is None:
+            return list(items)
+        prompt = self.prompt_templates.BATCH_TEST.render(
+            package=support.package,
+            support_api=support.api,
+            test_cases="\n\n".join(item.section for item in items),
         )
-        return self.send_request_to_llm(prompt)
+        print(f"[Info] Batch of {len(items)} test(s) on {support.site}: code generation prompt is {len(prompt):,} chars.")
+        with span("codegen.batch", site=support.site, cases=len(items)):
+            content = await self.asend_request_to_llm(prompt)
+        files = split_java_files(content) if content else {}
+        missing = []
+        for item in items:
+            source = files.get(f"{item.class_name}.java")
+            if source:
+                self._save_java_code(source, item.test_case)
+            else:
+                missing.append(item)
+        return missing
+
+    def generate_test_from_data(self, test_data, test_case=None):
+        """Generate Java Selenium TestNG tests from recorded actions and save to a file"""
+        try:
+            if self.stream:
+                return self.stream_code_from_data(test_data, test_case)
+            java_test_code = self.generate_code_from_data(test_data, test_case)
+            return self._save_java_code(java_test_code, test_case)
+
+        except Exception as e:
+            error_msg = f"Error in generate_test_from_data: {str(e)}"
+            print(error_msg)
+            return error_msg
+
+    async def agenerate_test_from_data(self, test_data, test_case=None):
+        """Async variant of generate_test_from_data; other tests keep running while the LLM answers"""
+        try:
+            if self.stream:
+                return await self.astream_code_from_data(test_data, test_case)
+            java_test_code = await self.agenerate_code_from_data(test_data, test_case)
+            return self._save_java_code(java_test_code, test_case)
+
+        except Exception as e:
+            error_msg = f"Error in generate_test_from_data: {str(e)}"
+            print(error_msg)
+            return error_msg
 
     def generate_test_from_json(self, json_file: str, test_case=None):
         """Generate Java Selenium TestNG tests from JSON and save to a file"""
         try:
             with open(json_file, 'r', encoding='utf-8') as file:
                 test_data = json.load(file)
+        except Exception as e:
+            error_msg = f"Error in generate_test_from_json: {str(e)}"
+            print(error_msg)
+            return error_msg
+        return self.generate_test_from_data(test_data, test_case)
 
-            java_test_code = self.generate_code_from_data(test_data, test_case)
-            print("new test code is", java_test_code)
-            generated_codes_dir = 'generated_codes'
-            if isinstance(java_test_code, str) and java_test_code:
-                formatted_name = "".join(word.capitalize() for word in test_case.name.split()) + ".java"
-                os.makedirs(generated_codes_dir, exist_ok=True)
-                with open(f"{generated_codes_dir}/{formatted_name}", "w", encoding='utf-8') as test_file:
-                    test_file.write(java_test_code)
-                print(f"Java test generated successfully and saved to generated_codes/{formatted_name}")
-                return "Java test generated successfully."
-            else:
-                error_msg = f"Failed to generate the Java test: Received {type(java_test_code)} response."
-                print(error_msg)
-                return error_msg
-
+    async def agenerate_test_from_json(self, json_file: str, test_case=None):
+        """Async variant of generate_test_from_json; other tests keep running while the LLM answers"""
+        try:
+            with open(json_file, 'r', encoding='utf-8') as file:
+                test_data = json.load(file)
         except Exception as e:
             error_msg = f"Error in generate_test_from_json: {str(e)}"
             print(error_msg)
             return error_msg
-        
-    def generate_code_from_data(self, test_data: dict, test_case=None):
-        # Build the prompt using your template
-        formatted_class_name = (
-            "".join(word.capitalize() for word in test_case.name.split())
-            if test_case and hasattr(test_case, 'name')
-            else "GeneratedTest"
-        )
-        test_case_steps = "\n".join(f"- {step}" for step in test_case.steps) if test_case and hasattr(test_case, 'steps') else ""
-        template = self.prompt_templates.get_standard_prompt_template()
-        prompt = template.format(
-            class_name=formatted_class_name,
-            test_data_json=json.dumps(test_data, indent=4, ensure_ascii=False),
-            test_case_steps=test_case_steps
-        )
-        return self.send_request_to_llm(prompt)
+        return await self.agenerate_test_from_data(test_data, test_case)
 
     # def create_prompt_from_json(self, test_data: dict, test_case=None, use_playwright_prompt=  False):
     #     """Create a prompt to guide the LLM to generate a Playwright test file from JSON test data."""
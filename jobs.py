@@ -0,0 +1,233 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from browser_pool import close_browser_pool
+from scheduler import TestScheduler
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds the maximum number of pending jobs"""
+
+
+class Job:
+    """A submitted test run and the progress events it has produced so far"""
+
+    def __init__(self, kind: str, payload: dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.events = []
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def add_event(self, event: str, data: dict = None):
+        with self._changed:
+            self.events.append({"id": len(self.events), "event": event, "time": time.time(), "data": data or {}})
+            self._changed.notify_all()
+
+    def start(self):
+        """Mark the job running and publish the event atomically"""
+        with self._changed:
+            self.status = "running"
+            self.started_at = time.time()
+            self.events.append({"id": len(self.events), "event": "running", "time": self.started_at, "data": {}})
+            self._changed.notify_all()
+
+    def finish(self, status: str, result=None, error: str = None):
+        """Record the outcome and publish the final event atomically; a finished job keeps its first outcome"""
+        with self._changed:
+            if self.finished:
+                return
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.events.append({
+                "id": len(self.events),
+                "event": status,
+                "time": self.finished_at,
+                "data": {"error": error} if error else {"result": result},
+            })
+            self.status = status
+            self._changed.notify_all()
+
+    def wait_for_events(self, after: int, timeout: float) -> list:
+        """Block until there are events newer than `after` (or the job finished)"""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > after + 1 or self.finished, timeout=timeout)
+            return self.events[after + 1:]
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "events": len(self.events),
+            "error": self.error,
+        }
+
+
+def summarize_history(history) -> dict:
+    """JSON-friendly summary of an AgentHistoryList"""
+    return {
+        "final_result": history.final_result(),
+        "is_done": history.is_done(),
+        "errors": [error for error in history.errors() if error],
+        "urls": [url for url in history.urls() if url],
+        "steps": len(history.history),
+    }
+
+
+class JobManager:
+    """Runs submitted test jobs on one background event loop.
+
+    All jobs share a single loop thread, so a job waiting on a browser or
+    the LLM costs a coroutine, not a thread. Concurrency is bounded by the
+    TestScheduler slots, and the browser pool of that loop stays warm across
+    jobs. Finished jobs are kept up to `history_limit` for status queries.
+    """
+
+    def __init__(self, max_pending: int = None, history_limit: int = None):
+        self.max_pending = max_pending or int(os.getenv("JOB_QUEUE_LIMIT", "100"))
+        self.history_limit = history_limit or int(os.getenv("JOB_HISTORY_LIMIT", "200"))
+        self._jobs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._scheduler = None
+        self._thread = threading.Thread(target=self._run_loop, name="job-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job_id]
+
+    def submit_test_run(self, test_case, replay: bool = False) -> Job:
+        """Queue a run_test_and_generate_code job and return immediately"""
+        with self._lock:
+            if self._pending_count() >= self.max_pending:
+                raise QueueFullError(f"{self.max_pending} jobs are already pending.")
+            self._trim_history()
+            job = Job("run-test", {"test_case": getattr(test_case, "name", None)})
+            self._jobs[job.id] = job
+        job.add_event("queued", {"test_case": job.payload["test_case"]})
+        asyncio.run_coroutine_threadsafe(self._run_test_job(job, test_case, replay), self._loop)
+        return job
+
+    async def _run_test_job(self, job: Job, test_case, replay: bool = False):
+        from test_runner import run_test_and_generate_code
+
+        if self._scheduler is None:
+            # Created on the loop thread so its semaphores belong to this loop
+            self._scheduler = TestScheduler()
+        job.start()
+        try:
+            history = await run_test_and_generate_code(
+                test_case, self._scheduler, on_progress=job.add_event, replay=replay
+            )
+            job.finish("succeeded", result=summarize_history(history))
+        except Exception as e:
+            job.finish("failed", error=str(e))
+        except BaseException as e:
+            # Cancelled (e.g. on shutdown): waiters and event streams must still see the job end
+            job.finish("failed", error=f"job interrupted: {type(e).__name__}")
+            raise
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: Job, timeout: float = None) -> Job:
+        """Block the calling thread until `job` finishes"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        seen = -1
+        while not job.finished:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            events = job.wait_for_events(seen, timeout=min(remaining or 30.0, 30.0))
+            if events:
+                seen = events[-1]["id"]
+        return job
+
+    def stream_events(self, job: Job, last_event_id: int = -1, keepalive: float = 15.0):
+        """Yield server-sent-event frames until the job finishes"""
+        seen = last_event_id
+        while True:
+            events = job.wait_for_events(seen, timeout=keepalive)
+            for event in events:
+                seen = event["id"]
+                yield (
+                    f"id: {event['id']}\n"
+                    f"event: {event['event']}\n"
+                    f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+                )
+            if job.finished and seen >= len(job.events) - 1:
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    def shutdown(self):
+        """Cancel unfinished jobs, close the browser pool of the job loop and stop the loop thread"""
+        from http_clients import aclose_http_clients
+
+        async def _close():
+            # Cancel running jobs first so they finish as failed before their browsers go away
+            running = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            await close_browser_pool()
+            await aclose_http_clients()
+
+        if self._loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(_close(), self._loop).result(timeout=60)
+            except Exception as e:
+                print(f"[Warning] Error closing the job loop's browsers and clients: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+        # Jobs still queued on the stopped loop will never run; release whoever waits on them
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.finish("failed", error="job manager shut down")
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager, starting its loop thread on first use"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+            # Close the pooled browsers when the server exits; a second shutdown is a no-op
+            atexit.register(_manager.shutdown)
+        return _manager
@@ -0,0 +1,251 @@
+import argparse
+import contextvars
+import glob
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+USAGE_SUFFIX = ".usage.json"
+UNATTRIBUTED = "(unattributed)"
+STAGES = ("case_generation", "agent", "codegen")
+
+_current_scope = contextvars.ContextVar("llm_usage_scope", default=None)
+
+
+def _price(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> float:
+    """USD cost of one request; prices are per million tokens (gpt-4o list prices by default)"""
+    return (
+        (prompt_tokens - cached_tokens) * _price("LLM_PRICE_INPUT_PER_MTOK", "2.50")
+        + cached_tokens * _price("LLM_PRICE_CACHED_INPUT_PER_MTOK", "1.25")
+        + completion_tokens * _price("LLM_PRICE_OUTPUT_PER_MTOK", "10.00")
+    ) / 1_000_000
+
+
+def empty_totals() -> dict:
+    return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "cost": 0.0}
+
+
+def add_totals(target: dict, source: dict):
+    for key in target:
+        target[key] += source.get(key, 0)
+
+
+class UsageScope:
+    """Attribution for the LLM calls made inside a `usage_scope` block, plus what they used"""
+
+    def __init__(self, test_case: str = None, stage: str = None):
+        self.test_case = test_case
+        self.stage = stage
+        self.totals = empty_totals()
+
+
+@contextmanager
+def usage_scope(test_case: str = None, stage: str = None):
+    """Attribute LLM usage in this block to a test case and/or stage (unset fields are inherited)"""
+    parent = _current_scope.get()
+    scope = UsageScope(
+        test_case or (parent.test_case if parent else None),
+        stage or (parent.stage if parent else None),
+    )
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def parse_usage(payload: dict):
+    """(model, prompt_tokens, completion_tokens, cached_tokens) of a chat/completions response, or None"""
+    usage = payload.get("usage") if isinstance(payload, dict) else None
+    if not usage:
+        return None
+    details = usage.get("prompt_tokens_details") or {}
+    return (
+        payload.get("model") or "unknown",
+        usage.get("prompt_tokens") or 0,
+        usage.get("completion_tokens") or 0,
+        details.get("cached_tokens") or 0,
+    )
+
+
+class UsageTracker:
+    """Aggregates token usage and cost per (test case, stage) for this process.
+
+    Usage is captured from every LLM HTTP response by httpx event hooks, so
+    the agent, case generator and code generator are all counted without
+    touching their call sites; streamed completions report their final
+    usage chunk explicitly. Attribution comes from the enclosing
+    `usage_scope`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+        usage = {
+            "requests": 1,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "cost": estimate_cost(prompt_tokens, completion_tokens, cached_tokens),
+        }
+        scope = _current_scope.get()
+        test_case = scope.test_case if scope and scope.test_case else UNATTRIBUTED
+        stage = scope.stage if scope and scope.stage else "other"
+        with self._lock:
+            if scope is not None:
+                add_totals(scope.totals, usage)
+            add_totals(self._totals.setdefault((test_case, stage), empty_totals()), usage)
+
+    def record_response_payload(self, payload: dict):
+        parsed = parse_usage(payload)
+        if parsed is not None:
+            self.record(*parsed)
+
+    def add(self, test_case: str, stage: str, totals: dict):
+        """Attribute already measured usage, e.g. a share of one call that produced several cases"""
+        with self._lock:
+            add_totals(self._totals.setdefault((test_case, stage), empty_totals()), totals)
+
+    def distribute(self, test_cases: list, stage: str, totals: dict, results_dir: str = "results"):
+        """Move one unattributed scope's usage to the test cases it produced, split evenly, and persist each share"""
+        if not test_cases:
+            return
+        with self._lock:
+            unattributed = self._totals.get((UNATTRIBUTED, stage))
+            if unattributed is not None:
+                for key in unattributed:
+                    unattributed[key] = max(0, unattributed[key] - totals.get(key, 0))
+                if unattributed["requests"] <= 0:
+                    del self._totals[(UNATTRIBUTED, stage)]
+        share = {key: value / len(test_cases) for key, value in totals.items()}
+        for test_case in test_cases:
+            self.add(test_case, stage, share)
+            self.save(test_case, results_dir)
+
+    def stages_for(self, test_case: str) -> dict:
+        with self._lock:
+            return {stage: dict(totals) for (name, stage), totals in self._totals.items() if name == test_case}
+
+    def totals(self) -> dict:
+        total = empty_totals()
+        with self._lock:
+            for totals in self._totals.values():
+                add_totals(total, totals)
+        return total
+
+    def save(self, test_case: str, results_dir: str = "results") -> str:
+        """Write results/<name>.usage.json; stages not used in this process keep their stored numbers"""
+        path = os.path.join(results_dir, f"{test_case}{USAGE_SUFFIX}")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stages = json.load(f).get("stages", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            stages = {}
+        stages.update(self.stages_for(test_case))
+        total = empty_totals()
+        for totals in stages.values():
+            add_totals(total, totals)
+        os.makedirs(results_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"test_case": test_case, "stages": stages, "total": total}, f, indent=4, ensure_ascii=False)
+        return path
+
+    # httpx event hooks -------------------------------------------------------
+
+    @staticmethod
+    def _wants_body(response) -> bool:
+        content_type = response.headers.get("content-type", "")
+        # Streamed completions are left untouched; their usage arrives in the last chunk
+        return response.status_code < 400 and content_type.startswith("application/json")
+
+    def _record_body(self, content: bytes):
+        try:
+            self.record_response_payload(json.loads(content))
+        except (ValueError, UnicodeDecodeError):
+            pass
+
+    def sync_event_hooks(self) -> dict:
+        """Event hooks for an httpx.Client"""
+        def on_response(response):
+            if self._wants_body(response):
+                self._record_body(response.read())
+
+        return {"response": [on_response]}
+
+    def async_event_hooks(self) -> dict:
+        """Event hooks for an httpx.AsyncClient"""
+        async def on_response(response):
+            if self._wants_body(response):
+                self._record_body(await response.aread())
+
+        return {"response": [on_response]}
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Return the process-wide usage tracker"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = UsageTracker()
+        return _tracker
+
+
+def load_usage_reports(results_dir: str = "results") -> list:
+    reports = []
+    for path in glob.glob(os.path.join(results_dir, f"*{USAGE_SUFFIX}")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            print(f"[Warning] Skipping unreadable usage file {path}")
+    return sorted(reports, key=lambda report: report.get("total", {}).get("cost", 0), reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show LLM token usage and cost per test case, most expensive first.")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--top", type=int, default=20, help="Number of test cases to show (0 = all)")
+    args = parser.parse_args(argv)
+
+    reports = load_usage_reports(args.results_dir)
+    if not reports:
+        print(f"[Info] No usage files found in {args.results_dir}/.")
+        return 0
+
+    shown = reports[:args.top] if args.top else reports
+    stage_headers = "".join(f"{stage:>17}" for stage in STAGES)
+    print(f"{'test case':<36}{'requests':>9}{'prompt':>10}{'cached':>10}{'completion':>11}{'cost':>10}{stage_headers}")
+    grand_total = empty_totals()
+    for report in reports:
+        add_totals(grand_total, report.get("total", {}))
+    for report in shown:
+        total = report.get("total", {})
+        stages = report.get("stages", {})
+        stage_costs = "".join(f"{'$' + format(stages.get(stage, {}).get('cost', 0), '.4f'):>17}" for stage in STAGES)
+        print(
+            f"{report.get('test_case', '?')[:35]:<36}{total.get('requests', 0):>9.3g}{total.get('prompt_tokens', 0):>10,.0f}"
+            f"{total.get('cached_tokens', 0):>10,.0f}{total.get('completion_tokens', 0):>11,.0f}"
+            f"{'$' + format(total.get('cost', 0), '.4f'):>10}{stage_costs}"
+        )
+    print(
+        f"\n{len(reports)} test case(s): {grand_total['requests']:.0f} requests, "
+        f"{grand_total['prompt_tokens']:,.0f} prompt / {grand_total['completion_tokens']:,.0f} completion tokens "
+        f"({grand_total['cached_tokens']:,.0f} cached), ${grand_total['cost']:.4f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import asyncio
+import datetime
+import email.utils
+import json
+import os
+import threading
+import time
+
+# Azure bills an image part at roughly this many tokens (gpt-4o, high detail tile estimate)
+IMAGE_TOKEN_ESTIMATE = 850
+DEFAULT_COMPLETION_ESTIMATE = 500
+
+
+def estimate_request_tokens(body: bytes) -> int:
+    """Estimate the TPM cost of a chat/completions request body"""
+    try:
+        payload = json.loads(body or b"{}")
+    except (ValueError, UnicodeDecodeError):
+        return max(1, len(body or b"") // 4)
+
+    tokens = 0
+    for message in payload.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    tokens += IMAGE_TOKEN_ESTIMATE
+                else:
+                    tokens += len(part.get("text") or "") // 4
+        tokens += 4
+    prompt = payload.get("prompt")
+    if isinstance(prompt, str):
+        tokens += len(prompt) // 4
+    elif isinstance(prompt, list):
+        tokens += sum(len(p) // 4 for p in prompt if isinstance(p, str))
+    if payload.get("tools"):
+        tokens += len(json.dumps(payload["tools"])) // 4
+    tokens += payload.get("max_tokens") or payload.get("max_completion_tokens") or DEFAULT_COMPLETION_ESTIMATE
+    return max(1, tokens)
+
+
+def parse_retry_after(headers) -> float:
+    """Seconds to wait according to retry-after-ms / Retry-After, or None"""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    # This runs inside the httpx response hook; an unparseable header must not abort the request
+    try:
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        # HTTP dates are always GMT
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+class RateLimiter:
+    """Process-wide token bucket over requests/minute and tokens/minute.
+
+    Every LLM HTTP client shares one instance through httpx event hooks, so
+    the agent, case generator and code generator draw from the same quota.
+    On a 429 all callers pause until the server's Retry-After has passed and
+    the effective rate is cut multiplicatively; each success then restores
+    it additively (AIMD), which keeps the deployment near its quota without
+    throttling storms. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, rpm: int = None, tpm: int = None):
+        self.rpm = rpm if rpm is not None else int(os.getenv("AZURE_OPENAI_RPM", "0"))
+        self.tpm = tpm if tpm is not None else int(os.getenv("AZURE_OPENAI_TPM", "0"))
+        self.rate_factor = 1.0
+        self.min_rate_factor = 0.1
+        self._request_tokens = float(self.rpm)
+        self._token_tokens = float(self.tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "waited": 0.0, "estimated_tokens": 0}
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            capacity = self.rpm * self.rate_factor
+            self._request_tokens = min(capacity, self._request_tokens + elapsed * capacity / 60)
+        if self.tpm:
+            capacity = self.tpm * self.rate_factor
+            self._token_tokens = min(capacity, self._token_tokens + elapsed * capacity / 60)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Consume capacity and return 0, or return the seconds to wait before retrying"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self._blocked_until - now)
+            if self.rpm and self._request_tokens < 1:
+                wait = max(wait, (1 - self._request_tokens) * 60 / (self.rpm * self.rate_factor))
+            if self.tpm:
+                tokens = min(tokens, self.tpm * self.rate_factor)
+                if self._token_tokens < tokens:
+                    wait = max(wait, (tokens - self._token_tokens) * 60 / (self.tpm * self.rate_factor))
+            if wait > 0:
+                return wait
+            if self.rpm:
+                self._request_tokens -= 1
+            if self.tpm:
+                self._token_tokens -= tokens
+            self.stats["requests"] += 1
+            self.stats["estimated_tokens"] += tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 1):
+        """Block the calling thread until the request fits in the quota"""
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            self.stats["waited"] += wait
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1):
+        """Wait (without blocking the event loop) until the request fits in the quota"""
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            self.stats["waited"] += wait
+            await asyncio.sleep(wait)
+
+    def record_response(self, status_code: int, headers):
+        """Adapt the rate to the server's answer"""
+        with self._lock:
+            if status_code == 429:
+                self._consecutive_throttles += 1
+                retry_after = parse_retry_after(headers)
+                if retry_after is None:
+                    retry_after = min(60.0, 2.0 ** self._consecutive_throttles)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                self.rate_factor = max(self.min_rate_factor, self.rate_factor * 0.7)
+                self.stats["throttled"] += 1
+                print(
+                    f"[Warning] LLM request throttled (429); pausing all LLM calls for {retry_after:.1f}s, "
+                    f"rate at {self.rate_factor:.0%} of quota."
+                )
+            elif status_code < 400:
+                self._consecutive_throttles = 0
+                self.rate_factor = min(1.0, self.rate_factor + 0.05)
+
+    # httpx event hooks -------------------------------------------------------
+
+    def _request_cost(self, request) -> int:
+        try:
+            return estimate_request_tokens(request.content)
+        except Exception:
+            return DEFAULT_COMPLETION_ESTIMATE
+
+    def sync_event_hooks(self) -> dict:
+        """Event hooks for an httpx.Client"""
+        def on_request(request):
+            self.acquire(self._request_cost(request))
+
+        def on_response(response):
+            self.record_response(response.status_code, response.headers)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def async_event_hooks(self) -> dict:
+        """Event hooks for an httpx.AsyncClient"""
+        async def on_request(request):
+            await self.acquire_async(self._request_cost(request))
+
+        async def on_response(response):
+            self.record_response(response.status_code, response.headers)
+
+        return {"request": [on_request], "response": [on_response]}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide LLM rate limiter"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def llm_max_retries() -> int:
+    """Retries the OpenAI clients perform on 429/5xx (they honour Retry-After)"""
+    return int(os.getenv("LLM_MAX_RETRIES", "6"))
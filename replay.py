@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+
+from trace_ir import element_to_locator
+
+ACTION_TIMEOUT_MS = int(os.getenv("REPLAY_ACTION_TIMEOUT_MS", "10000"))
+# Characters of the final page's text the verification prompt gets
+VERIFY_PAGE_CHARS = int(os.getenv("REPLAY_VERIFY_PAGE_CHARS", "6000"))
+
+# Actions that only read the page; replaying them has no effect on the browser state
+READ_ONLY_ACTIONS = {"extract_content", "get_dropdown_options", "extract_page_content"}
+
+
+class ReplayError(Exception):
+    """Raised when a recorded action cannot be executed against the current page"""
+
+
+def load_recorded_actions(test_name: str, results_dir: str = "results"):
+    """Return the model_actions() recorded for `test_name`, or None if there is no usable recording
+
+    The newest passed run in the results store wins; a legacy results/<name>.json is the fallback.
+    """
+    from results_store import get_results_store
+
+    try:
+        actions = get_results_store().latest_actions(test_name)
+    except Exception as e:
+        print(f"[Warning] Could not read the results store: {e}")
+        actions = None
+    if isinstance(actions, list) and actions:
+        return actions
+    path = os.path.join(results_dir, f"{test_name}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            actions = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return actions if isinstance(actions, list) and actions else None
+
+
+def split_action(action: dict):
+    """Return (name, params, interacted_element) of one model_actions() entry"""
+    element = action.get("interacted_element")
+    for name, params in action.items():
+        if name != "interacted_element":
+            return name, params if isinstance(params, dict) else {}, element
+    return None, {}, element
+
+
+class ReplayHistory:
+    """Stand-in for AgentHistoryList when a run was (partly) replayed.
+
+    `model_actions()` returns the replayed prefix followed by whatever the
+    fallback agent did, so results files and code generation see one trace.
+    A fully replayed run has no agent judging the outcome; it only succeeds
+    once `verify_final_state` confirmed the expected result (`verified`).
+    """
+
+    def __init__(self, replayed_actions: list, final_text: str = None, agent_history=None, error: str = None):
+        self.replayed_actions = replayed_actions
+        self.final_text = final_text
+        self.agent_history = agent_history
+        self.error = error
+        self.history = list(getattr(agent_history, "history", []))
+        self.verified = None
+        self.verification = None
+
+    @property
+    def unverified(self) -> bool:
+        """True for a full replay whose outcome could not be checked"""
+        return self.agent_history is None and self.error is None and self.verified is None
+
+    def is_successful(self) -> bool:
+        if self.agent_history is not None:
+            is_successful = getattr(self.agent_history, "is_successful", None)
+            return bool(is_successful()) if callable(is_successful) else not any(self.agent_history.errors()[-1:])
+        return self.error is None and self.verified is True
+
+    def model_actions(self) -> list:
+        agent_actions = self.agent_history.model_actions() if self.agent_history is not None else []
+        return list(self.replayed_actions) + list(agent_actions)
+
+    def final_result(self):
+        if self.agent_history is not None:
+            return self.agent_history.final_result()
+        return self.final_text
+
+    def is_done(self) -> bool:
+        if self.agent_history is not None:
+            return self.agent_history.is_done()
+        return self.error is None
+
+    def errors(self) -> list:
+        agent_errors = self.agent_history.errors() if self.agent_history is not None else []
+        own = [self.error] if self.error else []
+        if self.agent_history is None and self.verified is not True and self.verification:
+            own.append(self.verification)
+        return own + list(agent_errors)
+
+    def urls(self) -> list:
+        replayed = [split_action(a)[1].get("url") for a in self.replayed_actions if isinstance(a, dict)]
+        agent_urls = self.agent_history.urls() if self.agent_history is not None else []
+        return [url for url in replayed if url] + list(agent_urls)
+
+
+class ReplayEngine:
+    """Executes recorded browser_use actions directly with Playwright, without any LLM call.
+
+    Elements are located by the XPath recorded in `interacted_element`, so a
+    replay survives changed highlight indexes but stops at the first action
+    whose element no longer exists.
+    """
+
+    def __init__(self, browser_context, timeout_ms: int = ACTION_TIMEOUT_MS):
+        self.browser_context = browser_context
+        self.timeout_ms = timeout_ms
+
+    async def _page(self):
+        return await self.browser_context.get_current_page()
+
+    async def _locator(self, element):
+        locator = element_to_locator(element)
+        if locator is None:
+            raise ReplayError("recorded action has no interacted element xpath")
+        page = await self._page()
+        return page.locator(f"xpath=/{locator['xpath'].lstrip('/')}").first
+
+    async def _settle(self):
+        page = await self._page()
+        try:
+            await page.wait_for_load_state("domcontentloaded", timeout=self.timeout_ms)
+        except Exception:
+            pass
+
+    async def execute(self, action: dict):
+        """Run one recorded action; returns the `done` text for a done action, else None"""
+        name, params, element = split_action(action)
+        page = await self._page()
+
+        if name == "done":
+            return params.get("text", "")
+        if name in READ_ONLY_ACTIONS:
+            return None
+        if name == "go_to_url":
+            await page.goto(params["url"], timeout=self.timeout_ms * 3)
+        elif name == "search_google":
+            await page.goto(f"https://www.google.com/search?q={params['query']}&udm=14", timeout=self.timeout_ms * 3)
+        elif name == "open_tab":
+            await self.browser_context.create_new_tab(params["url"])
+        elif name == "switch_tab":
+            await self.browser_context.switch_to_tab(params["page_id"])
+        elif name == "go_back":
+            await page.go_back(timeout=self.timeout_ms)
+        elif name == "wait":
+            await asyncio.sleep(params.get("seconds", 3))
+        elif name in ("click_element", "click_element_by_index"):
+            await (await self._locator(element)).click(timeout=self.timeout_ms)
+        elif name in ("input_text", "input_text_by_index"):
+            await (await self._locator(element)).fill(params.get("text", ""), timeout=self.timeout_ms)
+        elif name == "select_dropdown_option":
+            await (await self._locator(element)).select_option(label=params.get("text"), timeout=self.timeout_ms)
+        elif name == "send_keys":
+            await page.keyboard.press(params["keys"])
+        elif name in ("scroll_down", "scroll_up"):
+            amount = params.get("amount")
+            amount = amount if amount is not None else "window.innerHeight"
+            sign = "" if name == "scroll_down" else "-"
+            await page.evaluate(f"window.scrollBy(0, {sign}{amount})")
+        elif name == "scroll_to_text":
+            await page.get_by_text(params["text"], exact=False).first.scroll_into_view_if_needed(timeout=self.timeout_ms)
+        else:
+            raise ReplayError(f"action '{name}' is not supported by the replay engine")
+
+        await self._settle()
+        return None
+
+    async def verify_final_state(self, test_case, llm, done_text: str = None):
+        """Ask `llm` once whether the current page shows the test's expected result.
+
+        Returns (verified, reason): verified is True or False from a PASS/FAIL
+        answer, None when the check could not be made.
+        """
+        try:
+            page = await self._page()
+            page_text = (await page.inner_text("body"))[:VERIFY_PAGE_CHARS]
+            prompt = (
+                "A recorded browser test was replayed without an agent. Decide from the final page whether the "
+                "test's expected result holds.\n"
+                f"Test case: {test_case.description}\n"
+                f"Expected result: {test_case.expected_result}\n"
+                f"Recorded final answer: {done_text or '(none)'}\n"
+                f"Final page URL: {page.url}\n"
+                f"Final page text:\n{page_text}\n\n"
+                "Answer with PASS or FAIL on the first line, followed by a one-sentence reason."
+            )
+            response = await llm.ainvoke(prompt)
+        except Exception as e:
+            return None, f"replay verification could not run: {e}"
+        answer = str(getattr(response, "content", response)).strip()
+        verdict = answer.split(None, 1)[0].strip(".:*").upper() if answer else ""
+        if verdict not in ("PASS", "FAIL"):
+            return None, f"replay verification gave no verdict: {answer[:200]}"
+        return verdict == "PASS", f"replay verification {verdict.lower()}ed: {answer[:500]}"
+
+    async def replay(self, actions: list):
+        """Replay `actions` in order.
+
+        Returns (replayed_count, done_text, error). `error` is None when every
+        action replayed; otherwise replay stopped at index `replayed_count`.
+        """
+        for index, action in enumerate(actions):
+            try:
+                done_text = await self.execute(action)
+            except Exception as e:
+                name = split_action(action)[0] if isinstance(action, dict) else None
+                return index, None, f"replay failed at action {index} ({name}): {e}"
+            if done_text is not None:
+                return index + 1, done_text, None
+        return len(actions), None, None
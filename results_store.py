@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from trace_ir import json_default
+
+DEFAULT_STORE_PATH = os.path.join("results", "runs.sqlite3")
+FAILED_STATUSES = ("failed", "error")
+SUMMARY_COLUMNS = (
+    "run_id", "test_name", "started_at", "finished_at", "duration", "status",
+    "url", "action_count", "error", "final_result", "replay", "payload_bytes",
+)
+
+
+def encode_payload(actions) -> bytes:
+    return zlib.compress(json.dumps(actions, ensure_ascii=False, default=json_default).encode("utf-8"), 6)
+
+
+def decode_payload(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def parse_since(value: str) -> float:
+    """Epoch seconds from an ISO date/time, an epoch number, or a relative age such as 24h / 7d / 30m"""
+    value = value.strip()
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if value[-1:].lower() in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1].lower()]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class ResultsStore:
+    """Keeps every test run: indexed metadata plus the zlib-compressed action history.
+
+    Each run gets its own id, so reruns never overwrite earlier ones. Queries
+    such as "last N runs of a test" or "all failures since T" read only the
+    indexed summary columns; the history is decompressed only when it is
+    asked for with `load_actions`.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("RESULTS_STORE", DEFAULT_STORE_PATH)
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS runs (
+                            run_id TEXT PRIMARY KEY,
+                            test_name TEXT NOT NULL,
+                            started_at REAL NOT NULL,
+                            finished_at REAL NOT NULL,
+                            duration REAL NOT NULL,
+                            status TEXT NOT NULL,
+                            url TEXT NOT NULL DEFAULT '',
+                            action_count INTEGER NOT NULL DEFAULT 0,
+                            error TEXT,
+                            final_result TEXT,
+                            replay INTEGER NOT NULL DEFAULT 0,
+                            payload_bytes INTEGER NOT NULL DEFAULT 0,
+                            payload BLOB
+                        );
+                        CREATE INDEX IF NOT EXISTS idx_runs_test ON runs (test_name, started_at);
+                        CREATE INDEX IF NOT EXISTS idx_runs_status ON runs (status, started_at);
+                        CREATE INDEX IF NOT EXISTS idx_runs_duration ON runs (duration);
+                        CREATE INDEX IF NOT EXISTS idx_runs_url ON runs (url);
+                        """
+                    )
+                    self._schema_ready = True
+        return conn
+
+    def record_run(self, test_name: str, actions, status: str, started_at: float, duration: float,
+                   url: str = "", final_result: str = None, error: str = None, replay: bool = False) -> str:
+        """Store one run and return its id"""
+        run_id = uuid.uuid4().hex
+        payload = encode_payload(actions if actions is not None else [])
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f"""INSERT INTO runs ({", ".join(SUMMARY_COLUMNS)}, payload)
+                    VALUES ({", ".join("?" * (len(SUMMARY_COLUMNS) + 1))})""",
+                (run_id, test_name, started_at, started_at + duration, duration, status, url or "",
+                 len(actions or []), error, None if final_result is None else str(final_result),
+                 int(replay), len(payload), payload),
+            )
+        return run_id
+
+    def runs(self, test_name: str = None, status: str = None, since: float = None, url: str = None,
+             limit: int = None) -> list:
+        """Run summaries (without histories), newest first; `status` may be one status or a tuple of them"""
+        clauses, params = [], []
+        if isinstance(status, (tuple, list)):
+            clauses.append(f"status IN ({', '.join('?' * len(status))})")
+            params.extend(status)
+            status = None
+        for column, value in (("test_name", test_name), ("status", status), ("url", url)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY started_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self._connection().execute(query, params)]
+
+    def last_runs(self, test_name: str, n: int = 10) -> list:
+        return self.runs(test_name=test_name, limit=n)
+
+    def failures_since(self, since: float) -> list:
+        return self.runs(status=FAILED_STATUSES, since=since)
+
+    def load_actions(self, run_id: str):
+        row = self._connection().execute("SELECT payload FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return decode_payload(row["payload"]) if row and row["payload"] is not None else None
+
+    def latest_actions(self, test_name: str, status: str = "passed"):
+        """History of the newest run of `test_name` with `status` (any status if None) that recorded any action"""
+        query = "SELECT payload FROM runs WHERE test_name = ? AND action_count > 0"
+        params = [test_name]
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        row = self._connection().execute(query + " ORDER BY started_at DESC LIMIT 1", params).fetchone()
+        return decode_payload(row["payload"]) if row else None
+
+
+_stores: dict = {}
+_stores_lock = threading.Lock()
+
+
+def get_results_store(path: str = None) -> ResultsStore:
+    """Return the shared results store for `path` (defaults to RESULTS_STORE / results/runs.sqlite3)"""
+    path = path or os.getenv("RESULTS_STORE", DEFAULT_STORE_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ResultsStore(path)
+            _stores[path] = store
+        return store
+
+
+def _print_runs(runs: list):
+    print(f"{'run id':<34}{'test':<32}{'started':<21}{'status':<8}{'duration':>9}{'actions':>9}  url")
+    for run in runs:
+        started = datetime.fromtimestamp(run["started_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(
+            f"{run['run_id']:<34}{run['test_name'][:31]:<32}{started:<21}{run['status']:<8}"
+            f"{run['duration']:>8.1f}s{run['action_count']:>9}  {run['url']}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the stored test runs.")
+    parser.add_argument("--store", default=None, help="Path of the results store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    last = commands.add_parser("last", help="Last N runs of a test")
+    last.add_argument("test_name")
+    last.add_argument("-n", type=int, default=10)
+    failures = commands.add_parser("failures", help="Failed runs since a time (ISO date, epoch, or 24h / 7d)")
+    failures.add_argument("--since", default="24h")
+    show = commands.add_parser("show", help="Print the action history of one run")
+    show.add_argument("run_id")
+    args = parser.parse_args(argv)
+
+    store = get_results_store(args.store)
+    if args.command == "last":
+        _print_runs(store.last_runs(args.test_name, args.n))
+    elif args.command == "failures":
+        _print_runs(store.failures_since(parse_since(args.since)))
+    else:
+        actions = store.load_actions(args.run_id)
+        if actions is None:
+            print(f"[Error] Unknown run id {args.run_id}")
+            return 1
+        print(json.dumps(actions, indent=4, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
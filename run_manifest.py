@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from agent_inputs import agent_inputs_version
+
+DEFAULT_MANIFEST_PATH = os.path.join("results", "manifest.sqlite3")
+UNCHANGED_MODES = ("skip", "replay", "run")
+
+
+def digest(*parts) -> str:
+    """Stable short hash of JSON-serializable inputs"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def case_definition(test_case) -> dict:
+    return test_case.model_dump() if hasattr(test_case, "model_dump") else dict(vars(test_case))
+
+
+def unchanged_mode() -> str:
+    mode = os.getenv("MANIFEST_UNCHANGED", "skip").strip().lower()
+    if mode not in UNCHANGED_MODES:
+        print(f"[Warning] Unknown MANIFEST_UNCHANGED '{mode}', using 'skip'.")
+        return "skip"
+    return mode
+
+
+class SkipSummary:
+    """What this process skipped or re-ran, and why"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"run_skipped": Counter(), "run_revalidated": Counter(), "run_executed": Counter(),
+                       "codegen_skipped": Counter(), "codegen_executed": Counter()}
+
+    def note(self, kind: str, reason: str):
+        with self._lock:
+            self.counts[kind][reason] += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {kind: dict(reasons) for kind, reasons in self.counts.items()}
+
+
+def format_skip_summary(counts: dict) -> str:
+    labels = (("run_skipped", "run(s) skipped"), ("run_revalidated", "run(s) re-validated by replay"),
+              ("run_executed", "run(s) executed"), ("codegen_skipped", "codegen skipped"),
+              ("codegen_executed", "codegen executed"))
+    parts = []
+    for kind, label in labels:
+        reasons = counts.get(kind) or {}
+        if reasons:
+            detail = ", ".join(f"{reason}: {count:.0f}" for reason, count in sorted(reasons.items()))
+            parts.append(f"{sum(reasons.values()):.0f} {label} ({detail})")
+    return "; ".join(parts) or "nothing recorded"
+
+
+class RunManifest:
+    """Input hashes of each test's last run and last code generation, build-system style.
+
+    A run is keyed by the test case definition and the agent's model and
+    instructions; code generation by the definition, the recorded trace and
+    the prompt template versions and model. When a key matches what was
+    recorded (and the last run passed / the generated file still exists),
+    the work can be skipped.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("RUN_MANIFEST", DEFAULT_MANIFEST_PATH)
+        self.summary = SkipSummary()
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.execute(
+                        """CREATE TABLE IF NOT EXISTS manifest (
+                               test_name TEXT PRIMARY KEY,
+                               run_hash TEXT,
+                               trace_hash TEXT,
+                               status TEXT,
+                               run_id TEXT,
+                               codegen_hash TEXT,
+                               output_path TEXT,
+                               updated_at REAL NOT NULL
+                           )"""
+                    )
+                    self._schema_ready = True
+        return conn
+
+    def get(self, test_name: str):
+        row = self._connection().execute("SELECT * FROM manifest WHERE test_name = ?", (test_name,)).fetchone()
+        return dict(row) if row else None
+
+    def record_run(self, test_name: str, run_hash: str, trace_hash: str, status: str, run_id: str = None):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """INSERT INTO manifest (test_name, run_hash, trace_hash, status, run_id, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (test_name) DO UPDATE SET
+                       run_hash = excluded.run_hash, trace_hash = excluded.trace_hash, status = excluded.status,
+                       run_id = excluded.run_id, updated_at = excluded.updated_at""",
+                (test_name, run_hash, trace_hash, status, run_id, time.time()),
+            )
+
+    def record_codegen(self, test_name: str, codegen_hash: str, output_path: str):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """INSERT INTO manifest (test_name, codegen_hash, output_path, updated_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (test_name) DO UPDATE SET
+                       codegen_hash = excluded.codegen_hash, output_path = excluded.output_path,
+                       updated_at = excluded.updated_at""",
+                (test_name, codegen_hash, output_path, time.time()),
+            )
+
+    def run_decision(self, test_name: str, run_hash: str):
+        """(unchanged, reason): unchanged only when the inputs match and the last run passed"""
+        entry = self.get(test_name)
+        if entry is None or entry["run_hash"] is None:
+            return False, "new"
+        if entry["run_hash"] != run_hash:
+            return False, "definition or agent changed"
+        if entry["status"] != "passed":
+            return False, f"last run {entry['status']}"
+        return True, "unchanged, last run passed"
+
+    def codegen_decision(self, test_name: str, codegen_hash: str):
+        """(unchanged, reason): unchanged when trace and templates match and the generated file exists"""
+        entry = self.get(test_name)
+        if entry is None or entry["codegen_hash"] is None:
+            return False, "new"
+        if entry["codegen_hash"] != codegen_hash:
+            return False, "trace or template changed"
+        if not entry["output_path"] or not os.path.exists(entry["output_path"]):
+            return False, "generated file missing"
+        return True, "same trace and template"
+
+
+_manifests: dict = {}
+_manifests_lock = threading.Lock()
+
+
+def get_run_manifest(path: str = None) -> RunManifest:
+    """Return the shared manifest for `path` (defaults to RUN_MANIFEST / results/manifest.sqlite3)"""
+    path = path or os.getenv("RUN_MANIFEST", DEFAULT_MANIFEST_PATH)
+    with _manifests_lock:
+        manifest = _manifests.get(path)
+        if manifest is None:
+            manifest = RunManifest(path)
+            _manifests[path] = manifest
+        return manifest
+
+
+def run_inputs_hash(test_case) -> str:
+    """Hash of everything that decides how a test runs: its definition and the agent's model and instructions"""
+    return digest(case_definition(test_case), agent_inputs_version())
+
+
+def plan_runs(test_cases: list, force: bool = False, mode: str = None):
+    """Split the suite into (to_run, to_revalidate, skipped entries) according to the manifest"""
+    manifest = get_run_manifest()
+    mode = mode or unchanged_mode()
+    to_run, to_revalidate, skipped = [], [], []
+    for test_case in test_cases:
+        if force:
+            manifest.summary.note("run_executed", "forced")
+            to_run.append(test_case)
+            continue
+        unchanged, reason = manifest.run_decision(test_case.name, run_inputs_hash(test_case))
+        if not unchanged or mode == "run":
+            manifest.summary.note("run_executed", reason)
+            to_run.append(test_case)
+        elif mode == "replay":
+            manifest.summary.note("run_revalidated", reason)
+            to_revalidate.append(test_case)
+        else:
+            manifest.summary.note("run_skipped", reason)
+            skipped.append({"test_case": test_case.name, "status": "SKIPPED", "error": None, "result": None,
+                            "reason": reason})
+    return to_run, to_revalidate, skipped
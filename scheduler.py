@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+DEFAULT_DURATIONS_FILE = os.path.join("results", ".durations.json")
+
+# Seconds the current test case has spent holding browser or LLM slots
+_held_time = contextvars.ContextVar("held_time", default=None)
+
+
+class TestScheduler:
+    """Runs a test suite with bounded concurrency and failure isolation.
+
+    Browser agents and LLM calls are limited by two separate semaphores so a
+    burst of code generation never starves the browsers (and vice versa).
+    Cases are started by descending priority, then by their last known
+    duration, longest first, so the slowest cases do not end up as the tail
+    of the run.
+    """
+
+    def __init__(self, max_browsers: int = None, max_llm_calls: int = None,
+                 durations_file: str = DEFAULT_DURATIONS_FILE):
+        self.max_browsers = max_browsers or int(
+            os.getenv("MAX_CONCURRENT_BROWSERS", os.getenv("BROWSER_POOL_SIZE", "3"))
+        )
+        self.max_llm_calls = max_llm_calls or int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "4"))
+        self.durations_file = durations_file
+        self._browser_slots = asyncio.Semaphore(self.max_browsers)
+        self._llm_slots = asyncio.Semaphore(self.max_llm_calls)
+        self.durations = self._load_durations()
+
+    def _load_durations(self) -> dict:
+        if not self.durations_file:
+            return {}
+        try:
+            with open(self.durations_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_durations(self):
+        if not self.durations_file:
+            # Durations only live in memory; worker processes report them to their coordinator
+            return
+        os.makedirs(os.path.dirname(self.durations_file) or ".", exist_ok=True)
+        with open(self.durations_file, "w", encoding="utf-8") as f:
+            json.dump(self.durations, f, indent=4, ensure_ascii=False)
+
+    @staticmethod
+    @asynccontextmanager
+    async def _timed(slots: asyncio.Semaphore):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                held = _held_time.get()
+                if held is not None:
+                    held[0] += time.perf_counter() - started
+
+    def browser_slot(self):
+        """Hold one of the browser agent slots"""
+        return self._timed(self._browser_slots)
+
+    def llm_slot(self):
+        """Hold one of the LLM call slots"""
+        return self._timed(self._llm_slots)
+
+    def order(self, test_cases: list) -> list:
+        """Sort by priority (highest first), then by last known duration (longest first)"""
+        return sorted(
+            test_cases,
+            key=lambda tc: (
+                -(getattr(tc, "priority", 0) or 0),
+                -self.durations.get(tc.name, 0.0),
+            ),
+        )
+
+    async def _run_isolated(self, test_case, run_one):
+        # Only time spent holding a slot counts; waiting in the queue says nothing about the case
+        held = [0.0]
+        _held_time.set(held)
+        started = time.perf_counter()
+        try:
+            result = await run_one(test_case, self)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Error] Test '{test_case.name}' failed: {e}")
+            return {"test_case": test_case.name, "status": "ERROR", "error": str(e), "result": None}
+        self.durations[test_case.name] = round(held[0] or time.perf_counter() - started, 3)
+        return {"test_case": test_case.name, "status": "DONE", "error": None, "result": result}
+
+    async def run(self, test_cases: list, run_one) -> list:
+        """Run `run_one(test_case, scheduler)` for every case; one failure never cancels the rest"""
+        ordered = self.order(test_cases)
+        print(
+            f"[Info] Scheduling {len(ordered)} test case(s) with {self.max_browsers} browser slot(s) "
+            f"and {self.max_llm_calls} LLM slot(s)."
+        )
+        tasks = [asyncio.create_task(self._run_isolated(tc, run_one)) for tc in ordered]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            self.save_durations()
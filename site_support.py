@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+# Classes the site support prompt asks for; the per-test prompt only gets their public API
+SUPPORT_CLASSES = ("DriverFactory", "ElementFinder", "ScreenshotHelper", "BasePage", "BaseTest")
+MANIFEST_NAME = "support.json"
+
+FILE_MARKER = re.compile(r"^[ \t]*//[ \t]*FILE:[ \t]*([\w./-]+\.java)[ \t]*$", re.MULTILINE)
+_CLASS_DECLARATION = re.compile(r"\b(?:class|interface|enum)\s+(\w+)")
+_PUBLIC_MEMBER = re.compile(
+    r"^[ \t]*(public\s+(?:static\s+|final\s+|abstract\s+|synchronized\s+)*[\w<>\[\],.? ]+?\s+\w+\s*\([^)]*\))",
+    re.MULTILINE,
+)
+
+
+def shared_support_enabled() -> bool:
+    return os.getenv("CODEGEN_SHARED_SUPPORT", "").strip().lower() in ("1", "true", "yes")
+
+
+def site_key(url: str) -> str:
+    """Host a test case belongs to, without a leading www. ("" when the URL has no host)"""
+    host = (urlsplit(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def site_package(site: str) -> str:
+    name = re.sub(r"\W", "_", site).strip("_") or "site"
+    return "support." + ("_" + name if name[0].isdigit() else name)
+
+
+def strip_fences(source: str) -> str:
+    source = source.strip()
+    source = re.sub(r"^```\w*\s*\n", "", source)
+    return re.sub(r"\n?```\s*$", "", source).strip()
+
+
+def split_java_files(content: str) -> dict:
+    """Split a completion into {file name: source} on `// FILE: Name.java` marker lines.
+
+    Without markers the whole completion is one file named after its first
+    class declaration.
+    """
+    content = content or ""
+    markers = list(FILE_MARKER.finditer(content))
+    if not markers:
+        source = strip_fences(content)
+        match = _CLASS_DECLARATION.search(source)
+        return {f"{match.group(1)}.java": source} if match else {}
+    files = {}
+    for marker, following in zip(markers, markers[1:] + [None]):
+        end = following.start() if following is not None else len(content)
+        source = strip_fences(content[marker.end():end])
+        if source:
+            files[os.path.basename(marker.group(1))] = source
+    return files
+
+
+def missing_support_classes(files: dict) -> list:
+    """SUPPORT_CLASSES without a file of their own that declares them"""
+    missing = []
+    for name in SUPPORT_CLASSES:
+        source = files.get(f"{name}.java") or ""
+        if name not in (match.group(1) for match in _CLASS_DECLARATION.finditer(source)):
+            missing.append(name)
+    return missing
+
+
+def api_summary(files: dict) -> str:
+    """One line per public method signature of the support classes, for the per-test prompt"""
+    lines = []
+    for name, source in sorted(files.items()):
+        signatures = list(dict.fromkeys(
+            " ".join(match.group(1).split()) for match in _PUBLIC_MEMBER.finditer(source)
+        ))
+        lines.append(f"{name.removesuffix('.java')}:")
+        lines.extend(f"  {signature}" for signature in signatures)
+    return "\n".join(lines)
+
+
+class SiteSupport:
+    """Support classes generated for one site"""
+
+    def __init__(self, site: str, package: str, directory: str, files: dict):
+        self.site = site
+        self.package = package
+        self.directory = directory
+        self.files = files
+        self.api = api_summary(files)
+
+
+class SiteSupportCache:
+    """Per-site support classes on disk, reused while the prompt template and model stay the same.
+
+    Each site gets a directory under `root` holding its generated classes
+    (package `support.<site>`) and a manifest with the template version and
+    model they were generated with. Locks make concurrent tests on the same
+    site wait for the first generation instead of repeating it.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._locks = {}
+        self._async_locks = {}
+        self._locks_lock = threading.Lock()
+
+    def directory_for(self, site: str) -> str:
+        return os.path.join(self.root, site_package(site).split(".", 1)[1])
+
+    def lock(self, site: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(site, threading.Lock())
+
+    def alock(self, site: str) -> asyncio.Lock:
+        # asyncio locks belong to one loop; keyed by the loop itself (an id can be reused by the next asyncio.run)
+        loop = asyncio.get_running_loop()
+        with self._locks_lock:
+            for key in [key for key in self._async_locks if key[1].is_closed()]:
+                del self._async_locks[key]
+            return self._async_locks.setdefault((site, loop), asyncio.Lock())
+
+    def get(self, site: str, template_version: str, model: str):
+        directory = self.directory_for(site)
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("template_version") != template_version or manifest.get("model") != model:
+                return None
+            files = {}
+            for name in manifest["files"]:
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    files[name] = f.read()
+        except (FileNotFoundError, KeyError, json.JSONDecodeError):
+            return None
+        if missing_support_classes(files):
+            return None
+        return SiteSupport(site, manifest["package"], directory, files)
+
+    def save(self, site: str, files: dict, template_version: str, model: str) -> SiteSupport:
+        directory = self.directory_for(site)
+        os.makedirs(directory, exist_ok=True)
+        package = site_package(site)
+        for name, source in files.items():
+            self._write(os.path.join(directory, name), source)
+        manifest = {"site": site, "package": package, "template_version": template_version, "model": model,
+                    "files": sorted(files)}
+        self._write(os.path.join(directory, MANIFEST_NAME), json.dumps(manifest, indent=4))
+        print(f"[Info] Support classes for {site} saved to {directory}/ ({', '.join(sorted(files))}).")
+        return SiteSupport(site, package, directory, files)
+
+    @staticmethod
+    def _write(path: str, text: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
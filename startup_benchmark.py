@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Entry points whose cold start matters (API container, CLIs) plus the heavy leaf module
+DEFAULT_MODULES = ["api", "case_generator", "test_runner", "jobs", "java_code_generator", "ai_agent"]
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+            rows.append((module.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def measure_module(module: str, repeat: int = 3) -> dict:
+    """Import `module` in fresh interpreters and return the best wall-clock and its heaviest imports"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+            return {"module": module, "error": error}
+        rows = parse_importtime(proc.stderr)
+        if best is None or wall < best["wall_seconds"]:
+            own = next((row for row in rows if row[0] == module), None)
+            best = {
+                "module": module,
+                "wall_seconds": round(wall, 4),
+                "import_seconds": round(own[2] / 1e6, 4) if own else None,
+                "modules_loaded": len(rows),
+                "heaviest": [
+                    {"module": name, "cumulative_seconds": round(cumulative / 1e6, 4)}
+                    for name, _, cumulative in sorted(rows, key=lambda row: row[2], reverse=True)
+                    if "." not in name and name != module
+                ][:10],
+            }
+    return best
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Return the modules whose import time grew by more than `tolerance` (fraction)"""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["module"], {})
+        if result.get("import_seconds") and previous.get("import_seconds"):
+            growth = result["import_seconds"] / previous["import_seconds"] - 1
+            if growth > tolerance:
+                regressions.append((result["module"], previous["import_seconds"], result["import_seconds"], growth))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the entry-point modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module (best run is kept)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON file from a previous --output run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = [measure_module(module, args.repeat) for module in args.modules]
+
+    print(f"{'module':<22}{'import':>10}{'wall':>10}{'modules':>10}  heaviest dependencies")
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<22}{'failed':>10}  {result['error']}")
+            continue
+        heaviest = ", ".join(f"{h['module']} {h['cumulative_seconds'] * 1000:.0f}ms" for h in result["heaviest"][:3])
+        import_ms = f"{result['import_seconds'] * 1000:.0f}ms" if result["import_seconds"] is not None else "-"
+        print(
+            f"{result['module']:<22}{import_ms:>10}{result['wall_seconds'] * 1000:>8.0f}ms"
+            f"{result['modules_loaded']:>10}  {heaviest}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({r["module"]: r for r in results}, f, indent=4)
+        print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for module, before, after, growth in regressions:
+            print(f"❌ {module}: {before * 1000:.0f}ms -> {after * 1000:.0f}ms (+{growth:.0%})")
+        if regressions:
+            return 1
+        print("✅ No import-time regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from trace_ir import json_default
+
+DEFAULT_MEMO_PATH = os.path.join(".step_memo", "steps.sqlite3")
+
+# Attributes that identify the structure of a page without its volatile content
+_FINGERPRINT_ATTRIBUTES = ("id", "name", "type", "role")
+_MATCH_THRESHOLD = 0.5
+
+
+def step_memo_enabled() -> bool:
+    return os.getenv("STEP_MEMO_ENABLED", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def normalize_step(step: str) -> str:
+    """Case- and whitespace-insensitive form of a test step"""
+    return re.sub(r"\s+", " ", step or "").strip().rstrip(".").lower()
+
+
+def normalize_url(url: str) -> str:
+    """Scheme, host and path only; query strings and fragments vary between runs"""
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return url
+    return f"{parts.scheme}://{parts.netloc.lower()}{parts.path.rstrip('/') or '/'}"
+
+
+def dom_fingerprint(selector_map: dict) -> str:
+    """Hash the set of interactive element signatures of a browser_use selector map"""
+    signatures = set()
+    for node in (selector_map or {}).values():
+        attributes = getattr(node, "attributes", None) or {}
+        signatures.add(
+            (getattr(node, "tag_name", "") or "",) + tuple(attributes.get(key, "") for key in _FINGERPRINT_ATTRIBUTES)
+        )
+    return hashlib.sha256(json.dumps(sorted(signatures)).encode("utf-8")).hexdigest()[:16]
+
+
+class StepMemo:
+    """Remembers which concrete actions completed a test step on a given page.
+
+    Entries are keyed by (normalized step text, normalized URL) and carry the
+    DOM fingerprint of the page the step started on. A lookup whose
+    fingerprint no longer matches invalidates the entry, as does a replay of
+    the stored actions that fails.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("STEP_MEMO_PATH", DEFAULT_MEMO_PATH)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS steps (
+                       step TEXT NOT NULL,
+                       url TEXT NOT NULL,
+                       fingerprint TEXT NOT NULL,
+                       actions TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       hits INTEGER NOT NULL DEFAULT 0,
+                       PRIMARY KEY (step, url)
+                   )"""
+            )
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, step: str, url: str, fingerprint: str):
+        """Return the memoized actions for this step on this page, or None"""
+        key = (normalize_step(step), normalize_url(url))
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT fingerprint, actions FROM steps WHERE step = ? AND url = ?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[0] != fingerprint:
+                conn.execute("DELETE FROM steps WHERE step = ? AND url = ?", key)
+                conn.commit()
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE steps SET hits = hits + 1 WHERE step = ? AND url = ?", key)
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[1])
+
+    def record(self, step: str, url: str, fingerprint: str, actions: list):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO steps (step, url, fingerprint, actions, created_at) VALUES (?, ?, ?, ?, ?)",
+                (normalize_step(step), normalize_url(url), fingerprint,
+                 json.dumps(actions, ensure_ascii=False, default=json_default), time.time()),
+            )
+            conn.commit()
+            self.recorded += 1
+
+    def invalidate(self, step: str, url: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM steps WHERE step = ? AND url = ?", (normalize_step(step), normalize_url(url)))
+            conn.commit()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "recorded": self.recorded,
+        }
+
+
+class StepRecorder:
+    """Collects what the agent did for each test step so it can be memoized after a verified run.
+
+    `on_new_step` is a browser_use new-step callback: it captures the page URL
+    and DOM fingerprint the model saw, and matches the model's stated goal to
+    the closest remaining test step. Which actions actually ran is taken from
+    the final history, since browser_use may skip planned actions.
+    """
+
+    def __init__(self, steps: list):
+        self.steps = list(steps)
+        self.observations = []
+        self._current = 0
+
+    def _match_step(self, goal: str) -> int:
+        if not self.steps:
+            return 0
+        goal = normalize_step(goal)
+        best, best_ratio = self._current, 0.0
+        for index in range(self._current, len(self.steps)):
+            ratio = difflib.SequenceMatcher(None, goal, normalize_step(self.steps[index])).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = index, ratio
+        if best_ratio >= _MATCH_THRESHOLD:
+            self._current = best
+        return self._current
+
+    def on_new_step(self, state, model_output, step_number):
+        current_state = getattr(model_output, "current_state", None)
+        goal = getattr(current_state, "next_goal", "") or ""
+        self.observations.append({
+            "step_index": self._match_step(goal),
+            "url": getattr(state, "url", ""),
+            "fingerprint": dom_fingerprint(getattr(state, "selector_map", None)),
+        })
+
+    def _aligned(self, items: list) -> bool:
+        """True when every observation belongs to the history item at the same position"""
+        if len(items) != len(self.observations):
+            print(f"[Warning] Step memo: {len(self.observations)} observed step(s) but {len(items)} in the history; "
+                  f"nothing memoized.")
+            return False
+        for number, (observation, item) in enumerate(zip(self.observations, items), start=1):
+            url = getattr(getattr(item, "state", None), "url", "")
+            if normalize_url(url) != normalize_url(observation["url"]):
+                print(f"[Warning] Step memo: agent step {number} was observed on {observation['url']} but ran on "
+                      f"{url}; nothing memoized.")
+                return False
+        return True
+
+    def memo_entries(self, history) -> list:
+        """(step, url, fingerprint, actions) per test step, built from a finished agent history.
+
+        Observations and history items are paired by position, so a history
+        that does not line up with them (a step without model output, a retried
+        step) is not memoized at all rather than memoized against the wrong page.
+        """
+        items = [item for item in getattr(history, "history", []) if getattr(item, "model_output", None)]
+        if not self._aligned(items):
+            return []
+        entries = {}
+        for observation, item in zip(self.observations, items):
+            executed = len(getattr(item, "result", None) or [])
+            planned = item.model_output.action[:executed]
+            elements = getattr(item.state, "interacted_element", None) or [None] * len(planned)
+            actions = []
+            for action, element in zip(planned, elements):
+                dumped = action.model_dump(exclude_none=True)
+                if "done" in dumped:
+                    continue
+                actions.append({**dumped, "interacted_element": element})
+            if not actions:
+                continue
+            step_index = observation["step_index"]
+            entry = entries.setdefault(step_index, {
+                "url": observation["url"],
+                "fingerprint": observation["fingerprint"],
+                "actions": [],
+            })
+            entry["actions"].extend(actions)
+        return [
+            (self.steps[index], entry["url"], entry["fingerprint"], entry["actions"])
+            for index, entry in sorted(entries.items())
+            if index < len(self.steps)
+        ]
+
+
+def history_succeeded(history) -> bool:
+    """True when the agent finished and reported success"""
+    if not history.is_done():
+        return False
+    is_successful = getattr(history, "is_successful", None)
+    return bool(is_successful()) if callable(is_successful) else not any(history.errors()[-1:])
+
+
+_memo = None
+_memo_lock = threading.Lock()
+
+
+def get_step_memo() -> StepMemo:
+    """Return the process-wide step memo"""
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            _memo = StepMemo()
+        return _memo
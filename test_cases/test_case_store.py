@@ -0,0 +1,227 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_STORE_PATH = "test_cases.sqlite3"
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url or "").hostname or "").lower()
+
+
+def _as_dict(case) -> dict:
+    if hasattr(case, "model_dump"):
+        return case.model_dump()
+    return dict(case)
+
+
+class TestCaseStore:
+    """Append-friendly SQLite store of test cases.
+
+    Cases are upserted by name, so generating new cases never drops earlier
+    ones, and are indexed by id, generated test case id (e.g. TC001; it
+    restarts with every generation, so it is not unique), name, URL host and
+    tags. Reads stream rows
+    in batches and build `TestCase` models lazily. Each thread gets its own
+    connection; WAL mode plus a busy timeout lets several processes write
+    at once. A legacy `test_cases.json` is imported whenever it changes.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("TEST_CASE_STORE", DEFAULT_STORE_PATH)
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS test_cases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                test_case_id TEXT NOT NULL DEFAULT '',
+                url TEXT NOT NULL DEFAULT '',
+                host TEXT NOT NULL DEFAULT '',
+                priority INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_test_cases_url ON test_cases (url);
+            CREATE INDEX IF NOT EXISTS idx_test_cases_host ON test_cases (host);
+            CREATE TABLE IF NOT EXISTS test_case_tags (
+                case_id INTEGER NOT NULL REFERENCES test_cases (id) ON DELETE CASCADE,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (case_id, tag)
+            );
+            CREATE INDEX IF NOT EXISTS idx_test_case_tags_tag ON test_case_tags (tag);
+            CREATE TABLE IF NOT EXISTS store_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(test_cases)")}
+        if "test_case_id" not in columns:
+            # Stores created before the column existed: add it and fill it from the stored case data
+            conn.execute("ALTER TABLE test_cases ADD COLUMN test_case_id TEXT NOT NULL DEFAULT ''")
+            conn.executemany(
+                "UPDATE test_cases SET test_case_id = ? WHERE id = ?",
+                [(str(json.loads(data).get("test_case_id") or ""), case_id)
+                 for case_id, data in conn.execute("SELECT id, data FROM test_cases").fetchall()],
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_test_cases_test_case_id ON test_cases (test_case_id)")
+
+    def add(self, cases) -> int:
+        """Insert or update (by name) the given TestCase models or dicts in one transaction"""
+        conn = self._connection()
+        now = time.time()
+        count = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for case in cases:
+                data = _as_dict(case)
+                if not data.get("name"):
+                    print(f"[Warning] Skipping test case without a name: {data}")
+                    continue
+                url = data.get("url") or ""
+                case_id = conn.execute(
+                    """INSERT INTO test_cases (name, test_case_id, url, host, priority, data, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (name) DO UPDATE SET
+                           test_case_id = excluded.test_case_id, url = excluded.url, host = excluded.host,
+                           priority = excluded.priority, data = excluded.data, updated_at = excluded.updated_at
+                       RETURNING id""",
+                    (data["name"], str(data.get("test_case_id") or ""), url, _host(url), int(data.get("priority") or 0),
+                     json.dumps(data, ensure_ascii=False), now, now),
+                ).fetchone()[0]
+                conn.execute("DELETE FROM test_case_tags WHERE case_id = ?", (case_id,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO test_case_tags (case_id, tag) VALUES (?, ?)",
+                    [(case_id, str(tag).lower()) for tag in data.get("tags") or []],
+                )
+                count += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def delete(self, name: str) -> bool:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id FROM test_cases WHERE name = ?", (name,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM test_case_tags WHERE case_id = ?", (row[0],))
+                conn.execute("DELETE FROM test_cases WHERE id = ?", (row[0],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row is not None
+
+    def _where(self, case_id=None, test_case_id=None, name=None, url=None, host=None, tags=None):
+        clauses, params = [], []
+        if case_id is not None:
+            clauses.append("id = ?")
+            params.append(case_id)
+        if test_case_id is not None:
+            clauses.append("test_case_id = ?")
+            params.append(test_case_id)
+        if name is not None:
+            clauses.append("name = ?")
+            params.append(name)
+        if url is not None:
+            clauses.append("url = ?")
+            params.append(url)
+        if host is not None:
+            clauses.append("host = ?")
+            params.append(host.lower())
+        for tag in tags or []:
+            clauses.append("id IN (SELECT case_id FROM test_case_tags WHERE tag = ?)")
+            params.append(str(tag).lower())
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def iter_cases(self, batch_size: int = 200, **filters):
+        """Yield TestCase models matching id/test_case_id/name/url/host/tags, reading `batch_size` rows at a time"""
+        from test_cases.test_cases import TestCase
+
+        where, params = self._where(**filters)
+        cursor = self._connection().execute(
+            f"SELECT data FROM test_cases{where} ORDER BY priority DESC, id", params
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for (data,) in rows:
+                yield TestCase(**json.loads(data))
+
+    def get(self, name: str):
+        return next(self.iter_cases(name=name), None)
+
+    def find_by_test_case_id(self, test_case_id: str) -> list:
+        """Cases with the generated id `test_case_id`, highest priority first; several generations may share one"""
+        return list(self.iter_cases(test_case_id=test_case_id))
+
+    def count(self, **filters) -> int:
+        where, params = self._where(**filters)
+        return self._connection().execute(f"SELECT COUNT(*) FROM test_cases{where}", params).fetchone()[0]
+
+    def import_json(self, filename: str, force: bool = False) -> int:
+        """Import a test_cases.json file unless this exact version was imported before"""
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return 0
+        key = f"imported:{os.path.abspath(filename)}"
+        version = f"{stat.st_mtime_ns}:{stat.st_size}"
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        if row and row[0] == version and not force:
+            return 0
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                data = json.load(f) if stat.st_size else []
+        except json.JSONDecodeError:
+            print(f"[Warning] Invalid JSON in {filename}; nothing imported.")
+            return 0
+        count = self.add(data if isinstance(data, list) else [data])
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, version))
+        if count:
+            print(f"[Info] Imported {count} test case(s) from {filename} into {self.path}.")
+        return count
+
+
+_stores: dict = {}
+_stores_lock = threading.Lock()
+
+
+def get_test_case_store(path: str = None) -> TestCaseStore:
+    """Return the shared store for `path` (defaults to TEST_CASE_STORE / test_cases.sqlite3)"""
+    path = path or os.getenv("TEST_CASE_STORE", DEFAULT_STORE_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = TestCaseStore(path)
+            _stores[path] = store
+        return store
@@ -1,7 +1,5 @@
-import json
-import os
 from pydantic import BaseModel
-from typing import List
+from typing import Iterator, List
 
 class TestCase(BaseModel):
     name: str
@@ -9,30 +7,24 @@ class TestCase(BaseModel):
     steps: list[str]
     url: str
     expected_result: str
+    priority: int = 0
+    tags: list[str] = []
+    test_case_id: str = ""
 
 DEFAULT_FILENAME = "test_cases.json"
 
-# Ensure file exists and contains valid JSON
-def ensure_valid_json_file(filename: str = DEFAULT_FILENAME):
-    if not os.path.exists(filename) or os.stat(filename).st_size == 0:
-        print("[Info] test_cases.json is missing or empty. Creating a new one.")
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump([], f, indent=4)
-    else:
-        try:
-            with open(filename, "r", encoding="utf-8") as f:
-                json.load(f)
-        except json.JSONDecodeError:
-            print("[Warning] Invalid JSON. Reinitializing test_cases.json.")
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump([], f, indent=4)
+def iter_test_cases(filename: str = DEFAULT_FILENAME, **filters) -> Iterator[TestCase]:
+    """Stream test cases from the store, filtered by id, test_case_id, name, url, host and/or tags.
 
-# Call it once at the top
-ensure_valid_json_file()
+    A `filename` JSON file (the legacy format) is imported into the store first if it changed.
+    """
+    from test_cases.test_case_store import get_test_case_store
 
-# Now it's safe to load
-def load_test_cases(filename: str = DEFAULT_FILENAME) -> List[TestCase]:
-    """Load test cases from a JSON file dynamically."""
-    with open(filename, "r", encoding="utf-8") as file:
-        data = json.load(file)
-    return [TestCase(**item) for item in data]
\ No newline at end of file
+    store = get_test_case_store()
+    store.import_json(filename)
+    return store.iter_cases(**filters)
+
+
+def load_test_cases(filename: str = DEFAULT_FILENAME, **filters) -> List[TestCase]:
+    """Load test cases from the test case store dynamically."""
+    return list(iter_test_cases(filename, **filters))
\ No newline at end of file
@@ -1,48 +1,248 @@
+import argparse
 import asyncio
-from ai_agent import AI_TestAgent
-from browser_actions import controller
-from test_cases.test_cases import load_test_cases
-from result_validator import validate_result
+import time
+from browser_pool import get_browser_pool, close_browser_pool
+from browser_profile import get_browser_profile, print_profile_comparison, record_profile_metrics
+from scheduler import TestScheduler
+from llm_cache import get_llm_cache
+from trace_ir import json_default
+from rate_limiter import get_rate_limiter
+from replay import load_recorded_actions
+from results_store import get_results_store
+from run_manifest import case_definition, digest, format_skip_summary, get_run_manifest, plan_runs, run_inputs_hash
+from step_memo import get_step_memo, history_succeeded
+from tracing import get_tracer, span
+from llm_usage import get_usage_tracker, usage_scope
+from vision import get_vision_stats
 import json
 import os
 
 
-async def run_test_and_generate_code(test_case):
-    """Run a single test, save results in the results folder, and generate Java code"""
-    agent = AI_TestAgent(controller)
-    
-    # Run the test
-    actual_result = await agent.run_test(test_case)
-    
-    formatted_output = actual_result.model_actions()  # Ensure this method returns the correct data structure
+def _notify(on_progress, event: str, **data):
+    if on_progress is not None:
+        try:
+            on_progress(event, data)
+        except Exception as e:
+            print(f"[Warning] Progress listener failed: {e}")
 
-    # Ensure the "results" folder exists
-    results_dir = "results"
-    os.makedirs(results_dir, exist_ok=True)
-    
-    json_file_path = os.path.join(results_dir, f"{test_case.name}.json")
 
-    # Write the formatted_output to a JSON file with UTF-8 encoding
-    with open(json_file_path, "w", encoding="utf-8") as json_file:
-        json.dump(formatted_output, json_file, indent=4, ensure_ascii=False, default=str)  # Convert unknown objects to strings
+def recorded_data(history) -> list:
+    """model_actions() of a run as plain JSON data (DOM elements kept structured, anything else stringified)"""
+    return json.loads(json.dumps(history.model_actions(), ensure_ascii=False, default=json_default))
 
-    print(f"{test_case.name}.json file successfully written in {results_dir}/.")
 
-    # Generate Java code using the same agent instance (which has the current_test_case set)
-    try:
-        result = agent.generate_test_from_json(json_file_path)
-        print(result)
-    except Exception as e:
-        print(f"Error generating test from JSON: {e}")
-    
-    return actual_result  # or validated_result if validation is needed
-async def run_tests():
-    """Run tests concurrently"""
+async def run_test_and_generate_code(test_case, scheduler: TestScheduler = None, on_progress=None, replay: bool = False,
+                                     codegen: bool = True, force: bool = False):
+    """Run a single test, record the run in the results store, and generate Java code
+
+    `on_progress(event, data)` is called for the phases of the run and for every agent step.
+    With `replay=True` the actions of the last passed run are executed directly, and the
+    LLM agent only takes over from the first action that fails to replay.
+    With `codegen=False` no code is generated; the suite generates it in batches afterwards.
+    Code generation is skipped when the run manifest shows the same trace and prompt inputs, unless `force`.
+    """
+    # browser_use and the LangChain clients are only loaded once a test actually runs
+    from ai_agent import AI_TestAgent
+    from browser_actions import controller
+
+    with span("test_case", test_case=test_case.name, replay=replay), usage_scope(test_case=test_case.name):
+        scheduler = scheduler or TestScheduler()
+        agent = AI_TestAgent(controller)
+
+        recorded_actions = load_recorded_actions(test_case.name) if replay else None
+        on_step = lambda step, info: _notify(on_progress, "step", step=step, **info)
+
+        results_store = get_results_store()
+        manifest = get_run_manifest()
+        run_hash = run_inputs_hash(test_case)
+        results_dir = "results"
+        started_at = time.time()
+
+        def save_usage():
+            usage_path = get_usage_tracker().save(test_case.name, results_dir)
+            print(f"[Info] LLM usage of {test_case.name} written to {usage_path}.")
+
+        # Run the test
+        try:
+            async with scheduler.browser_slot():
+                _notify(on_progress, "test_started", test_case=test_case.name, replay=recorded_actions is not None)
+                with span("test.run"), usage_scope(stage="agent"):
+                    if recorded_actions is not None:
+                        actual_result = await agent.replay_test(test_case, recorded_actions, on_step=on_step)
+                    else:
+                        actual_result = await agent.run_test(test_case, on_step=on_step)
+        except Exception as e:
+            results_store.record_run(test_case.name, [], "error", started_at, time.time() - started_at,
+                                     url=test_case.url, error=str(e), replay=replay)
+            manifest.record_run(test_case.name, run_hash, None, "error")
+            save_usage()
+            raise
+        duration = time.time() - started_at
+        _notify(on_progress, "test_finished", test_case=test_case.name, final_result=actual_result.final_result())
+
+        # Round-trip through JSON so codegen sees exactly what was stored
+        test_data = recorded_data(actual_result)
+
+        with span("results.dump", actions=len(test_data)):
+            errors = [error for error in actual_result.errors() if error]
+            if getattr(actual_result, "unverified", False):
+                # Fully replayed but the expected result could not be checked: neither passed nor failed
+                status = "unverified"
+            else:
+                status = "passed" if history_succeeded(actual_result) else "failed"
+            run_id = results_store.record_run(
+                test_case.name, test_data, status,
+                started_at, duration, url=test_case.url, final_result=actual_result.final_result(),
+                error=errors[-1] if errors else None, replay=replay,
+            )
+            if os.getenv("RESULTS_JSON_EXPORT", "0") == "1":
+                # Legacy per-test file for tools that still read results/<name>.json
+                os.makedirs(results_dir, exist_ok=True)
+                with open(os.path.join(results_dir, f"{test_case.name}.json"), "w", encoding="utf-8") as json_file:
+                    json.dump(test_data, json_file, indent=4, ensure_ascii=False)
+
+        print(f"Run {run_id} of {test_case.name} stored in {results_store.path}.")
+        trace_hash = digest(test_data)
+        manifest.record_run(test_case.name, run_hash, trace_hash, status, run_id)
+        if not codegen:
+            # Agent-stage usage is persisted now; batch codegen merges its stage into the same file later
+            save_usage()
+            return actual_result
+
+        code_generator = agent.code_generator
+        codegen_hash = digest(case_definition(test_case), trace_hash, code_generator.codegen_inputs(test_case))
+        unchanged, reason = manifest.codegen_decision(test_case.name, codegen_hash)
+        if unchanged and not force:
+            manifest.summary.note("codegen_skipped", reason)
+            print(f"[Info] Skipping code generation for {test_case.name}: {reason}.")
+            save_usage()
+            return actual_result
+        manifest.summary.note("codegen_executed", "forced" if force else reason)
+
+        # Generate Java code using the same agent instance (which has the current_test_case set).
+        # The async path lets the remaining browser runs continue while the LLM writes the code.
+        try:
+            async with scheduler.llm_slot():
+                _notify(on_progress, "codegen_started", test_case=test_case.name)
+                with span("codegen"), usage_scope(stage="codegen"):
+                    result = await agent.agenerate_test_from_data(test_data, test_case)
+            _notify(on_progress, "codegen_finished", test_case=test_case.name, message=result)
+            print(result)
+            if result == code_generator.GENERATED_MESSAGE:
+                manifest.record_codegen(test_case.name, codegen_hash, code_generator.output_path_for(test_case))
+        except Exception as e:
+            print(f"Error generating test from recorded actions: {e}")
+
+        save_usage()
+        return actual_result  # or validated_result if validation is needed
+
+def collect_suite_stats(pool_metrics: dict) -> dict:
+    """Counters of this process that the suite summary reports; plain data so workers can send them"""
+    vision_stats = get_vision_stats()
+    profile = get_browser_profile()
+    return {
+        "llm_cache": get_llm_cache().stats(),
+        "step_memo": get_step_memo().stats(),
+        "rate_limiter": dict(get_rate_limiter().stats),
+        "http_pools": pool_metrics,
+        "vision": {"steps": vision_stats.steps, "vision_steps": vision_stats.vision_steps,
+                   "reasons": dict(vision_stats.reasons)},
+        "usage": get_usage_tracker().totals(),
+        "manifest": get_run_manifest().summary.to_dict(),
+        "browser_profile": {"name": profile.name, **profile.metrics.stats()},
+    }
+
+
+def print_suite_stats(stats: dict):
+    from vision import VisionStats
+
+    cache_stats = stats["llm_cache"]
+    print(f"[Info] LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
+    memo_stats = stats["step_memo"]
+    print(
+        f"[Info] Step memo: {memo_stats['hits']} hits, {memo_stats['misses']} misses, "
+        f"{memo_stats['invalidations']} invalidated, {memo_stats['recorded']} recorded."
+    )
+    limiter_stats = stats["rate_limiter"]
+    print(
+        f"[Info] LLM rate limiter: {limiter_stats['requests']} requests, "
+        f"{limiter_stats['throttled']} throttled, {limiter_stats['waited']:.1f}s waited."
+    )
+    for name, metrics in stats["http_pools"].items():
+        print(
+            f"[Info] HTTP pool '{name}': {metrics['requests']} requests over "
+            f"{metrics['connections']} connection(s) ({metrics['active_connections']} active, "
+            f"{metrics['idle_connections']} idle, limit {metrics['max_connections']})."
+        )
+    vision_stats = VisionStats()
+    vision_stats.add(stats["vision"]["steps"], stats["vision"]["vision_steps"], stats["vision"]["reasons"])
+    print(f"[Info] Vision: {vision_stats.summary()}.")
+    usage_totals = stats["usage"]
+    print(
+        f"[Info] LLM usage: {usage_totals['requests']:.0f} requests, {usage_totals['prompt_tokens']:,.0f} prompt "
+        f"({usage_totals['cached_tokens']:,.0f} cached) / {usage_totals['completion_tokens']:,.0f} completion tokens, "
+        f"${usage_totals['cost']:.4f}. Run 'python llm_usage.py' for the most expensive cases."
+    )
+    print(f"[Info] Manifest: {format_skip_summary(stats['manifest'])}.")
+    page_stats = dict(stats["browser_profile"])
+    print_profile_comparison(record_profile_metrics(page_stats.pop("name"), page_stats))
+
+
+def print_results(results: list):
+    print("\nAll tests executed. Here are the results:\n")
+    for entry in results:
+        note = entry["error"] or entry.get("reason")
+        print(f"{entry['status']:<7} {entry['test_case']}" + (f" - {note}" if note else ""))
+
+
+async def run_tests(replay: bool = False, batch_codegen: bool = None, force: bool = False):
+    """Run the whole suite concurrently through the scheduler and return the per-case results
+
+    With `batch_codegen` (default: CODEGEN_BATCH) code is generated after all runs, in one call per batch of cases on a site.
+    Cases whose inputs match the run manifest and whose last run passed are skipped (or replayed, see
+    MANIFEST_UNCHANGED); `force` runs and regenerates everything.
+    """
+    from batch_codegen import batch_codegen_enabled, generate_suite
+    from http_clients import aclose_http_clients, http_pool_metrics
+    from test_cases.test_cases import load_test_cases
+
     test_cases_list= load_test_cases()
+    results = []
     if test_cases_list:
-        tasks = [run_test_and_generate_code(test) for test in test_cases_list[:3]]
-        results = await asyncio.gather(*tasks)
-        print("\nAll tests executed. Here are the results:\n")
+        suite_started = time.perf_counter()
+        to_run, to_revalidate, skipped = plan_runs(test_cases_list, force=force)
+        revalidate = {test_case.name for test_case in to_revalidate}
+        batch_codegen = batch_codegen_enabled() if batch_codegen is None else batch_codegen
+
+        async def run_one(test_case, scheduler):
+            return await run_test_and_generate_code(
+                test_case, scheduler, replay=replay or test_case.name in revalidate,
+                codegen=not batch_codegen, force=force,
+            )
+
+        pool_metrics = {}
+        if to_run or to_revalidate:
+            # Warm the browser pool before the first test so no case pays the Chromium cold start
+            await get_browser_pool().start()
+            try:
+                scheduler = TestScheduler()
+                results = await scheduler.run(to_run + to_revalidate, run_one)
+                if batch_codegen:
+                    cases_by_name = {test_case.name: test_case for test_case in test_cases_list}
+                    with span("codegen.suite"):
+                        await generate_suite([
+                            (cases_by_name[entry["test_case"]], recorded_data(entry["result"]))
+                            for entry in results if entry["result"] is not None
+                        ], scheduler=scheduler, force=force)
+            finally:
+                await close_browser_pool()
+                pool_metrics = http_pool_metrics()
+                await aclose_http_clients()
+        results = results + skipped
+        print_results(results)
+        print(f"[Info] Suite finished in {time.perf_counter() - suite_started:.1f}s.")
+        print_suite_stats(collect_suite_stats(pool_metrics))
+        get_tracer().flush()
     else:
         print("[WARNING] No test cases found. Please run the case_generator to generate test cases.")    
     
@@ -50,6 +250,22 @@ async def run_tests():
     print("=" * 50)    
     
     # Additional reporting or processing of results can be done here
+    return results
 
 if __name__=="__main__":
-    asyncio.run(run_tests())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the test suite and generate Selenium code.")
+    parser.add_argument("--replay", action="store_true",
+                        help="Replay the last passed run's actions without the LLM; fall back to the agent on the first failure")
+    parser.add_argument("--batch-codegen", action="store_true", default=None,
+                        help="Generate code after all runs, batching cases on the same site (default: CODEGEN_BATCH)")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignore the run manifest: run every case and regenerate all code")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TEST_WORKERS", "1")),
+                        help="Shard the suite across this many worker processes (default: TEST_WORKERS or 1)")
+    args = parser.parse_args()
+    if args.workers > 1:
+        from workers import run_tests_in_workers
+
+        run_tests_in_workers(args.workers, replay=args.replay, batch_codegen=args.batch_codegen, force=args.force)
+    else:
+        asyncio.run(run_tests(replay=args.replay, batch_codegen=args.batch_codegen, force=args.force))
\ No newline at end of file
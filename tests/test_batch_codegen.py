@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from batch_codegen import CodegenItem, plan_batches
+from site_support import site_key
+
+
+def item(name: str, url: str, tokens: int):
+    # Bypasses __init__: plan_batches only looks at the site and the token estimate
+    planned = CodegenItem.__new__(CodegenItem)
+    planned.test_case = SimpleNamespace(name=name)
+    planned.site = site_key(url)
+    planned.tokens = tokens
+    return planned
+
+
+def names(batches) -> list:
+    return [sorted(planned.test_case.name for planned in batch) for batch in batches]
+
+
+def test_items_are_grouped_by_site():
+    items = [item("a1", "https://a.com/1", 100), item("b1", "https://www.b.com", 100), item("a2", "https://a.com/2", 100)]
+    batches, singles = plan_batches(items, budget_tokens=1000, max_cases=10)
+    assert sorted(names(batches)) == [["a1", "a2"], ["b1"]]
+    assert singles == []
+
+
+def test_batches_respect_the_token_budget():
+    items = [item(f"c{tokens}", "https://a.com", tokens) for tokens in (600, 500, 400, 300)]
+    batches, _ = plan_batches(items, budget_tokens=1000, max_cases=10)
+    assert all(sum(planned.tokens for planned in batch) <= 1000 for batch in batches)
+    # Largest first into the first batch with room
+    assert names(batches) == [["c400", "c600"], ["c300", "c500"]]
+
+
+def test_batches_respect_the_case_limit():
+    items = [item(f"c{i}", "https://a.com", 10) for i in range(5)]
+    batches, _ = plan_batches(items, budget_tokens=10_000, max_cases=2)
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_oversized_item_gets_a_batch_of_its_own():
+    items = [item("huge", "https://a.com", 5000), item("small", "https://a.com", 100)]
+    batches, _ = plan_batches(items, budget_tokens=1000, max_cases=10)
+    assert names(batches) == [["huge"], ["small"]]
+
+
+def test_items_without_a_host_are_generated_one_by_one():
+    items = [item("local", "file:///tmp/page.html", 100), item("a1", "https://a.com", 100)]
+    batches, singles = plan_batches(items, budget_tokens=1000, max_cases=10)
+    assert names(batches) == [["a1"]]
+    assert [planned.test_case.name for planned in singles] == ["local"]
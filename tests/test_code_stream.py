@@ -0,0 +1,70 @@
+import os
+import stat
+
+import pytest
+
+import code_stream
+from code_stream import FenceStripper, StreamingCodeWriter
+
+CODE = "public class LoginTest {\n    void run() {}\n}"
+
+
+def strip(chunks) -> str:
+    stripper = FenceStripper()
+    return "".join(stripper.feed(chunk) for chunk in chunks) + stripper.finish()
+
+
+def split_every(text: str, size: int) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 1000])
+def test_fences_are_removed_whatever_the_chunk_boundaries(size):
+    completion = f"```java\n{CODE}\n```\n"
+    assert strip(split_every(completion, size)) == CODE
+
+
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_unfenced_code_passes_through(size):
+    assert strip(split_every(CODE, size)) == CODE
+
+
+def test_leading_whitespace_before_the_fence():
+    assert strip(["\n  ", "``", "`java", "\n", CODE, "\n`", "``"]) == CODE
+
+
+def test_backticks_inside_the_code_are_kept():
+    code = 'String s = "```";\nint x = 1;'
+    assert strip(split_every(f"```\n{code}\n```", 2)) == code
+
+
+def test_fence_only_completion_is_empty():
+    assert strip(["```java\n", "```"]) == ""
+    assert strip([]) == ""
+
+
+def test_commit_moves_the_file_into_place_with_the_default_mode(tmp_path):
+    target = tmp_path / "LoginTest.java"
+    writer = StreamingCodeWriter(str(target))
+    for chunk in split_every(f"```java\n{CODE}\n```", 7):
+        writer.write(chunk)
+    assert not target.exists()
+    writer.commit()
+    assert target.read_text(encoding="utf-8") == CODE + "\n"
+    assert stat.S_IMODE(os.stat(target).st_mode) == code_stream._FILE_MODE
+    assert os.listdir(tmp_path) == ["LoginTest.java"]
+
+
+def test_empty_stream_leaves_no_file(tmp_path):
+    target = tmp_path / "LoginTest.java"
+    writer = StreamingCodeWriter(str(target))
+    writer.write("```java\n")
+    assert writer.commit() is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_abort_discards_the_partial_file(tmp_path):
+    writer = StreamingCodeWriter(str(tmp_path / "LoginTest.java"))
+    writer.write(CODE)
+    writer.abort()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,28 @@
+import time
+
+from e2e_benchmark import _recorded_outcomes, compare
+from results_store import get_results_store
+
+
+def test_only_a_recorded_pass_counts_as_passed(tmp_path, monkeypatch):
+    monkeypatch.setenv("RESULTS_STORE", str(tmp_path / "runs.sqlite3"))
+    store = get_results_store()
+    now = time.time()
+    store.record_run("passes", [], "passed", now, 1.0)
+    store.record_run("fails", [], "failed", now, 1.0)
+    store.record_run("unverified", [], "unverified", now, 1.0)
+    store.record_run("fixed", [], "failed", now - 10, 1.0)
+    store.record_run("fixed", [], "passed", now, 1.0)
+    assert _recorded_outcomes(["passes", "fails", "unverified", "fixed", "never ran"]) == [
+        True, False, False, True, False,
+    ]
+
+
+def test_peak_rss_is_only_compared_when_measured_the_same_way():
+    def level(peak, source):
+        return {"target": "runner", "profile": "default", "concurrency": 1, "tests_per_minute": 10,
+                "peak_rss_mb": peak, "rss_source": source}
+
+    baseline = {"levels": [level(100, "largest child only")]}
+    assert compare([level(500, "process tree")], baseline, 0.1) == []
+    assert len(compare([level(500, "largest child only")], baseline, 0.1)) == 1
@@ -0,0 +1,76 @@
+import pytest
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+def make_cache(tmp_path, **kwargs) -> LLMCache:
+    kwargs.setdefault("max_bytes", 1024 * 1024)
+    kwargs.setdefault("ttl", 0)
+    return LLMCache(path=str(tmp_path / "responses.sqlite3"), enabled=True, **kwargs)
+
+
+def test_key_changes_with_every_input():
+    base = LLMCache.make_key("gpt-4o", "dep", "prompt", temperature=0)
+    assert base == LLMCache.make_key("gpt-4o", "dep", "prompt", temperature=0)
+    assert base != LLMCache.make_key("gpt-4o-mini", "dep", "prompt", temperature=0)
+    assert base != LLMCache.make_key("gpt-4o", "other", "prompt", temperature=0)
+    assert base != LLMCache.make_key("gpt-4o", "dep", "prompt!", temperature=0)
+    assert base != LLMCache.make_key("gpt-4o", "dep", "prompt", temperature=1)
+
+
+def test_hit_and_miss_are_counted(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    assert cache.get("k") is None
+    cache.set("k", "completion")
+    assert cache.get("k") == "completion"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=20)
+    cache.set("a", "x" * 8)
+    clock.now += 1
+    cache.set("b", "y" * 8)
+    clock.now += 1
+    assert cache.get("a") == "x" * 8  # "a" is now more recent than "b"
+    clock.now += 1
+    cache.set("c", "z" * 8)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 8
+    assert cache.get("c") == "z" * 8
+    assert cache.evictions == 1
+    assert cache.stats()["bytes"] <= 20
+
+
+def test_entries_older_than_ttl_are_misses_and_removed(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.set("k", "completion")
+    clock.now += 59
+    assert cache.get("k") == "completion"
+    clock.now += 2  # the TTL counts from creation, not from the last hit
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "responses.sqlite3"), enabled=False)
+    cache.set("k", "completion")
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
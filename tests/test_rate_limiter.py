@@ -0,0 +1,34 @@
+import email.utils
+import time
+
+import pytest
+
+from rate_limiter import parse_retry_after
+
+
+def test_retry_after_ms_wins_over_retry_after():
+    assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+
+
+def test_numeric_retry_after():
+    assert parse_retry_after({"retry-after": "7"}) == 7.0
+
+
+def test_http_date_retry_after():
+    header = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert parse_retry_after({"retry-after": header}) == pytest.approx(30, abs=2)
+
+
+def test_http_date_without_zone_is_utc():
+    # "-0000" parses to a naive datetime; it must not be read as local time
+    header = email.utils.formatdate(time.time() + 30).rsplit(" ", 1)[0] + " -0000"
+    assert parse_retry_after({"retry-after": header}) == pytest.approx(30, abs=2)
+
+
+def test_past_http_date_means_no_wait():
+    assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+
+
+@pytest.mark.parametrize("headers", [{"retry-after": "garbage"}, {"retry-after-ms": "soon", "retry-after": "x"}, {}])
+def test_unparseable_or_missing_header_gives_none(headers):
+    assert parse_retry_after(headers) is None
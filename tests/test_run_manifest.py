@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+import run_manifest
+from run_manifest import RunManifest, digest, format_skip_summary, plan_runs, run_inputs_hash
+
+
+def case(name: str, **fields):
+    return SimpleNamespace(name=name, url="https://example.com", steps=["open"], **fields)
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    path = str(tmp_path / "manifest.sqlite3")
+    monkeypatch.setenv("RUN_MANIFEST", path)
+    monkeypatch.setattr(run_manifest, "_manifests", {})
+    return run_manifest.get_run_manifest()
+
+
+def test_digest_is_stable_and_order_independent():
+    assert digest({"a": 1, "b": 2}) == digest({"b": 2, "a": 1})
+    assert digest({"a": 1}) != digest({"a": 2})
+
+
+def test_run_hash_follows_the_case_definition():
+    assert run_inputs_hash(case("a")) == run_inputs_hash(case("a"))
+    assert run_inputs_hash(case("a")) != run_inputs_hash(case("a", priority=1))
+
+
+def test_run_decision(manifest):
+    assert manifest.run_decision("a", "h1") == (False, "new")
+    manifest.record_run("a", "h1", "t1", "failed")
+    assert manifest.run_decision("a", "h1") == (False, "last run failed")
+    manifest.record_run("a", "h1", "t1", "passed")
+    assert manifest.run_decision("a", "h1") == (True, "unchanged, last run passed")
+    assert manifest.run_decision("a", "h2") == (False, "definition or agent changed")
+
+
+def test_codegen_decision_needs_the_generated_file(manifest, tmp_path):
+    output = tmp_path / "LoginTest.java"
+    assert manifest.codegen_decision("a", "c1") == (False, "new")
+    manifest.record_codegen("a", "c1", str(output))
+    assert manifest.codegen_decision("a", "c1") == (False, "generated file missing")
+    output.write_text("class LoginTest {}")
+    assert manifest.codegen_decision("a", "c1") == (True, "same trace and template")
+    assert manifest.codegen_decision("a", "c2") == (False, "trace or template changed")
+
+
+def test_run_and_codegen_records_do_not_overwrite_each_other(manifest, tmp_path):
+    manifest.record_codegen("a", "c1", str(tmp_path / "A.java"))
+    manifest.record_run("a", "h1", "t1", "passed", "run-1")
+    entry = manifest.get("a")
+    assert (entry["run_hash"], entry["status"], entry["codegen_hash"]) == ("h1", "passed", "c1")
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("skip", (["changed", "new"], [], ["unchanged"])),
+    ("replay", (["changed", "new"], ["unchanged"], [])),
+    ("run", (["changed", "new", "unchanged"], [], [])),
+])
+def test_plan_runs_by_mode(manifest, mode, expected):
+    cases = [case("unchanged"), case("changed"), case("new")]
+    manifest.record_run("unchanged", run_inputs_hash(cases[0]), "t", "passed")
+    manifest.record_run("changed", "stale", "t", "passed")
+    to_run, to_revalidate, skipped = plan_runs(cases, mode=mode)
+    assert (
+        sorted(tc.name for tc in to_run),
+        [tc.name for tc in to_revalidate],
+        [entry["test_case"] for entry in skipped],
+    ) == expected
+
+
+def test_force_runs_everything(manifest):
+    cases = [case("unchanged")]
+    manifest.record_run("unchanged", run_inputs_hash(cases[0]), "t", "passed")
+    to_run, to_revalidate, skipped = plan_runs(cases, force=True, mode="skip")
+    assert ([tc.name for tc in to_run], to_revalidate, skipped) == (["unchanged"], [], [])
+    assert manifest.summary.to_dict()["run_executed"] == {"forced": 1}
+
+
+def test_skip_summary_format():
+    counts = {"run_skipped": {"unchanged, last run passed": 2}, "codegen_executed": {"new": 1}}
+    assert format_skip_summary(counts) == (
+        "2 run(s) skipped (unchanged, last run passed: 2); 1 codegen executed (new: 1)"
+    )
+    assert format_skip_summary({}) == "nothing recorded"
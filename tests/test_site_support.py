@@ -0,0 +1,104 @@
+import asyncio
+
+from site_support import (
+    SUPPORT_CLASSES, SiteSupportCache, api_summary, missing_support_classes, site_key, site_package, split_java_files,
+)
+
+
+def support_files() -> dict:
+    return {f"{name}.java": f"package support.example_com;\n\npublic class {name} {{}}" for name in SUPPORT_CLASSES}
+
+
+def test_site_key_and_package():
+    assert site_key("https://www.Example.com/login?x=1") == "example.com"
+    assert site_key("not a url") == ""
+    assert site_package("example.com") == "support.example_com"
+    assert site_package("123.example.com") == "support._123_example_com"
+
+
+def test_split_on_file_markers_strips_fences():
+    content = (
+        "Here you go:\n"
+        "// FILE: BasePage.java\n```java\npublic abstract class BasePage {}\n```\n"
+        "// FILE: support/BaseTest.java\npublic class BaseTest extends Object {}\n"
+    )
+    assert split_java_files(content) == {
+        "BasePage.java": "public abstract class BasePage {}",
+        "BaseTest.java": "public class BaseTest extends Object {}",
+    }
+
+
+def test_split_without_markers_uses_the_first_class_name():
+    assert split_java_files("```java\nimport x;\npublic final class LoginTest {}\n```") == {
+        "LoginTest.java": "import x;\npublic final class LoginTest {}",
+    }
+
+
+def test_split_of_empty_or_classless_content():
+    assert split_java_files("") == {}
+    assert split_java_files(None) == {}
+    assert split_java_files("Sorry, I cannot help with that.") == {}
+    assert split_java_files("// FILE: Empty.java\n```java\n```") == {}
+
+
+def test_complete_support_set_has_nothing_missing():
+    assert missing_support_classes(support_files()) == []
+
+
+def test_missing_and_misdeclared_support_classes():
+    files = support_files()
+    del files["DriverFactory.java"]
+    files["ElementFinder.java"] = "public class Finder {}"
+    files["BaseTest.java"] = "public abstract class BaseTest extends BasePage {}"
+    assert missing_support_classes(files) == ["DriverFactory", "ElementFinder"]
+
+
+def test_api_summary_lists_public_methods_once():
+    files = {"BasePage.java": (
+        "public class BasePage {\n"
+        "    public BasePage(WebDriver driver) {}\n"
+        "    public void click(By locator) {}\n"
+        "    public static String   title(WebDriver driver) { return null; }\n"
+        "    private void hidden() {}\n"
+        "}"
+    )}
+    assert api_summary(files) == (
+        "BasePage:\n  public void click(By locator)\n  public static String title(WebDriver driver)"
+    )
+
+
+def test_cache_round_trip_rejects_partial_sets(tmp_path):
+    cache = SiteSupportCache(str(tmp_path))
+    cache.save("example.com", support_files(), "v1", "gpt-4o")
+    support = cache.get("example.com", "v1", "gpt-4o")
+    assert support.package == "support.example_com"
+    assert sorted(support.files) == sorted(support_files())
+    assert cache.get("example.com", "v2", "gpt-4o") is None
+
+    partial = support_files()
+    del partial["BaseTest.java"]
+    cache.save("other.com", partial, "v1", "gpt-4o")
+    assert cache.get("other.com", "v1", "gpt-4o") is None
+
+
+def test_async_lock_is_usable_from_consecutive_event_loops(tmp_path):
+    cache = SiteSupportCache(str(tmp_path))
+
+    async def contend():
+        lock = cache.alock("example.com")
+        holders = []
+
+        async def hold(index):
+            async with lock:
+                holders.append(index)
+                await asyncio.sleep(0)
+
+        # Contention binds the lock to the running loop
+        await asyncio.gather(*(hold(index) for index in range(3)))
+        assert holders == [0, 1, 2]
+        return lock
+
+    first = asyncio.run(contend())
+    second = asyncio.run(contend())
+    assert first is not second
+    assert len(cache._async_locks) == 1
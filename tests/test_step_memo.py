@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import pytest
+
+from step_memo import StepMemo, StepRecorder, dom_fingerprint, step_memo_enabled
+
+
+class FakeAction:
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def model_dump(self, exclude_none: bool = False) -> dict:
+        return dict(self.fields)
+
+
+def browser_state(url: str):
+    return SimpleNamespace(url=url, selector_map={})
+
+
+def model_output(goal: str, *actions):
+    return SimpleNamespace(current_state=SimpleNamespace(next_goal=goal), action=list(actions))
+
+
+def history_item(url: str, output):
+    results = [object()] * len(output.action) if output else []
+    return SimpleNamespace(
+        model_output=output,
+        result=results,
+        state=SimpleNamespace(url=url, interacted_element=[None] * len(results)),
+    )
+
+
+STEPS = ["Open the login page", "Enter the username"]
+
+
+def run_agent(recorder: StepRecorder, pages: list) -> SimpleNamespace:
+    """Feed (url, output) pairs to the recorder as browser_use would and return the history"""
+    for number, (url, output) in enumerate(pages, start=1):
+        recorder.on_new_step(browser_state(url), output, number)
+    return SimpleNamespace(history=[history_item(url, output) for url, output in pages])
+
+
+def test_memo_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("STEP_MEMO_ENABLED", raising=False)
+    assert not step_memo_enabled()
+    monkeypatch.setenv("STEP_MEMO_ENABLED", "1")
+    assert step_memo_enabled()
+
+
+def test_aligned_history_is_memoized_per_step():
+    recorder = StepRecorder(STEPS)
+    history = run_agent(recorder, [
+        ("https://example.com/", model_output("Open the login page", FakeAction(click_element={"index": 1}))),
+        ("https://example.com/login", model_output("Enter the username", FakeAction(input_text={"index": 2}),
+                                                   FakeAction(done={"text": "ok"}))),
+    ])
+    entries = recorder.memo_entries(history)
+    assert [(step, url) for step, url, _, _ in entries] == [
+        ("Open the login page", "https://example.com/"),
+        ("Enter the username", "https://example.com/login"),
+    ]
+    assert entries[0][2] == dom_fingerprint({})
+    assert entries[1][3] == [{"input_text": {"index": 2}, "interacted_element": None}]
+
+
+def test_history_with_an_unobserved_step_is_not_memoized():
+    recorder = StepRecorder(STEPS)
+    history = run_agent(recorder, [
+        ("https://example.com/", model_output("Open the login page", FakeAction(click_element={"index": 1}))),
+    ])
+    history.history.append(history_item("https://example.com/login",
+                                         model_output("Enter the username", FakeAction(input_text={"index": 2}))))
+    assert recorder.memo_entries(history) == []
+
+
+def test_history_on_a_different_page_is_not_memoized():
+    recorder = StepRecorder(STEPS)
+    history = run_agent(recorder, [
+        ("https://example.com/", model_output("Open the login page", FakeAction(click_element={"index": 1}))),
+    ])
+    history.history[0].state.url = "https://example.com/elsewhere"
+    assert recorder.memo_entries(history) == []
+
+
+def test_steps_without_model_output_are_skipped_on_both_sides():
+    recorder = StepRecorder(STEPS)
+    history = run_agent(recorder, [
+        ("https://example.com/", model_output("Open the login page", FakeAction(click_element={"index": 1}))),
+    ])
+    history.history.insert(0, history_item("https://example.com/", None))
+    assert len(recorder.memo_entries(history)) == 1
+
+
+@pytest.fixture
+def memo(tmp_path):
+    return StepMemo(path=str(tmp_path / "steps.sqlite3"))
+
+
+def test_lookup_hits_only_with_the_recorded_fingerprint(memo):
+    actions = [{"click_element": {"index": 1}}]
+    memo.record("Open the login page", "https://example.com/#top", "fp", actions)
+    assert memo.lookup("open the login page", "https://example.com/", "fp") == actions
+    assert memo.lookup("Open the login page", "https://example.com/", "other") is None
+    assert memo.lookup("Open the login page", "https://example.com/", "fp") is None
+    assert memo.stats() == {"hits": 1, "misses": 2, "invalidations": 1, "recorded": 1}
+
+
+def test_invalidate_removes_the_entry(memo):
+    memo.record("Open the login page", "https://example.com/", "fp", [{"click_element": {"index": 1}}])
+    memo.invalidate("Open the login page", "https://example.com/")
+    assert memo.lookup("Open the login page", "https://example.com/", "fp") is None
@@ -0,0 +1,64 @@
+import json
+
+from trace_ir import compact_trace, element_to_locator, encode_trace
+
+BUTTON = {
+    "tag_name": "button",
+    "xpath": "html/body/form/button",
+    "highlight_index": 12,
+    "entire_parent_branch_path": ["div", "form", "button"],
+    "attributes": {"id": "login", "class": "btn btn-primary", "type": "submit", "style": "color: red"},
+}
+FIELD_REPR = (
+    "DOMHistoryElement(tag_name='input', xpath='html/body/form/input[1]', highlight_index=3, "
+    "attributes={'name': 'user', 'placeholder': 'Email', 'class': 'x'}, shadow_root=False)"
+)
+
+
+def test_locator_keeps_only_stable_attributes():
+    assert element_to_locator(BUTTON) == {
+        "tag": "button", "xpath": "html/body/form/button", "attrs": {"id": "login", "type": "submit"},
+    }
+
+
+def test_locator_from_repr_string():
+    assert element_to_locator(FIELD_REPR) == {
+        "tag": "input", "xpath": "html/body/form/input[1]", "attrs": {"name": "user", "placeholder": "Email"},
+    }
+
+
+def test_element_without_xpath_has_no_locator():
+    assert element_to_locator({"tag_name": "div"}) is None
+    assert element_to_locator(None) is None
+
+
+def test_repeated_elements_are_stored_once():
+    actions = [
+        {"go_to_url": {"url": "https://example.com"}, "interacted_element": None},
+        {"input_text": {"index": 3, "text": "me@example.com"}, "interacted_element": FIELD_REPR},
+        {"click_element": {"index": 12}, "interacted_element": BUTTON},
+        {"click_element": {"index": 40, "xml_index": 2}, "interacted_element": dict(BUTTON, highlight_index=40)},
+        {"done": {"text": "ok", "success": True}, "interacted_element": None},
+    ]
+    trace = compact_trace(actions)
+    assert len(trace["locators"]) == 2
+    assert trace["steps"] == [
+        {"action": "go_to_url", "url": "https://example.com"},
+        {"action": "input_text", "text": "me@example.com", "el": 0},
+        {"action": "click_element", "el": 1},
+        {"action": "click_element", "el": 1},
+        {"action": "done", "text": "ok", "success": True},
+    ]
+
+
+def test_non_dict_entries_and_none_params_are_skipped():
+    trace = compact_trace([None, "noise", {"wait": {"seconds": None}}, {"go_back": None}])
+    assert trace["steps"] == [{"action": "wait"}, {"action": "go_back"}]
+    assert compact_trace(None) == {"locators": [], "steps": []}
+
+
+def test_encoded_trace_is_smaller_and_round_trips():
+    actions = [{"click_element": {"index": i}, "interacted_element": BUTTON} for i in range(10)]
+    compact, stats = encode_trace(actions, label="test")
+    assert json.loads(compact) == compact_trace(actions)
+    assert stats["compact_chars"] < stats["original_chars"] / 3
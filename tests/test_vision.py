@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+from e2e_benchmark import fixture_test_cases
+from vision import AdaptiveVision, mentions_visual
+
+# Steps in the style case_generator produces; most verify that something is displayed
+GENERATED_STEPS = [
+    "Open the browser and go to 'https://shop.example.com'",
+    "Click on the 'Login' link in the header",
+    "Enter 'user@example.com' in the email field",
+    "Enter 'secret' in the password field",
+    "Click the 'Sign in' button",
+    "Verify that the dashboard is displayed",
+    "Verify that a welcome message appears with the user's name",
+    "Check that the 'Logout' button is visible",
+    "Type 'laptop' into the search box and press Enter",
+    "Verify that search results are displayed",
+    "Click on the first product in the results",
+    "Verify the product page shows the price",
+    "Click 'Add to cart'",
+    "Verify that the cart counter shows 1",
+    "Accept the cookie banner if it appears",
+    "Click the company logo to return to the home page",
+]
+VISUAL_STEPS = [
+    "Verify the error message is shown in red",
+    "Check that the cart icon shows a badge",
+    "Verify the product image is loaded",
+    "Verify the layout switches to one column on small screens",
+    "Check the position of the chat widget in the bottom right corner",
+    "Verify the selected tab is highlighted",
+]
+REPO_STEPS = [step for case in fixture_test_cases("http://127.0.0.1:8000", 1) for step in case["steps"]] + [
+    # README usage example
+    "Navigate to login page", "Enter credentials", "Submit form", "Verify dashboard",
+]
+
+
+@pytest.mark.parametrize("step", VISUAL_STEPS)
+def test_visual_steps_are_detected(step):
+    assert mentions_visual(step)
+
+
+@pytest.mark.parametrize("step", GENERATED_STEPS + REPO_STEPS)
+def test_ordinary_steps_run_on_the_dom(step):
+    assert not mentions_visual(step)
+
+
+def test_first_step_decides_the_initial_vision_flag():
+    assert not AdaptiveVision(SimpleNamespace(steps=GENERATED_STEPS), mode="adaptive").initial_use_vision()
+    assert AdaptiveVision(SimpleNamespace(steps=VISUAL_STEPS), mode="adaptive").initial_use_vision()
+    assert AdaptiveVision(SimpleNamespace(steps=GENERATED_STEPS), mode="always").initial_use_vision()
+    assert not AdaptiveVision(SimpleNamespace(steps=VISUAL_STEPS), mode="never").initial_use_vision()
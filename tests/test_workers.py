@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+
+from workers import merge_stats, shard_cases, worker_env
+
+
+def case(name: str, priority: int = 0):
+    return SimpleNamespace(name=name, priority=priority)
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ("AZURE_OPENAI_RPM", "AZURE_OPENAI_TPM", "BROWSER_POOL_SIZE", "MAX_CONCURRENT_BROWSERS"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_shards_balance_known_durations():
+    cases = [case(name) for name in "abcdef"]
+    durations = {"a": 10, "b": 8, "c": 6, "d": 4, "e": 2, "f": 2}
+    shards = shard_cases(cases, 2, durations)
+    loads = sorted(sum(durations[tc.name] for tc in shard) for shard in shards)
+    assert loads == [16, 16]
+    assert sorted(tc.name for shard in shards for tc in shard) == list("abcdef")
+
+
+def test_unknown_durations_count_as_the_average():
+    # "new" counts as 6s, so it is dealt before "fast" and "fast" joins it
+    cases = [case("fast"), case("new"), case("slow")]
+    shards = shard_cases(cases, 2, {"slow": 10, "fast": 2})
+    assert [[tc.name for tc in shard] for shard in shards] == [["slow"], ["new", "fast"]]
+
+
+def test_high_priority_cases_are_dealt_first():
+    cases = [case("long", 0), case("urgent", 5)]
+    shards = shard_cases(cases, 2, {"long": 100, "urgent": 1})
+    assert shards[0][0].name == "urgent"
+
+
+def test_empty_shards_are_dropped():
+    assert len(shard_cases([case("a"), case("b")], 4, {})) == 2
+
+
+def test_llm_quota_and_browser_budget_are_split(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_RPM", "100")
+    monkeypatch.setenv("AZURE_OPENAI_TPM", "90000")
+    monkeypatch.setenv("BROWSER_POOL_SIZE", "8")
+    monkeypatch.setenv("MAX_CONCURRENT_BROWSERS", "6")
+    assert worker_env(4) == {
+        "AZURE_OPENAI_RPM": "25", "AZURE_OPENAI_TPM": "22500",
+        "BROWSER_POOL_SIZE": "2", "MAX_CONCURRENT_BROWSERS": "1",
+    }
+
+
+def test_browser_budget_defaults_to_the_pool_size():
+    assert worker_env(3) == {"BROWSER_POOL_SIZE": "1", "MAX_CONCURRENT_BROWSERS": "1"}
+
+
+def test_every_worker_keeps_at_least_one_browser(monkeypatch, capsys):
+    monkeypatch.setenv("BROWSER_POOL_SIZE", "2")
+    assert worker_env(5) == {"BROWSER_POOL_SIZE": "1", "MAX_CONCURRENT_BROWSERS": "1"}
+    assert "[Warning]" in capsys.readouterr().out
+
+
+def test_merge_stats_adds_numbers_recursively():
+    total = merge_stats({}, {"usage": {"requests": 2, "cost": 0.5}, "name": "default", "enabled": True})
+    merge_stats(total, {"usage": {"requests": 3, "cost": 0.25}, "name": "other", "enabled": False})
+    assert total == {"usage": {"requests": 5, "cost": 0.75}, "name": "default", "enabled": True}
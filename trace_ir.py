@@ -0,0 +1,141 @@
+"""Compact intermediate representation of recorded agent action histories.
+
+`model_actions()` repeats the full `interacted_element` (parent branch path,
+coordinates, viewport info, every attribute) on every action. The code
+generator only needs the locator of each element once, so the IR keeps a
+deduplicated `locators` table and lets every step point into it by index.
+"""
+import ast
+import dataclasses
+import json
+import re
+
+# Attributes that help pick a stable Selenium locator; everything else is dropped
+LOCATOR_ATTRIBUTES = (
+    "id", "name", "type", "placeholder", "aria-label", "title", "href",
+    "role", "data-testid", "alt", "for", "value",
+)
+
+# Action parameters that only make sense inside the browser_use session
+DROPPED_PARAMS = ("index", "xml_index")
+
+TRACE_FORMAT_NOTE = (
+    "When the test data is a compact action trace, \"locators\" lists every interacted element once "
+    "(tag, xpath, key attributes) and each entry of \"steps\" is one recorded action that refers "
+    "to its element by position in \"locators\" through \"el\"."
+)
+
+
+def json_default(obj):
+    """`json.dump` default that keeps browser_use DOM elements as structured data"""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+def _parse_element_repr(text: str) -> dict:
+    """Recover tag, xpath and attributes from a `DOMHistoryElement(...)` repr string"""
+    element = {}
+    for field in ("tag_name", "xpath"):
+        match = re.search(rf"{field}='((?:[^'\\]|\\.)*)'", text)
+        if match:
+            element[field] = match.group(1)
+    start = text.find("attributes={")
+    if start != -1:
+        start += len("attributes=")
+        depth = 0
+        for end in range(start, len(text)):
+            if text[end] == "{":
+                depth += 1
+            elif text[end] == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        element["attributes"] = ast.literal_eval(text[start:end + 1])
+                    except (ValueError, SyntaxError):
+                        pass
+                    break
+    return element
+
+
+def element_to_locator(element):
+    """Reduce an interacted element (dict, dataclass or repr string) to a locator entry"""
+    if element is None:
+        return None
+    if isinstance(element, str):
+        element = _parse_element_repr(element)
+    elif not isinstance(element, dict):
+        element = json_default(element)
+        if not isinstance(element, dict):
+            return None
+    xpath = element.get("xpath")
+    if not xpath:
+        return None
+    attributes = element.get("attributes") or {}
+    locator = {"tag": element.get("tag_name"), "xpath": xpath}
+    kept = {key: attributes[key] for key in LOCATOR_ATTRIBUTES if attributes.get(key)}
+    if kept:
+        locator["attrs"] = kept
+    return locator
+
+
+def compact_trace(actions) -> dict:
+    """Convert a `model_actions()` history into {"locators": [...], "steps": [...]}"""
+    locators = []
+    locator_index = {}
+    steps = []
+    for action in actions or []:
+        if not isinstance(action, dict):
+            continue
+        step = {}
+        for name, params in action.items():
+            if name == "interacted_element":
+                continue
+            step["action"] = name
+            if isinstance(params, dict):
+                step.update({k: v for k, v in params.items() if k not in DROPPED_PARAMS and v is not None})
+            elif params is not None:
+                step["value"] = params
+        if not step:
+            continue
+        locator = element_to_locator(action.get("interacted_element"))
+        if locator is not None:
+            key = json.dumps(locator, sort_keys=True, ensure_ascii=False)
+            if key not in locator_index:
+                locator_index[key] = len(locators)
+                locators.append(locator)
+            step["el"] = locator_index[key]
+        steps.append(step)
+    return {"locators": locators, "steps": steps}
+
+
+def dumps_compact(data) -> str:
+    """Serialize without pretty-printing whitespace"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=json_default)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English/JSON)"""
+    return (len(text) + 3) // 4
+
+
+def encode_trace(actions, label: str = "trace"):
+    """Return the compact serialized trace and print the before/after prompt size"""
+    original = json.dumps(actions, indent=4, ensure_ascii=False, default=json_default)
+    compact = dumps_compact(compact_trace(actions))
+    stats = {
+        "original_chars": len(original),
+        "compact_chars": len(compact),
+        "original_tokens": estimate_tokens(original),
+        "compact_tokens": estimate_tokens(compact),
+    }
+    saved = 1 - stats["compact_chars"] / stats["original_chars"] if stats["original_chars"] else 0.0
+    print(
+        f"[Info] {label}: trace {stats['original_chars']:,} -> {stats['compact_chars']:,} chars "
+        f"(~{stats['original_tokens']:,} -> ~{stats['compact_tokens']:,} tokens, {saved:.0%} smaller)"
+    )
+    return compact, stats
@@ -0,0 +1,268 @@
+import argparse
+import atexit
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+DEFAULT_TRACE_PATH = os.path.join("results", "trace.jsonl")
+DEFAULT_METRICS_PATH = os.path.join("results", "trace_metrics.prom")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def tracing_enabled() -> bool:
+    return os.getenv("TRACING_ENABLED", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _quantile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled, so instrumented code costs one attribute lookup"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: str = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed phase. Use as a context manager to make it the parent of nested spans."""
+
+    def __init__(self, tracer, name: str, parent=None, **attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._token = None
+        self._ended = False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: str = None):
+        if self._ended:
+            return
+        self._ended = True
+        self.tracer._record(self, time.perf_counter() - self._started, error)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(error=f"{exc_type.__name__}: {exc}" if exc_type else None)
+        return False
+
+
+class Tracer:
+    """Collects finished spans and writes them as JSON lines plus a Prometheus text snapshot.
+
+    Spans form trees through a context variable, so a span opened inside
+    another one (in the same task or thread) becomes its child. Durations per
+    span name are kept in memory for the p50/p95 summary in the snapshot.
+    """
+
+    def __init__(self, enabled: bool = None, trace_path: str = None, metrics_path: str = None):
+        self.enabled = enabled if enabled is not None else tracing_enabled()
+        self.trace_path = trace_path or os.getenv("TRACE_PATH", DEFAULT_TRACE_PATH)
+        self.metrics_path = metrics_path or os.getenv("TRACE_METRICS_PATH", DEFAULT_METRICS_PATH)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._durations = {}
+
+    def start_span(self, name: str, parent=None, **attributes):
+        """Start a span that is ended explicitly with `.end()`; the parent defaults to the current span"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, parent if parent is not None else _current_span.get(), **attributes)
+
+    def span(self, name: str, **attributes):
+        """Context manager timing the enclosed block as a child of the current span"""
+        return self.start_span(name, **attributes)
+
+    def _record(self, span: Span, duration: float, error: str = None):
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": round(span.start_time, 6),
+            "duration_ms": round(duration * 1000, 3),
+            "attributes": span.attributes,
+        }
+        if error:
+            record["error"] = error
+        with self._lock:
+            self._pending.append(record)
+            self._durations.setdefault(span.name, []).append(duration)
+
+    def summary(self) -> dict:
+        """count, sum, p50 and p95 (seconds) per span name"""
+        with self._lock:
+            durations = {name: list(values) for name, values in self._durations.items()}
+        return {
+            name: {
+                "count": len(values),
+                "sum": sum(values),
+                "p50": _quantile(values, 0.5),
+                "p95": _quantile(values, 0.95),
+            }
+            for name, values in sorted(durations.items())
+        }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP pipeline_phase_seconds Duration of traced pipeline phases.",
+            "# TYPE pipeline_phase_seconds summary",
+        ]
+        for name, stats in self.summary().items():
+            lines.append(f'pipeline_phase_seconds{{phase="{name}",quantile="0.5"}} {stats["p50"]:.6f}')
+            lines.append(f'pipeline_phase_seconds{{phase="{name}",quantile="0.95"}} {stats["p95"]:.6f}')
+            lines.append(f'pipeline_phase_seconds_sum{{phase="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'pipeline_phase_seconds_count{{phase="{name}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Append finished spans to the JSONL trace and rewrite the Prometheus snapshot"""
+        if not self.enabled:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                for record in pending:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        if self._durations:
+            os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+            with open(self.metrics_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            print(f"[Info] Trace written to {self.trace_path}, phase metrics to {self.metrics_path}.")
+
+    # httpx event hooks -------------------------------------------------------
+
+    def sync_event_hooks(self) -> dict:
+        """Event hooks that time each LLM HTTP round trip (request sent -> response headers)"""
+        def on_request(request):
+            if self.enabled:
+                request.extensions["trace_span"] = self.start_span(
+                    "llm.request", method=request.method, path=request.url.path
+                )
+
+        def on_response(response):
+            span = response.request.extensions.get("trace_span")
+            if span is not None:
+                span.set(status=response.status_code)
+                span.end()
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def async_event_hooks(self) -> dict:
+        sync_hooks = self.sync_event_hooks()
+
+        async def on_request(request):
+            sync_hooks["request"][0](request)
+
+        async def on_response(response):
+            sync_hooks["response"][0](response)
+
+        return {"request": [on_request], "response": [on_response]}
+
+
+class StepTimer:
+    """browser_use new-step listener that times the agent's steps.
+
+    The callback fires once the model has chosen a step's actions, so each
+    `agent.step` span runs from one decision to the next: executing the
+    actions, capturing the page and the next model call.
+    """
+
+    def __init__(self, tracer: Tracer, parent=None):
+        self.tracer = tracer
+        self.parent = parent
+        self._span = None
+
+    def on_new_step(self, state, model_output, step_number):
+        self.close()
+        self._span = self.tracer.start_span("agent.step", parent=self.parent, step=step_number)
+
+    def close(self):
+        if self._span is not None:
+            self._span.end()
+            self._span = None
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer (disabled unless TRACING_ENABLED is set)"""
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+            if _tracer.enabled:
+                atexit.register(_tracer.flush)
+        return _tracer
+
+
+def span(name: str, **attributes):
+    """Shortcut for get_tracer().span(...)"""
+    return get_tracer().span(name, **attributes)
+
+
+def summarize_files(paths: list) -> dict:
+    """p50/p95 per phase over one or more JSONL trace files (e.g. several nightly runs)"""
+    tracer = Tracer(enabled=True)
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    tracer._durations.setdefault(record["name"], []).append(record["duration_ms"] / 1000)
+    return tracer.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize traced phase durations.")
+    parser.add_argument("traces", nargs="*", default=[DEFAULT_TRACE_PATH], help="JSONL trace files")
+    args = parser.parse_args(argv)
+
+    print(f"{'phase':<24}{'count':>8}{'p50':>10}{'p95':>10}{'total':>10}")
+    for name, stats in summarize_files(args.traces).items():
+        print(f"{name:<24}{stats['count']:>8}{stats['p50']:>9.2f}s{stats['p95']:>9.2f}s{stats['sum']:>9.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
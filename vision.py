@@ -0,0 +1,160 @@
+import difflib
+import os
+import re
+import threading
+from collections import Counter
+
+from step_memo import normalize_step
+
+VISION_MODES = ("adaptive", "always", "never")
+
+# Step wording that can only be checked by looking at the page. Words such as "displayed", "visible" or
+# "appears" are left out: nearly every verification step uses them, and the DOM answers those checks.
+VISUAL_KEYWORDS = (
+    "color", "colour", "colors", "colours", "red", "green", "blue", "yellow", "orange", "purple", "grey", "gray",
+    "icon", "icons", "image", "images", "picture", "photo", "screenshot", "thumbnail",
+    "visually", "highlighted", "bold", "italic", "underlined", "font", "layout", "aligned", "alignment",
+    "position", "positioned", "overlap", "overlaps", "looks",
+)
+_VISUAL_PATTERN = re.compile(r"\b(" + "|".join(VISUAL_KEYWORDS) + r")\b", re.IGNORECASE)
+_UNCERTAIN_EVALUATIONS = ("failed", "unknown")
+
+
+def vision_mode() -> str:
+    mode = os.getenv("AGENT_VISION_MODE", "adaptive").strip().lower()
+    if mode not in VISION_MODES:
+        print(f"[Warning] Unknown AGENT_VISION_MODE '{mode}', using 'adaptive'.")
+        return "adaptive"
+    return mode
+
+
+def mentions_visual(text: str) -> bool:
+    return bool(text) and _VISUAL_PATTERN.search(text) is not None
+
+
+def _agent_state(agent):
+    """browser_use keeps run state on agent.state (>= 0.1.40) or directly on the agent (older releases)"""
+    return getattr(agent, "state", None) or agent
+
+
+def _set_use_vision(agent, use_vision: bool):
+    settings = getattr(agent, "settings", None)
+    if settings is not None and hasattr(settings, "use_vision"):
+        settings.use_vision = use_vision
+    else:
+        agent.use_vision = use_vision
+
+
+class VisionStats:
+    """Process-wide count of agent steps and of those that were sent a screenshot"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps = 0
+        self.vision_steps = 0
+        self.reasons = Counter()
+
+    def add(self, steps: int, vision_steps: int, reasons: Counter):
+        with self._lock:
+            self.steps += steps
+            self.vision_steps += vision_steps
+            self.reasons.update(reasons)
+
+    def summary(self) -> str:
+        with self._lock:
+            reasons = ", ".join(f"{reason}: {count}" for reason, count in self.reasons.most_common())
+            share = self.vision_steps / self.steps if self.steps else 0.0
+            return f"{self.vision_steps}/{self.steps} agent steps used vision ({share:.0%})" + (
+                f" - {reasons}" if reasons else ""
+            )
+
+
+_stats = VisionStats()
+
+
+def get_vision_stats() -> VisionStats:
+    return _stats
+
+
+class AdaptiveVision:
+    """Decides before every agent step whether the model gets a screenshot.
+
+    In "adaptive" mode steps run on the DOM alone and switch to vision when
+    the previous step failed or produced an error, when the model rated its
+    last goal as failed/unknown, or when the test step being worked on
+    mentions visual properties (colours, icons, images, layout, position, ...).
+    "always" and "never" pin the behaviour.
+    """
+
+    def __init__(self, test_case, mode: str = None):
+        self.test_case = test_case
+        self.mode = mode or vision_mode()
+        self.steps = list(getattr(test_case, "steps", []) or [])
+        self.step_count = 0
+        self.vision_count = 0
+        self.reasons = Counter()
+
+    def initial_use_vision(self) -> bool:
+        if self.mode != "adaptive":
+            return self.mode == "always"
+        return bool(self.steps) and mentions_visual(self.steps[0])
+
+    def _current_step_index(self, goal: str) -> int:
+        goal = normalize_step(goal)
+        ratios = [difflib.SequenceMatcher(None, goal, normalize_step(step)).ratio() for step in self.steps]
+        return max(range(len(ratios)), key=ratios.__getitem__) if ratios else 0
+
+    def decide(self, agent):
+        """Return (use_vision, reason) for the step the agent is about to take"""
+        if self.mode != "adaptive":
+            return self.mode == "always", self.mode
+        state = _agent_state(agent)
+        if getattr(state, "consecutive_failures", 0):
+            return True, "failure"
+        last_result = getattr(state, "last_result", None) or getattr(agent, "_last_result", None) or []
+        if any(getattr(result, "error", None) for result in last_result):
+            return True, "action error"
+
+        history = getattr(getattr(state, "history", None) or getattr(agent, "history", None), "history", None) or []
+        last_output = getattr(history[-1], "model_output", None) if history else None
+        current_state = getattr(last_output, "current_state", None)
+        if current_state is None:
+            use_vision = self.initial_use_vision()
+            return use_vision, "visual step" if use_vision else None
+        evaluation = (getattr(current_state, "evaluation_previous_goal", "") or "").strip().lower()
+        if evaluation.startswith(_UNCERTAIN_EVALUATIONS):
+            return True, "uncertain"
+        goal = getattr(current_state, "next_goal", "") or ""
+        if self.steps:
+            index = self._current_step_index(goal)
+            if any(mentions_visual(step) for step in self.steps[index:index + 2]):
+                return True, "visual step"
+        if mentions_visual(goal):
+            return True, "visual step"
+        return False, None
+
+    def attach(self, agent):
+        """Wrap agent.step so the vision flag is set right before each step builds its state message"""
+        original_step = agent.step
+
+        async def step(*args, **kwargs):
+            use_vision, reason = self.decide(agent)
+            _set_use_vision(agent, use_vision)
+            self.step_count += 1
+            if use_vision:
+                self.vision_count += 1
+                self.reasons[reason] += 1
+            return await original_step(*args, **kwargs)
+
+        agent.step = step
+        return agent
+
+    def finish(self):
+        """Report this run and add it to the process-wide stats"""
+        get_vision_stats().add(self.step_count, self.vision_count, self.reasons)
+        if self.mode == "adaptive":
+            reasons = ", ".join(f"{reason}: {count}" for reason, count in self.reasons.most_common())
+            print(
+                f"[Info] '{getattr(self.test_case, 'name', '?')}': {self.vision_count}/{self.step_count} "
+                f"agent step(s) used vision" + (f" ({reasons})" if reasons else "") + "."
+            )
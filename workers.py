@@ -0,0 +1,214 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+
+from scheduler import TestScheduler
+
+# Per-process LLM quotas; each worker gets an equal share so the deployment limits still hold
+SHARED_LIMIT_VARS = ("AZURE_OPENAI_RPM", "AZURE_OPENAI_TPM")
+
+
+def shard_cases(test_cases: list, workers: int, durations: dict) -> list:
+    """Split the cases into `workers` shards of about equal expected run time.
+
+    Cases are dealt longest first to the shard with the least work so far;
+    cases without a recorded duration count as the average of the known ones.
+    """
+    known = [durations[tc.name] for tc in test_cases if tc.name in durations]
+    default = sum(known) / len(known) if known else 1.0
+    shards = [[] for _ in range(workers)]
+    loads = [0.0] * workers
+    ordered = sorted(
+        test_cases,
+        key=lambda tc: (-(getattr(tc, "priority", 0) or 0), -durations.get(tc.name, default)),
+    )
+    for test_case in ordered:
+        target = loads.index(min(loads))
+        shards[target].append(test_case)
+        loads[target] += durations.get(test_case.name, default)
+    return [shard for shard in shards if shard]
+
+
+def worker_env(workers: int) -> dict:
+    """Environment overrides for each worker process"""
+    overrides = {}
+    for name in SHARED_LIMIT_VARS:
+        limit = int(os.getenv(name, "0"))
+        if limit:
+            overrides[name] = str(max(1, limit // workers))
+    # The browser budget is for the whole machine as well; each worker gets its share of browsers and slots
+    pool_size = int(os.getenv("BROWSER_POOL_SIZE", "3"))
+    max_browsers = int(os.getenv("MAX_CONCURRENT_BROWSERS", str(pool_size)))
+    if workers > max_browsers:
+        print(f"[Warning] {workers} workers but only {max_browsers} browser(s) allowed; each worker still gets one.")
+    overrides["BROWSER_POOL_SIZE"] = str(max(1, pool_size // workers))
+    overrides["MAX_CONCURRENT_BROWSERS"] = str(max(1, max_browsers // workers))
+    return overrides
+
+
+def merge_stats(total: dict, stats: dict) -> dict:
+    """Add the numeric counters of `stats` into `total` (recursively)"""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            merge_stats(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+        else:
+            total.setdefault(key, value)
+    return total
+
+
+async def _run_shard(index: int, cases: list, replay: bool, revalidate: set, codegen: bool, force: bool,
+                     results: multiprocessing.Queue):
+    from browser_pool import get_browser_pool, close_browser_pool
+    from http_clients import aclose_http_clients, http_pool_metrics
+    from jobs import summarize_history
+    from test_runner import collect_suite_stats, run_test_and_generate_code
+    from tracing import get_tracer
+
+    async def run_one(test_case, scheduler):
+        try:
+            history = await run_test_and_generate_code(
+                test_case, scheduler, replay=replay or test_case.name in revalidate, codegen=codegen, force=force,
+            )
+        except Exception as e:
+            results.put(("result", index, {"test_case": test_case.name, "status": "ERROR", "error": str(e),
+                                           "result": None}))
+            raise
+        results.put(("result", index, {"test_case": test_case.name, "status": "DONE", "error": None,
+                                       "result": summarize_history(history)}))
+        return history
+
+    scheduler = TestScheduler(durations_file=None)
+    await get_browser_pool().start()
+    try:
+        await scheduler.run(cases, run_one)
+    finally:
+        await close_browser_pool()
+        pool_metrics = http_pool_metrics()
+        await aclose_http_clients()
+    get_tracer().flush()
+    results.put(("done", index, {"durations": scheduler.durations, "stats": collect_suite_stats(pool_metrics)}))
+
+
+def _worker_main(index: int, case_data: list, replay: bool, revalidate: set, codegen: bool, force: bool, env: dict,
+                 results: multiprocessing.Queue):
+    """Entry point of one worker process: its own event loop, browser pool and LLM clients"""
+    os.environ.update(env)
+    from test_cases.test_cases import TestCase
+
+    cases = [TestCase(**data) for data in case_data]
+    print(f"[Info] Worker {index} (pid {os.getpid()}) running {len(cases)} test case(s).")
+    asyncio.run(_run_shard(index, cases, replay, revalidate, codegen, force, results))
+
+
+async def _generate_suite_code(test_cases: list, finished_names: set, force: bool):
+    from batch_codegen import generate_suite
+    from http_clients import aclose_http_clients
+    from results_store import get_results_store
+
+    store = get_results_store()
+    pairs = []
+    for test_case in test_cases:
+        test_data = store.latest_actions(test_case.name, status=None) if test_case.name in finished_names else None
+        if test_data:
+            pairs.append((test_case, test_data))
+    try:
+        await generate_suite(pairs, force=force)
+    finally:
+        await aclose_http_clients()
+
+
+def run_tests_in_workers(workers: int, replay: bool = False, batch_codegen: bool = None, force: bool = False) -> list:
+    """Run the suite sharded across `workers` processes and collect their results.
+
+    Each worker is a fresh interpreter with its own event loop, browser pool
+    and HTTP clients, so DOM processing and serialization use separate cores.
+    Results come back over a multiprocessing queue as each case finishes; a
+    worker that dies takes only its unfinished cases with it. With batch
+    codegen the workers only run the tests and the coordinator generates the
+    code for the whole suite afterwards. Cases the run manifest marks as
+    unchanged are skipped (or replayed) before sharding, unless `force`.
+    """
+    from batch_codegen import batch_codegen_enabled
+    from run_manifest import format_skip_summary, get_run_manifest, plan_runs
+    from test_cases.test_cases import load_test_cases
+    from test_runner import print_results, print_suite_stats
+
+    test_cases_list = load_test_cases()
+    if not test_cases_list:
+        print("[WARNING] No test cases found. Please run the case_generator to generate test cases.")
+        return []
+
+    suite_started = time.perf_counter()
+    batch_codegen = batch_codegen_enabled() if batch_codegen is None else batch_codegen
+    scheduler = TestScheduler()
+    to_run, to_revalidate, skipped = plan_runs(test_cases_list, force=force)
+    revalidate = {test_case.name for test_case in to_revalidate}
+    shards = shard_cases(to_run + to_revalidate, workers, scheduler.durations)
+    env = worker_env(max(1, len(shards)))
+    # Spawned, not forked: the children must not inherit this process's threads or event loop state
+    context = multiprocessing.get_context("spawn")
+    results_queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker_main,
+            args=(index, [tc.model_dump() for tc in shard], replay, revalidate, not batch_codegen, force, env,
+                  results_queue),
+            name=f"test-worker-{index}",
+        )
+        for index, shard in enumerate(shards)
+    ]
+    print(
+        f"[Info] Running {len(to_run) + len(to_revalidate)} test case(s) in {len(processes)} worker process(es); "
+        f"{len(skipped)} unchanged case(s) skipped."
+    )
+    for process in processes:
+        process.start()
+
+    results, stats, finished = {}, {}, set()
+    try:
+        while len(finished) < len(processes):
+            try:
+                kind, index, payload = results_queue.get(timeout=1)
+            except queue.Empty:
+                for index, process in enumerate(processes):
+                    if index not in finished and not process.is_alive() and results_queue.empty():
+                        print(f"[Error] Worker {index} exited with code {process.exitcode}.")
+                        finished.add(index)
+                continue
+            if kind == "result":
+                results[payload["test_case"]] = payload
+            else:
+                scheduler.durations.update(payload["durations"])
+                merge_stats(stats, payload["stats"])
+                finished.add(index)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        scheduler.save_durations()
+
+    ordered = []
+    for shard in shards:
+        for test_case in shard:
+            ordered.append(results.get(test_case.name) or {
+                "test_case": test_case.name, "status": "ERROR", "error": "worker process exited", "result": None,
+            })
+    finished_names = {entry["test_case"] for entry in ordered if entry["status"] == "DONE"}
+    if batch_codegen and finished_names:
+        asyncio.run(_generate_suite_code(test_cases_list, finished_names, force))
+    # Run decisions (and batch codegen decisions) were made here, per-test codegen ones in the workers
+    merge_stats(stats, {"manifest": get_run_manifest().summary.to_dict()})
+    ordered += skipped
+    print_results(ordered)
+    print(f"[Info] Suite finished in {time.perf_counter() - suite_started:.1f}s with {len(processes)} worker(s).")
+    if len(stats) > 1:
+        print_suite_stats(stats)
+    else:
+        print(f"[Info] Manifest: {format_skip_summary(stats['manifest'])}.")
+    print("=" * 50)
+    return ordered